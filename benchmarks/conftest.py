@@ -0,0 +1,128 @@
+"""
+Fake infrastructure for the benchmarks: a local Git remote, a stub GitLab HTTP server and a fake PhoneBook,
+so that the benchmarks can run offline and measure only the manager's own code.
+"""
+import os
+import sys
+import json
+import pytest
+import threading
+from pathlib import Path
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from bipy_gui_manager.utils import version_control as vcs
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    # Not skipped: a benchmark run that measures nothing must not look like a success
+    raise pytest.UsageError("The benchmarks need pytest-benchmark: install it with 'pip install -e .[bench]'")
+
+REPO_ROOT = Path(__file__).parent.parent.absolute()
+
+
+class FakePhoneBookEntry:
+    def __init__(self, login_name):
+        self.login_name = [login_name]
+        self.full_name = ["Benchmark User"]
+        self.email = ["benchmark.user@cern.ch"]
+
+
+class FakePhoneBook:
+    """ Replaces pyphonebook.PhoneBook, which needs access to CERN's LDAP """
+
+    def validate_login_name(self, login_name):
+        return True
+
+    def search_by_login_name(self, login_name):
+        return [FakePhoneBookEntry(login_name)]
+
+
+class StubGitLabHandler(BaseHTTPRequestHandler):
+    """ Answers the few GitLab API calls the manager does with plausible replies """
+
+    def _reply(self, content):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps(content).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.startswith("//oauth/token") or self.path.startswith("/oauth/token"):
+            self._reply({"access_token": "benchmark-token"})
+        else:
+            self._reply({"id": 1234})
+
+    def do_PUT(self):
+        self._reply({"id": 1234})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="session")
+def stub_gitlab():
+    server = HTTPServer(("127.0.0.1", 0), StubGitLabHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def fake_infrastructure(monkeypatch, stub_gitlab):
+    """ Points the manager to the stub GitLab server and to the fake PhoneBook """
+    monkeypatch.setattr('bipy_gui_manager.utils.version_control.GITLAB_URL', stub_gitlab)
+    monkeypatch.setattr('bipy_gui_manager.new.validation.PhoneBook', FakePhoneBook)
+
+
+@pytest.fixture
+def local_remote(tmpdir):
+    """ A bare Git repository to push to, instead of GitLab """
+    remote = str(tmpdir / "remote.git")
+    vcs.invoke_git(['init', '--bare', remote], cwd=str(tmpdir))
+    return remote
+
+
+def create_synthetic_template(path, n_files, file_size=2048):
+    """
+    Creates a template with the same structure as the real one, padded with n_files text files
+    containing the placeholders that apply_customizations() replaces.
+    """
+    package = os.path.join(path, "sy_bi_pyqt_template")
+    os.makedirs(package)
+    os.makedirs(os.path.join(path, "images"))
+    with open(os.path.join(path, "README.md"), "w") as f:
+        f.write("README")
+    with open(os.path.join(path, "README-template.md"), "w") as f:
+        f.write("Project Name\n_Here goes the project description_\nproject-name\nproject_name\n"
+                "author@cern.ch\nthe project author\nhttps://:@gitlab.cern.ch:8443/cern-username/project-name.git\n")
+    line = "# sy-bi-pyqt-template by Sara Zanzottera <sara.zanzottera@cern.ch> - SY BI PyQt Template Code\n"
+    content = line * max(1, file_size // len(line))
+    for i in range(n_files):
+        folder = os.path.join(package, f"module_{i // 100}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"file_{i}.py"), "w") as f:
+            f.write(content)
+
+
+def create_synthetic_deploy_tree(path, n_apps, n_versions=3):
+    """ Creates a deploy base with n_apps apps, each with n_versions versions """
+    for app in range(n_apps):
+        for version in range(n_versions):
+            os.makedirs(os.path.join(path, f"app-{app}", f"0.{version}.0"))
+
+
+@pytest.fixture
+def cli_environment(tmpdir):
+    """ Environment to run the CLI in a subprocess against a synthetic deploy tree """
+    deploy_path = str(tmpdir / "deployments")
+    create_synthetic_deploy_tree(deploy_path, n_apps=200)
+    env = dict(os.environ)
+    env["BIPY_GUI_MANAGER_OPERATIONAL_DEPLOY_PATH"] = deploy_path
+    env["BIPY_GUI_MANAGER_DEVELOPMENT_DEPLOY_PATH"] = deploy_path
+    env["PYTHONPATH"] = os.pathsep.join([str(REPO_ROOT)] + sys.path)
+    return env
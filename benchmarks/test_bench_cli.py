@@ -0,0 +1,20 @@
+import sys
+import subprocess
+
+CLI = [sys.executable, "-c", "from bipy_gui_manager.main import main; main()"]
+
+
+def test_cli_startup(benchmark, cli_environment):
+    # Full interpreter startup, imports and parser construction
+    benchmark(subprocess.run, CLI + ["--help"], env=cli_environment, stdout=subprocess.DEVNULL, check=True)
+
+
+def test_cli_completion_latency(benchmark, cli_environment, tmpdir):
+    # What happens at each TAB press: argcomplete runs the CLI with these variables set
+    completions = str(tmpdir / "completions")
+    comp_line = "bipy-gui-manager run -o "
+    env = dict(cli_environment, _ARGCOMPLETE="1", _ARGCOMPLETE_IFS="\n", COMP_LINE=comp_line,
+               COMP_POINT=str(len(comp_line)), _ARGCOMPLETE_STDOUT_FILENAME=completions)
+    benchmark(subprocess.run, CLI, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    with open(completions) as f:
+        assert "app-0" in f.read()
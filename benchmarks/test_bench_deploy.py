@@ -0,0 +1,39 @@
+import os
+import pytest
+
+from bipy_gui_manager.deploy import deploy
+from bipy_gui_manager.run import run
+from bipy_gui_manager.utils import version_control as vcs
+from .conftest import create_synthetic_template, create_synthetic_deploy_tree
+
+
+@pytest.fixture
+def deployable_project(tmpdir, local_remote):
+    project = str(tmpdir / "project")
+    create_synthetic_template(project, 100)
+    with open(os.path.join(project, "setup.py"), "w") as f:
+        f.write("from setuptools import setup\nsetup()\n")
+    vcs.init_local_repo(project)
+    vcs.invoke_git(['remote', 'add', 'origin', local_remote], cwd=project)
+    vcs.invoke_git(['push', '-u', 'origin', 'master'], cwd=project)
+    return project
+
+
+def test_deploy_git_prechecks(benchmark, deployable_project):
+    def prechecks():
+        assert vcs.is_git_folder(deployable_project)
+        assert deploy.is_python_project(deployable_project)
+        assert deploy.is_ready_to_deploy(deployable_project)
+        assert deploy.find_project_type(deployable_project) == "pyqt"
+    benchmark(prechecks)
+
+
+@pytest.mark.parametrize("n_apps", [10, 1000, 10000])
+def test_list_runnable_apps(benchmark, tmpdir, monkeypatch, n_apps):
+    operational, development = str(tmpdir / "operational"), str(tmpdir / "development")
+    create_synthetic_deploy_tree(operational, n_apps)
+    create_synthetic_deploy_tree(development, n_apps)
+    monkeypatch.setattr('bipy_gui_manager.run.run.OPERATIONAL_DEPLOY_PATH', operational)
+    monkeypatch.setattr('bipy_gui_manager.run.run.DEVELOPMENT_DEPLOY_PATH', development)
+    apps = benchmark(run.get_runnable_apps_for_argcomplete)
+    assert len(apps) == n_apps
@@ -0,0 +1,64 @@
+import os
+import shutil
+import pytest
+
+from bipy_gui_manager.new import new_project, project_info
+from bipy_gui_manager.utils import version_control as vcs
+from .conftest import create_synthetic_template
+
+CUSTOMIZATIONS = dict(project_name="bench-project", project_desc="A benchmark project", project_author="Bench User",
+                      project_email="bench.user@cern.ch", gitlab_space="bisw-python")
+
+
+@pytest.mark.parametrize("n_files", [10, 1000, 10000])
+def test_apply_customizations(benchmark, tmpdir, n_files):
+    template = str(tmpdir / "template")
+    create_synthetic_template(template, n_files)
+    project = str(tmpdir / "project")
+
+    def setup():
+        shutil.rmtree(project, ignore_errors=True)
+        shutil.copytree(template, project)
+
+    benchmark.pedantic(new_project.apply_customizations, kwargs=dict(project_path=project, **CUSTOMIZATIONS),
+                       setup=setup, rounds=3 if n_files > 1000 else 10)
+
+
+def test_generate_readme(benchmark, tmpdir):
+    template = str(tmpdir / "template")
+    create_synthetic_template(template, 0)
+    project = str(tmpdir / "project")
+
+    def setup():
+        shutil.rmtree(project, ignore_errors=True)
+        shutil.copytree(template, project)
+
+    customizations = {k: v for k, v in CUSTOMIZATIONS.items() if k != "gitlab_space"}
+    benchmark.pedantic(new_project.generate_readme, setup=setup, rounds=20,
+                       kwargs=dict(project_path=project, gitlab_repo="https://gitlab.cern.ch/bench.git",
+                                   **customizations))
+
+
+def test_collect_with_fake_phonebook(benchmark, tmpdir, fake_infrastructure):
+    from tests.conftest import new_project_parameters
+    parameters = new_project_parameters(path=str(tmpdir), name="bench-project", desc="A benchmark project",
+                                        author="bench", repo_type="test", gitlab_token="token", interactive=False)
+    benchmark(project_info.collect, parameters)
+
+
+def test_setup_version_control_with_local_remote(benchmark, tmpdir, fake_infrastructure, local_remote):
+    template = str(tmpdir / "template")
+    create_synthetic_template(template, 100)
+    project = str(tmpdir / "project")
+
+    def setup():
+        shutil.rmtree(project, ignore_errors=True)
+        shutil.copytree(template, project)
+        vcs.invoke_git(['init', '--bare', '--quiet', local_remote + ".tmp"], cwd=str(tmpdir))
+        shutil.rmtree(local_remote)
+        os.rename(local_remote + ".tmp", local_remote)
+
+    benchmark.pedantic(new_project.setup_version_control, setup=setup, rounds=5,
+                       kwargs=dict(project_path=project, gitlab=True, project_name="bench-project",
+                                   project_desc="A benchmark project", gitlab_token="private_token=token",
+                                   repo_type="test", repo_url=local_remote, author_name="bench"))
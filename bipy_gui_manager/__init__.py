@@ -1,3 +1,8 @@
-OPERATIONAL_DEPLOY_PATH = "/user/bdisoft/operational/python/gui/deployments"
-DEVELOPMENT_DEPLOY_PATH = "/user/bdisoft/development/python/gui/deployments"
+import os
+
+# The deploy paths can be overridden from the environment (i.e. to run the benchmarks on a synthetic deploy tree)
+OPERATIONAL_DEPLOY_PATH = os.environ.get("BIPY_GUI_MANAGER_OPERATIONAL_DEPLOY_PATH",
+                                         "/user/bdisoft/operational/python/gui/deployments")
+DEVELOPMENT_DEPLOY_PATH = os.environ.get("BIPY_GUI_MANAGER_DEVELOPMENT_DEPLOY_PATH",
+                                         "/user/bdisoft/development/python/gui/deployments")
 ACC_PY_PATH = "/acc/local/share/python/acc-py/apps/acc-py-cli/pro/bin/"
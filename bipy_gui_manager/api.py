@@ -0,0 +1,185 @@
+"""
+Programmatic interface to the manager, for programs that create and deploy projects without going through the CLI
+(i.e. a provisioning service running many operations in the same process).
+
+The functions never ask anything: all the information must be given as arguments. They return structured results
+and raise ApiError subclasses on failure. The messages normally printed for the user are sent to the given
+reporter (see utils.cli.TerminalReporter for the interface), or discarded if no reporter is given.
+
+Note that the operations change the working directory of the process while they run external tools: run them
+from one thread at a time.
+"""
+from typing import List, NamedTuple, Optional, Sequence
+import argparse
+from pathlib import Path
+
+import bipy_gui_manager
+from bipy_gui_manager.deploy import deploy as deploy_module, smoke
+from bipy_gui_manager.new import new_project as new_module
+from bipy_gui_manager.run import run as run_module
+from bipy_gui_manager.utils import cli, tracing
+
+
+class ApiError(Exception):
+    """ Base class of the errors raised by the API """
+
+    def __init__(self, message: str, messages: Optional[List[str]] = None):
+        """
+        :param message: what went wrong
+        :param messages: the error messages reported while the operation ran, if any
+        """
+        super().__init__(message)
+        self.messages = messages or []
+
+
+class ProjectCreationError(ApiError):
+    """ The project could not be created """
+
+
+class DeployError(ApiError):
+    """ The project could not be deployed """
+
+
+class ProjectResult(NamedTuple):
+    project_path: str
+    project_name: str
+    project_type: str
+    repo_url: Optional[str]  # None if the project was not uploaded to GitLab
+    duration: float  # In seconds
+
+
+class DeployResult(NamedTuple):
+    project_path: str
+    project_type: str
+    version: Optional[str]
+    deploy_base: str
+    duration: float  # In seconds
+
+
+class AppInfo(NamedTuple):
+    name: str
+    deploy_base: str
+    operational: bool
+
+
+class _ForwardingReporter(cli.RecordingReporter):
+    """ Records the messages (to put the errors in the exceptions) and forwards them to another reporter """
+
+    def __init__(self, reporter=None):
+        super().__init__()
+        self.reporter = reporter
+
+    def report(self, kind: str, message: str = "", newline: bool = True) -> None:
+        super().report(kind, message, newline)
+        if self.reporter is not None:
+            self.reporter.report(kind, message, newline)
+
+
+def get_deploy_base(operational: bool) -> str:
+    """ :return: where the operational or development applications are deployed """
+    return bipy_gui_manager.OPERATIONAL_DEPLOY_PATH if operational else bipy_gui_manager.DEVELOPMENT_DEPLOY_PATH
+
+
+def create_project(name: str, description: str, author: str, base_path: str, project_type: str = "pyqt",
+                   gitlab: bool = False, repo_type: str = "test", gitlab_token: Optional[str] = None,
+                   clone_protocol: str = "kerberos", template_path: Optional[str] = None,
+                   template_pack: Optional[str] = None, template_url: Optional[str] = None,
+                   overwrite: bool = False, cleanup_on_failure: bool = True, reporter=None) -> ProjectResult:
+    """
+    Creates and installs a new project, like 'bipy-gui-manager new'.
+    :param name: name of the project
+    :param description: one-line description of the project
+    :param author: CERN username of the author
+    :param base_path: folder where to create the project
+    :param project_type: either 'pyqt' or 'comrad'
+    :param gitlab: whether to create a GitLab repository and push the project to it
+    :param repo_type: 'test' (under the author's GitLab space) or 'operational' (under bisw-python)
+    :param gitlab_token: GitLab private access token, required if gitlab is True
+    :param clone_protocol: how to download the template from GitLab (https, ssh, kerberos)
+    :param template_path: if given, a local template to use instead of downloading it
+    :param template_pack: if given, a template pack to use instead of downloading the template
+    :param template_url: if given, the URL of a template to use instead of the default one
+    :param overwrite: whether to replace a project that exists already in the same location
+    :param cleanup_on_failure: whether to delete what was created if the creation fails
+    :param reporter: receives the progress messages (see utils.cli.TerminalReporter). Discarded if None.
+    :return: the details of the project created
+    :raises ProjectCreationError if the project could not be created
+    """
+    if gitlab and not gitlab_token:
+        raise ProjectCreationError("A GitLab token is required to create the GitLab repository")
+    parameters = argparse.Namespace(
+        base_path=base_path, project_name=name, project_desc=description, project_author=author,
+        project_type=project_type, gitlab_repo=repo_type, clone_protocol=clone_protocol, upload_protocol=None,
+        gitlab=gitlab, gitlab_token=gitlab_token, interactive=False, overwrite=overwrite,
+        cleanup_on_failure=cleanup_on_failure, template_path=template_path, template_pack=template_pack,
+        template_url=template_url, template_clone_mode="auto", push_compression=None, push_threads=None,
+        resume=None, crash=False, verbose=False, trace_file=None)
+    recorder = _ForwardingReporter(reporter)
+
+    with cli.use_reporter(recorder):
+        project_data = new_module.new_project(parameters)
+        duration = tracing.get_tracer().total_time()
+
+    if project_data is None:
+        errors = recorder.errors()
+        raise ProjectCreationError(errors[0] if errors else f"Project {name} was not created", errors)
+    return ProjectResult(project_path=project_data["project_path"], project_name=project_data["project_name"],
+                         project_type=project_data["project_type"], repo_url=project_data.get("repo_url"),
+                         duration=duration)
+
+
+def deploy_project(path: str, operational: bool = False, project_type: Optional[str] = None,
+                   relock: bool = False, optimization_levels: Sequence[int] = (0, ), smoke_test: bool = False,
+                   strict: bool = False, report_file: Optional[str] = None, reporter=None) -> DeployResult:
+    """
+    Deploys a project, like 'bipy-gui-manager deploy'.
+    :param path: the project to deploy
+    :param operational: whether to deploy it with the operational applications rather than the development ones
+    :param project_type: either 'pyqt' or 'comrad'. Detected if not given.
+    :param relock: whether to resolve the dependencies again even if they did not change (PyQt only)
+    :param optimization_levels: the optimization levels to precompile the deployed sources for (none if empty)
+    :param smoke_test: whether to launch the deployed version headless to check that it starts (see deploy.smoke)
+    :param strict: whether to raise DeployError if the smoke test fails or finds a regression of the startup time
+    :param report_file: if given, where to save the deploy report (see deploy.report)
+    :param reporter: receives the progress messages (see utils.cli.TerminalReporter). Discarded if None.
+    :return: the details of the deploy
+    :raises DeployError if the project is not ready to deploy or the deploy fails
+    """
+    project_path = Path(path).absolute()
+    deploy_base = get_deploy_base(operational)
+    parameters = argparse.Namespace(path=str(project_path), operational=operational, project_type=project_type,
+                                    relock=relock, optimization_levels=optimization_levels,
+                                    smoke_test=smoke_test, smoke_timeout=smoke.DEFAULT_TIMEOUT,
+                                    smoke_threshold=smoke.DEFAULT_THRESHOLD, strict=strict,
+                                    report_file=report_file, verbose=False, watch=False, entry_point=None)
+    recorder = _ForwardingReporter(reporter)
+
+    with cli.use_reporter(recorder):
+        try:
+            success = deploy_module.deploy_project(project_path, deploy_base, parameters)
+        except (OSError, ValueError) as e:
+            raise DeployError(str(e), recorder.errors()) from e
+        duration = tracing.get_tracer().total_time()
+
+    if not success:
+        errors = recorder.errors()
+        raise DeployError(errors[0] if errors else f"{project_path} could not be deployed", errors)
+    project_type = project_type or deploy_module.find_project_type(str(project_path))
+    return DeployResult(project_path=str(project_path), project_type=project_type,
+                        version=deploy_module.get_project_version(project_path, project_type),
+                        deploy_base=str(deploy_base), duration=duration)
+
+
+def list_apps(operational: Optional[bool] = None) -> List[AppInfo]:
+    """
+    Lists the deployed applications, like the completion of 'bipy-gui-manager run'.
+    :param operational: True to list only the operational applications, False only the development ones,
+        None for both.
+    :return: the applications found, sorted by name
+    """
+    apps = []
+    for is_operational in ((True, False) if operational is None else (operational, )):
+        deploy_base = str(get_deploy_base(is_operational))
+        apps += [AppInfo(name=name, deploy_base=deploy_base, operational=is_operational)
+                 for name in run_module.find_apps(deploy_base)]
+    return sorted(apps)
@@ -0,0 +1,157 @@
+"""
+Static shell completion. 'completion install' generates a bash or zsh script listing the subcommands and options
+of the CLI, so that pressing TAB never starts Python. The names of the deployed applications are read by the script
+from the index of each deploy base, which every publish refreshes (see deploy.publish.update_app_index()): it's
+shared by all the users, so it's never stale for anybody.
+"""
+from typing import Dict, List, Sequence
+import os
+import sys
+import logging
+import argparse
+
+import bipy_gui_manager
+from bipy_gui_manager.deploy import publish
+from bipy_gui_manager.utils import cli as cli
+from bipy_gui_manager.utils import fs
+
+PROGRAM = "bipy-gui-manager"
+SHELLS = ("bash", "zsh")
+# The subcommands whose positional argument is the name of a deployed application
+APP_COMMANDS = ("run", "promote", "rollback")
+
+BASH_TEMPLATE = """\
+# {program} completion for bash and zsh. Generated by '{program} completion install': run it again after updating
+# {program} to pick up new commands and options.
+_{function}() {{
+    local cur="${{COMP_WORDS[COMP_CWORD]}}" command="" word words i
+    for ((i = 1; i < COMP_CWORD; i++)); do
+        word="${{COMP_WORDS[i]}}"
+        case "${{command:+$command }}$word" in
+{command_cases}
+        esac
+    done
+    case "$command" in
+{word_cases}
+    esac
+    COMPREPLY=($(compgen -W "$words" -- "$cur"))
+}}
+complete -o default -F _{function} {program}
+"""
+
+ZSH_PREAMBLE = """\
+autoload -U +X compinit && compinit
+autoload -U +X bashcompinit && bashcompinit
+"""
+
+
+def get_app_index_paths() -> List[str]:
+    """ :return: the paths of the indexes of the deployed applications read by the completion scripts """
+    return [publish.get_app_index_path(str(deploy_path))
+            for deploy_path in (bipy_gui_manager.OPERATIONAL_DEPLOY_PATH, bipy_gui_manager.DEVELOPMENT_DEPLOY_PATH)]
+
+
+def create_missing_app_indexes() -> None:
+    """
+    Indexes the deploy bases that nothing was published into since indexes exist, if allowed to: the other ones are
+    kept up to date by publish.
+    """
+    for path in get_app_index_paths():
+        deploy_base = os.path.dirname(path)
+        if os.path.exists(path) or not os.path.isdir(deploy_base):
+            continue
+        try:
+            with fs.locked(publish.get_lock_path(deploy_base)):
+                publish.update_app_index(deploy_base)
+        except OSError as e:
+            # Only the completion is affected, until the next deploy
+            logging.debug(f"Could not create the application index {path}: {e}")
+
+
+def describe_parser(parser: argparse.ArgumentParser, command: str = "") -> Dict[str, List[str]]:
+    """
+    :param parser: the parser of the CLI
+    :param command: the name of the (sub)command that the parser parses, i.e. 'template build'
+    :return: for the command and all its subcommands, the words that can follow them (options and subcommands)
+    """
+    words = []
+    commands = {command: words}
+    for action in parser._actions:
+        if isinstance(action, argparse._SubParsersAction):
+            for name, subparser in action.choices.items():
+                words.append(name)
+                commands.update(describe_parser(subparser, f"{command} {name}".strip()))
+        else:
+            words += action.option_strings
+    return commands
+
+
+def generate_script(parser: argparse.ArgumentParser, shell: str, app_index_paths: Sequence[str]) -> str:
+    """
+    :param parser: the parser of the CLI
+    :param shell: either 'bash' or 'zsh'
+    :param app_index_paths: where the script finds the names of the deployed applications
+    :return: the completion script
+    """
+    if shell not in SHELLS:
+        raise ValueError(f"Shell not supported: {shell}")
+    commands = describe_parser(parser)
+    subcommands = [command for command in commands if command]
+    command_cases = "            {}) command=\"${{command:+$command }}$word\" ;;".format(
+        "|".join(f'"{command}"' for command in subcommands))
+    word_cases = []
+    for command, words in commands.items():
+        case = f'        "{command}") words="{" ".join(words)}"'
+        if command in APP_COMMANDS:
+            # $(< file) is a shell builtin: no process is started
+            for path in app_index_paths:
+                case += f'; [[ -r "{path}" ]] && words="$words $(< "{path}")"'
+        word_cases.append(case + " ;;")
+    script = BASH_TEMPLATE.format(program=PROGRAM, function=PROGRAM.replace("-", "_"),
+                                  command_cases=command_cases, word_cases="\n".join(word_cases))
+    return ZSH_PREAMBLE + script if shell == "zsh" else script
+
+
+def get_script_path(shell: str) -> str:
+    """ :return: where to install the completion script for the given shell """
+    if shell == "bash":
+        # Loaded on demand by bash-completion
+        data_home = os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share"))
+        return os.path.join(data_home, "bash-completion", "completions", PROGRAM)
+    return fs.get_cache_path("completion", f"{PROGRAM}.zsh")
+
+
+def install(parameters: argparse.Namespace, parser: argparse.ArgumentParser):
+    """
+    Script for 'completion install': generates the completion script and installs it (or prints it).
+    :param parameters: the parameters passed through the CLI
+    :param parser: the parser of the CLI
+    :return: None, but installs the completion script
+    """
+    if parameters.verbose:
+        logging.basicConfig(format='[%(levelname)s] %(message)s', level=logging.DEBUG)
+
+    shell = parameters.shell or os.path.basename(os.environ.get("SHELL", "bash"))
+    if shell not in SHELLS:
+        cli.negative_feedback(f"Completion is not available for {shell}: use --shell to pick one of "
+                              f"{', '.join(SHELLS)}.")
+        return
+
+    create_missing_app_indexes()
+    script = generate_script(parser, shell, get_app_index_paths())
+    if parameters.print_script:
+        sys.stdout.write(script)
+        return
+
+    script_path = get_script_path(shell)
+    try:
+        os.makedirs(os.path.dirname(script_path), exist_ok=True)
+        fs.replace_file_content(script_path, script)
+    except OSError as e:
+        logging.debug(e)
+        cli.negative_feedback(f"Could not write the completion script in {script_path}: {e}")
+        return
+    cli.positive_feedback(f"Completion script for {shell} installed in {script_path}")
+    rc_file = "~/.zshrc" if shell == "zsh" else "~/.bashrc (only needed if bash-completion is not installed)"
+    cli.give_hint(f"add 'source {script_path}' to {rc_file}, then open a new terminal. If you used "
+                  f"'register-python-argcomplete {PROGRAM}' so far, remove it.")
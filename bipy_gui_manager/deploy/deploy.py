@@ -1,19 +1,27 @@
+from typing import List, Optional, Union
 import os
+import re
 import logging
 import argparse
 from pathlib import Path
 
 from bipy_gui_manager import OPERATIONAL_DEPLOY_PATH, DEVELOPMENT_DEPLOY_PATH, ACC_PY_PATH
+from bipy_gui_manager.deploy import pipeline, preflight, publish, report, smoke, watch
 from bipy_gui_manager.utils import cli as cli
+from bipy_gui_manager.utils import tracing
 from bipy_gui_manager.utils import version_control as vcs
 
-APP_DEPLOY_SCRIPT = (Path(__file__).parent / "resources" / "app_deploy.sh").absolute()
+BOTH_DECLARATIONS_MESSAGE = "Your application contains both a setup.py and a pyproject.toml file! The setup.py " \
+                            "is going to be ignored and the application is going to be deployed as a ComRAD app."
+# i.e. version="1.2.0" in setup.py, or version = "1.2.0" in pyproject.toml
+VERSION_PATTERN = re.compile(r"""\bversion\s*=\s*['"]([^'"]+)['"]""")
+NAME_PATTERN = re.compile(r"""\bname\s*=\s*['"]([^'"]+)['"]""")
 
 
 def deploy(parameters: argparse.Namespace):
     """
-    Script for the 'BI local deploy' procedure. All it does is to call a small Bash script that
-    installs the given project in a shared folder, where the AppLauncher can find it.
+    Script for the 'BI local deploy' procedure. Runs the deploy pipeline, that installs the given project in a
+    shared folder, where the AppLauncher can find it.
     :param parameters: the parameters passed through the CLI, if any
     :return: None, but deploys the GUI on a BI-owned shared folder.
     """
@@ -26,49 +34,137 @@ def deploy(parameters: argparse.Namespace):
     path = Path(parameters.path).absolute()
     repo_path = OPERATIONAL_DEPLOY_PATH if parameters.operational else DEVELOPMENT_DEPLOY_PATH
 
+    if not parameters.watch:
+        deploy_project(path, repo_path, parameters)
+        return
+
+    checks = preflight.run_preflight(path)
+    if not (checks.is_git and checks.is_python_project):
+        cli.negative_feedback("You are not in a project that can be deployed. Please cd into your expert GUIs "
+                              "folder and run this command again.")
+        return
+    project_type = parameters.project_type or checks.project_type
+    watch.watch_and_deploy(str(path), project_type,
+                           deploy_function=lambda: deploy_project(path, repo_path, parameters, checked=True),
+                           version_getter=get_deploy_version,
+                           is_deployed=lambda version: is_version_deployed(path, project_type, repo_path, version))
+
+
+def deploy_project(path: Path, repo_path: str, parameters: argparse.Namespace, checked: bool = False) -> bool:
+    """
+    Checks that the project can be deployed and runs the deploy pipeline.
+    :param path: the project to deploy
+    :param repo_path: where to deploy it
+    :param parameters: the parameters passed through the CLI
+    :param checked: if True, the project is known to be ready to deploy, so the checks are skipped
+    :return: True if the deploy was successful, False otherwise
+    """
+    tracer = tracing.reset_tracer()
+    project_type = None
+    success = False
+
     try:
-        # Ensures the current project is a releasable project
-        if not vcs.is_git_folder(path) or not is_python_project(path):
-            cli.negative_feedback("You are not in a project that can be deployed. Please cd into your expert GUIs "
-                                  "folder and run this command again.")
-            cli.give_hint("this command checks for the presence of a Git repository and verifies that it "
-                          "contains either:"
-                          "\n             - a setup.py"
-                          "\n             - a folder called 'app' containing your ComRAD app and a 'pyproject.toml'."
-                          "\n            Use `bipy-gui-manager -v deploy [ARGS]` to enable debug messages if needed.")
-            return
-
-        cli.positive_feedback(f"Running checks on {os.path.basename(path)}...", newline=False)
-
-        if not is_ready_to_deploy(path):
-            # The method itself provides feedback on failure already
-            return
-
-        if not parameters.project_type:
-            parameters.project_type = find_project_type(path)
-
-        cli.positive_feedback("The project is ready to deploy")
+        checks = None
+        if not checked:
+            # All the checks run at once: the results are then evaluated one by one
+            checks = preflight.run_preflight(path)
+            if not (checks.is_git and checks.is_python_project):
+                cli.negative_feedback("You are not in a project that can be deployed. Please cd into your expert "
+                                      "GUIs folder and run this command again.")
+                cli.give_hint("this command checks for the presence of a Git repository and verifies that it "
+                              "contains either:"
+                              "\n             - a setup.py"
+                              "\n             - a folder called 'app' containing your ComRAD app and a "
+                              "'pyproject.toml'."
+                              "\n            Use `bipy-gui-manager -v deploy [ARGS]` to enable debug messages if "
+                              "needed.")
+                return False
+
+            if checks.has_setup and checks.has_pyproject:
+                cli.negative_feedback(BOTH_DECLARATIONS_MESSAGE)
+
+            cli.positive_feedback(f"Running checks on {os.path.basename(path)}...", newline=False)
+
+            with tracing.span("readiness checks"):
+                ready = is_ready_to_deploy(path, checks)
+            if not ready:
+                # The method itself provides feedback on failure already
+                return False
+
+            cli.positive_feedback("The project is ready to deploy")
+
+        project_type = parameters.project_type or (checks.project_type if checks else find_project_type(path))
         cli.positive_feedback(f"Deploying {os.path.basename(path)}..", newline=False)
 
-        verbose = "1" if parameters.verbose else "0"
-        bash = f"/bin/bash -c \"{APP_DEPLOY_SCRIPT} {path} {repo_path} {ACC_PY_PATH} {parameters.project_type} " \
-               f"{verbose}\""
-        logging.debug(f"Executing app_deploy.sh: {bash}")
-        error = os.WEXITSTATUS(os.system(bash))
-        if error:
-            cli.negative_feedback(f"Deploy failed: {error}")
+        try:
+            deployments = pipeline.deploy_app(app_path=path, deploy_base=repo_path, acc_py_path=ACC_PY_PATH,
+                                              project_type=project_type, verbose=parameters.verbose,
+                                              relock=parameters.relock,
+                                              optimization_levels=parameters.optimization_levels)
+        except OSError as e:
+            cli.negative_feedback(f"Deploy failed: {e}")
             cli.give_hint("To be able to deploy, you must be in your virtualenv! Type 'source activate.sh' in the "
                           "root of your project if you haven't done so already. If you see errors, do it again on a "
                           "new terminal window.")
             logging.debug("Deploy failed.")
-            return
+            return False
 
         cli.positive_feedback(f"New project {os.path.basename(path)} deployed successfully. "
                               "It should now be available to the AppLauncher.")
+        success = True
+        if parameters.smoke_test:
+            success = run_smoke_tests(str(repo_path), deployments, parameters)
+        return success
     except OSError as e:
         logging.debug(e)
         cli.negative_feedback("Exiting")
-        return
+        return False
+
+    finally:
+        logging.debug("Timings:\n" + tracer.summary())
+        if parameters.report_file:
+            report.write_report(parameters.report_file, tracer,
+                                project=os.path.basename(path),
+                                project_path=str(path),
+                                project_type=project_type,
+                                deploy_base=str(repo_path),
+                                acc_py_path=ACC_PY_PATH,
+                                success=success)
+            cli.positive_feedback(f"Deploy report saved in {parameters.report_file}")
+
+
+def run_smoke_tests(repo_path: str, deployments: List[str], parameters: argparse.Namespace) -> bool:
+    """
+    Launches the versions just deployed headless, to check that they start and that they don't start slower than
+    the previous versions (see smoke.smoke_test()).
+    :param repo_path: where the versions were deployed
+    :param deployments: the versions deployed, as <app>/<version>
+    :param parameters: the parameters passed through the CLI
+    :return: False if any test failed and parameters.strict is set, True otherwise
+    """
+    if not deployments:
+        cli.negative_feedback("No new version was found in the deploy folder: nothing to smoke test.")
+        return not parameters.strict
+
+    cli.positive_feedback("Launching the deployed application headless...", newline=False)
+    passed = True
+    for deployment in deployments:
+        result = smoke.smoke_test(repo_path, deployment, ACC_PY_PATH, timeout=parameters.smoke_timeout,
+                                  threshold=parameters.smoke_threshold)
+        if result.passed:
+            cli.list_subtask(result.message)
+        else:
+            passed = False
+            cli.negative_feedback(f"Smoke test failed: {result.message}.")
+    if passed:
+        cli.positive_feedback("Smoke test passed")
+        return True
+    if parameters.strict:
+        cli.give_hint("the version is deployed nonetheless: deploy a fixed version, or deploy again without "
+                      "--strict to accept it.")
+        return False
+    cli.give_hint("use --strict to make the deploy fail in this case.")
+    return True
 
 
 def is_python_project(path_to_check: str):
@@ -79,9 +175,7 @@ def is_python_project(path_to_check: str):
     if os.path.isdir(path_to_check):
         if os.path.exists(os.path.join(path_to_check, "setup.py")) and \
                 os.path.exists(os.path.join(path_to_check, "app/pyproject.toml")):
-            cli.negative_feedback("Your application contains both a setup.py and a pyproject.toml file! "
-                                  "The setup.py is going to be ignored and the application is going to be "
-                                  "deployed as a ComRAD app.")
+            cli.negative_feedback(BOTH_DECLARATIONS_MESSAGE)
             return True
         if os.path.exists(os.path.join(path_to_check, "setup.py")):
             logging.debug(f"{path_to_check} is a PyQt application.")
@@ -113,26 +207,94 @@ def find_project_type(path_to_check: str):
         return 'pyqt'
 
 
-def is_ready_to_deploy(path_to_check: str):
+def get_project_version(path_to_check: Union[str, Path], project_type: Optional[str]) -> Optional[str]:
+    """
+    Reads the version of the project from its setup.py (PyQt) or app/pyproject.toml (ComRAD), without running them.
+    :param path_to_check: path to the project
+    :param project_type: either 'pyqt' or 'comrad'
+    :return: the version, or None if it's not declared as a plain string
+    """
+    return _read_declaration(path_to_check, project_type, VERSION_PATTERN)
+
+
+def get_project_name(path_to_check: Union[str, Path], project_type: Optional[str]) -> Optional[str]:
+    """
+    Reads the name of the project like its version (see get_project_version()).
+    :param path_to_check: path to the project
+    :param project_type: either 'pyqt' or 'comrad'
+    :return: the name, or None if it's not declared as a plain string
+    """
+    return _read_declaration(path_to_check, project_type, NAME_PATTERN)
+
+
+def _read_declaration(path_to_check: Union[str, Path], project_type: Optional[str], pattern) -> Optional[str]:
+    declaration = os.path.join(str(path_to_check), "app/pyproject.toml" if project_type == "comrad" else "setup.py")
+    try:
+        with open(declaration) as f:
+            match = pattern.search(f.read())
+    except OSError as e:
+        logging.debug(f"Could not read {declaration}: {e}")
+        return None
+    return match.group(1) if match else None
+
+
+def is_version_deployed(path_to_check: Union[str, Path], project_type: Optional[str], repo_path: str,
+                        version: str) -> bool:
+    """
+    :param path_to_check: path to the project
+    :param project_type: either 'pyqt' or 'comrad'
+    :param repo_path: the deploy base
+    :param version: the version of the project
+    :return: True if this version of the project is deployed in repo_path already. False if the name of the project
+        can't be read.
+    """
+    name = get_project_name(path_to_check, project_type)
+    if name is None:
+        return False
+    # The name of the folder can be normalized (PEP 503)
+    candidates = {name, name.lower(), re.sub(r"[-_.]+", "-", name).lower(), re.sub(r"[-_.]+", "_", name).lower()}
+    return any(version in publish.list_versions(str(repo_path), candidate) for candidate in candidates)
+
+
+def get_deploy_version(path_to_check: Union[str, Path], project_type: Optional[str]) -> str:
+    """
+    :param path_to_check: path to the project
+    :param project_type: either 'pyqt' or 'comrad'
+    :return: the version of the project or, if not declared in a readable way, its last commit.
+    :raises OSError if the version is not declared and the project is not a Git repository
+    """
+    version = get_project_version(path_to_check, project_type)
+    if version is None:
+        version = "commit " + vcs.GitSession(path_to_check).rev_parse("HEAD")[0]
+    return version
+
+
+def is_ready_to_deploy(path_to_check: str, checks: Optional[preflight.PreflightResult] = None):
     """
     Make sure that the folder is on master, everything is committed to GitLab and the working directory is clean.
     :param path_to_check: path to the directory to deploy
+    :param checks: the results of the pre-flight checks on the directory, if they were run already
     :return: True if all the checks pass, False otherwise
+    :raises OSError if the directory is not a Git repository
     """
-    branch = vcs.get_git_branch(path_to_check)
+    if checks is None:
+        checks = preflight.run_preflight(path_to_check)
+    if checks.status is None:
+        raise OSError(f"{path_to_check} is not a Git repository")
+    branch = checks.status.branch
     logging.debug(f"Current branch: {branch}")
     if branch != 'master':
         cli.negative_feedback("You are currently not on master. Please switch to master with `git checkout master` "
                               "and retry.")
         return False
 
-    if not vcs.is_git_dir_clean(path_to_check):
+    if checks.status.changes or checks.status.ahead:
         cli.negative_feedback("You have uncommitted and/or unpushed changes in your local directory. "
                               "Please commit and push them, then run this command again. "
                               "Type `git status` to see the changes.")
         return False
 
-    if not vcs.get_remote_url(path_to_check):
+    if not checks.remote_url:
         cli.negative_feedback("This project seems to be not connected to a GitLab repository. Please setup a remote "
                               "for this repository and then run this command again.")
         cli.give_hint("You can link this folder to a GitLab repo in this way:\n"
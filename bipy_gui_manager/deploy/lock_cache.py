@@ -0,0 +1,138 @@
+"""
+Caches the result of 'acc-py app lock', a full dependency resolution, so that it runs again only when the dependency
+declarations of the project or the resolver's configuration change.
+"""
+from typing import Dict, List, Optional, Tuple
+import os
+import sys
+import json
+import shutil
+import hashlib
+import logging
+
+from bipy_gui_manager.utils import fs
+
+# The files declaring the dependencies of a PyQt project, relative to its root
+DEPENDENCY_FILES = ("setup.py", "setup.cfg", "pyproject.toml", os.path.join("deployment", "app", "requirements.txt"))
+# Where the lock writes its results, relative to the root of the project
+LOCK_OUTPUT_FOLDER = "deployment"
+# The configuration of pip, which resolves the dependencies
+PIP_CONFIG_FILES = ("/etc/pip.conf", "~/.pip/pip.conf", "~/.config/pip/pip.conf")
+MANIFEST_NAME = "manifest.json"
+
+
+def compute_key(app_path: str, acc_py: str) -> str:
+    """
+    :param app_path: path to the project
+    :param acc_py: the acc-py executable
+    :return: a hash of everything that can influence the result of the lock: the dependency declarations of the
+        project, pip's configuration, the acc-py executable and the Python version.
+    """
+    key = hashlib.sha256()
+
+    def add(label: str, content: bytes) -> None:
+        key.update(f"{label}:{len(content)}:".encode())
+        key.update(content)
+
+    for relative_path in DEPENDENCY_FILES:
+        add(relative_path, _read(os.path.join(app_path, relative_path)))
+    pip_config_files = [os.path.expanduser(path) for path in PIP_CONFIG_FILES]
+    if os.environ.get("VIRTUAL_ENV"):
+        pip_config_files.append(os.path.join(os.environ["VIRTUAL_ENV"], "pip.conf"))
+    if os.environ.get("PIP_CONFIG_FILE"):
+        pip_config_files.append(os.environ["PIP_CONFIG_FILE"])
+    for path in pip_config_files:
+        add(path, _read(path))
+    for name in sorted(os.environ):
+        if name.startswith("PIP_") or name.startswith("ACC_PY"):
+            add(name, os.environ[name].encode())
+    try:
+        stat = os.stat(acc_py)
+        add("acc-py", f"{os.path.realpath(acc_py)}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    except OSError:
+        add("acc-py", acc_py.encode())
+    add("python", sys.version.encode())
+    return key.hexdigest()
+
+
+def _read(path: str) -> bytes:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return b""
+
+
+def snapshot(app_path: str) -> Dict[str, Tuple[int, int]]:
+    """
+    :param app_path: path to the project
+    :return: the modification time and size of each file where the lock writes its results
+    """
+    result = {}
+    root = os.path.join(app_path, LOCK_OUTPUT_FOLDER)
+    for folder, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(folder, name)
+            stat = os.lstat(path)
+            result[os.path.relpath(path, app_path)] = (stat.st_mtime_ns, stat.st_size)
+    return result
+
+
+def changed_files(before: Dict[str, Tuple[int, int]], after: Dict[str, Tuple[int, int]]) -> List[str]:
+    """
+    :return: the files created or modified between the two snapshots
+    """
+    return sorted(path for path, state in after.items() if before.get(path) != state)
+
+
+def get_entry_path(key: str) -> str:
+    return fs.get_cache_path("locks", key)
+
+
+def restore(key: str, app_path: str) -> Optional[List[str]]:
+    """
+    Copies the results of a previous lock with the same key into the project.
+    :param key: see compute_key()
+    :param app_path: path to the project
+    :return: the files restored, or None if there is no valid entry for this key.
+    """
+    entry = get_entry_path(key)
+    try:
+        with open(os.path.join(entry, MANIFEST_NAME)) as f:
+            files = json.load(f)["files"]
+        for relative_path in files:
+            destination = os.path.join(app_path, relative_path)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copyfile(os.path.join(entry, "files", relative_path), destination)
+    except (OSError, ValueError, KeyError) as e:
+        logging.debug(f"No valid lock cache entry for {key}: {e}")
+        return None
+    logging.debug(f"Restored {files} from the lock cache entry {key}")
+    return files
+
+
+def store(key: str, app_path: str, files: List[str]) -> None:
+    """
+    Saves the results of a lock, so that they can be reused for the same key.
+    :param key: see compute_key()
+    :param app_path: path to the project
+    :param files: the files written by the lock, relative to the project
+    """
+    entry = get_entry_path(key)
+    staging = fs.sibling_path(entry, "staging")
+    try:
+        for relative_path in files:
+            destination = os.path.join(staging, "files", relative_path)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copyfile(os.path.join(app_path, relative_path), destination)
+        os.makedirs(staging, exist_ok=True)
+        with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+            json.dump({"files": files}, f)
+        # Replace the entry atomically, so that a concurrent deploy never sees it half-written
+        shutil.rmtree(entry, ignore_errors=True)
+        fs.publish_tree(staging, entry)
+        logging.debug(f"Stored {files} in the lock cache entry {key}")
+    except OSError as e:
+        # The cache is just an optimization
+        logging.debug(f"Could not store the lock results in the cache: {e}")
+        shutil.rmtree(staging, ignore_errors=True)
@@ -0,0 +1,295 @@
+"""
+The deploy pipeline, stage by stage. Each stage is timed and records the CPU time and peak memory of the
+processes it spawned, so that they can end up in the deploy report.
+"""
+from typing import List, Optional, Sequence, Set, Union
+import os
+import sys
+import glob
+import uuid
+import logging
+from pathlib import Path
+from subprocess import Popen, DEVNULL
+
+from bipy_gui_manager.deploy import lock_cache, publish, requirements
+from bipy_gui_manager.utils import cli as cli
+from bipy_gui_manager.utils import fs, trash, tracing
+from bipy_gui_manager.utils import version_control as vcs
+
+# Compiles the folder given as first argument, as if it was in the folder given as second argument (the path shown
+# in the tracebacks), for the optimization levels given after them (run with the Python of the deployed
+# environment, which might be older than the one running the manager)
+COMPILE_SCRIPT = """
+import sys, compileall, py_compile
+kwargs = {}
+if hasattr(py_compile, "PycInvalidationMode"):
+    kwargs["invalidation_mode"] = py_compile.PycInvalidationMode.UNCHECKED_HASH
+success = True
+for level in sys.argv[3:]:
+    success = compileall.compile_dir(sys.argv[1], ddir=sys.argv[2], quiet=1, workers=0, optimize=int(level),
+                                     force=True, **kwargs) and success
+sys.exit(0 if success else 1)
+"""
+
+
+def run_stage(name: str, command: Sequence[str], cwd: Union[str, Path], verbose: bool,
+              failure_message: str) -> None:
+    """
+    Runs one command of the deploy pipeline, recording its duration and resource usage.
+    :param name: name of the stage, as it will appear in the report
+    :param command: the command to execute, as a list
+    :param cwd: working directory for the command
+    :param verbose: if False, the output of the command is hidden
+    :param failure_message: what to tell the user if the command fails
+    :raises OSError if the command returns a non-zero exit code
+    """
+    logging.debug(f"Running stage '{name}': {' '.join(command)}")
+    output = None if verbose else DEVNULL
+    with tracing.span(name, category="subprocess", command=" ".join(command)) as span:
+        process = Popen(list(command), cwd=cwd, stdout=output, stderr=output)
+        # The usage of this process (and of the processes it waited for) only, unlike getrusage(RUSAGE_CHILDREN),
+        # whose ru_maxrss is a high-water mark over all the children of the manager so far
+        _, status, usage = os.wait4(process.pid, 0)
+        returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        process.returncode = returncode  # Reaped already
+        span.attributes.update(
+            returncode=returncode,
+            child_cpu_user_s=round(usage.ru_utime, 3),
+            child_cpu_system_s=round(usage.ru_stime, 3),
+            child_peak_rss_kb=usage.ru_maxrss,  # In kB on Linux
+        )
+    if returncode:
+        cli.negative_feedback(failure_message)
+        raise OSError(f"Stage '{name}' failed with exit code {returncode}")
+
+
+def apply_pip_workaround(app_path: Union[str, Path]) -> None:
+    """
+    Makes the Kerberos GitLab URLs in deployment/app/requirements.txt usable by pip
+    (https://gitlab.cern.ch:8443 -> https://:@gitlab.cern.ch:8443). The file is not touched if it's up to date.
+    :param app_path: path to the project to deploy (see prepare_build_copy())
+    """
+    requirements_path = Path(app_path) / "deployment" / "app" / "requirements.txt"
+    with tracing.span("pip workaround"):
+        if not requirements_path.exists():
+            logging.debug(f"{requirements_path} does not exist: no pip workaround to apply")
+            return
+        requirements.transform_requirements_file(str(requirements_path))
+
+
+def prepare_build_copy(app_path: Union[str, Path]) -> str:
+    """
+    Makes a copy of the project to deploy, so that the pipeline can modify it (i.e. rewrite its requirements, or
+    lock its dependencies) without touching the developer's working tree.
+    Git projects are cloned locally, which hardlinks the Git objects instead of copying them: as the project was
+    checked to be clean, the clone has exactly the same content.
+    :param app_path: path to the project to deploy
+    :return: the path to the copy. It has the same name as the project.
+    :raises OSError if the copy can't be made
+    """
+    app_path = os.path.abspath(str(app_path))
+    build_path = fs.get_cache_path("builds", uuid.uuid4().hex[:8], os.path.basename(app_path))
+    with tracing.span("build copy"):
+        os.makedirs(os.path.dirname(build_path))
+        if vcs.is_git_folder(app_path):
+            vcs.invoke_git(["clone", "--local", "--quiet", app_path, build_path], cwd=os.path.dirname(build_path),
+                           neg_feedback="Could not make a copy of the project to deploy.")
+            remote_url = vcs.get_remote_url(app_path)
+            if remote_url:
+                # The tools might look at the remote: make the clone point to the same one as the project
+                vcs.invoke_git(["remote", "set-url", "origin", remote_url], cwd=build_path)
+        else:
+            fs.clone_tree(app_path, build_path)
+    logging.debug(f"Build copy of {app_path}: {build_path}")
+    return build_path
+
+
+def deploy_pyqt_app(app_path: Union[str, Path], deploy_base: str, acc_py_path: str, verbose: bool,
+                    relock: bool = False, staging_base: Optional[str] = None) -> None:
+    """
+    Locks the dependencies of a PyQt project and deploys it with acc-py. Everything happens on a copy of the
+    project (see prepare_build_copy()), so its working tree stays clean.
+    The lock is reused from the cache if the dependency declarations did not change since the last one.
+    :param app_path: path to the project to deploy
+    :param deploy_base: where to deploy the application
+    :param acc_py_path: folder containing the acc-py executable
+    :param verbose: whether to show the output of the tools
+    :param relock: if True, the dependencies are locked again even if a cached lock is available
+    :param staging_base: if given, where acc-py actually deploys (see publish.staging())
+    :raises OSError if any stage fails
+    """
+    acc_py = os.path.join(acc_py_path, "acc-py")
+    build_path = prepare_build_copy(app_path)
+    try:
+        if verbose:
+            cli.list_subtask("Apply pip workaround")
+        apply_pip_workaround(build_path)
+
+        cli.list_subtask("Deploying application (can take a few minutes)...")
+        with tracing.span("lock cache lookup"):
+            key = lock_cache.compute_key(build_path, acc_py)
+            restored = None if relock else lock_cache.restore(key, build_path)
+        if restored is not None:
+            cli.list_subtask("Dependencies unchanged since the last lock: reusing it (use --relock to lock again)")
+        else:
+            before = lock_cache.snapshot(build_path)
+            run_stage(name="acc-py app lock",
+                      command=[acc_py, "app", "lock", build_path],
+                      cwd=build_path,
+                      verbose=verbose,
+                      failure_message=f"Dependency lock failed! Please try running 'acc-py app lock {app_path}' "
+                                      f"and check the logs.")
+            with tracing.span("lock cache store"):
+                lock_cache.store(key, build_path, lock_cache.changed_files(before, lock_cache.snapshot(build_path)))
+
+        run_stage(name="acc-py app deploy",
+                  command=[acc_py, "app", "deploy", "--deploy-base", staging_base or deploy_base, build_path],
+                  cwd=build_path,
+                  verbose=verbose,
+                  failure_message=f"Deployment failed! Please try running 'acc-py app deploy --deploy-base "
+                                  f"{deploy_base} {app_path}' and check the logs. If you are deploying a new "
+                                  f"version, make sure you increased the version number (re-deploy is not allowed)")
+    finally:
+        trash.discard(os.path.dirname(build_path))
+
+
+def deploy_comrad_app(app_path: Union[str, Path], deploy_base: str, acc_py_path: str, verbose: bool,
+                      staging_base: Optional[str] = None) -> None:
+    """
+    Packages a ComRAD project, builds its wheel and deploys it with acc-py.
+    :param app_path: path to the project to deploy
+    :param deploy_base: where to deploy the application
+    :param acc_py_path: folder containing the acc-py executable
+    :param verbose: whether to show the output of the tools
+    :param staging_base: if given, where acc-py actually deploys (see publish.staging())
+    :raises OSError if any stage fails
+    """
+    acc_py = os.path.join(acc_py_path, "acc-py")
+    app_folder = os.path.join(str(app_path), "app")
+
+    run_stage(name="comrad package",
+              command=["comrad", "package", "app/main.py"],
+              cwd=app_path,
+              verbose=True,
+              failure_message="Failed to launch 'comrad package'. Make sure your virtualenv is active before "
+                              "proceeding and that you have ComRAD installed.")
+
+    cli.list_subtask("Deploying application (this step may take several minutes)...")
+    run_stage(name="pip wheel",
+              command=["pip", "wheel", "-w", app_folder, "--no-deps", app_folder],
+              cwd=app_path,
+              verbose=verbose,
+              failure_message=f"Wheel generation failed! Please try running 'pip wheel -w {app_folder} --no-deps "
+                              f"{app_folder}' and check the logs.")
+
+    wheels = find_wheels(app_folder)
+    run_stage(name="acc-py app deploy",
+              command=[acc_py, "app", "deploy", "--deploy-base", staging_base or deploy_base] + wheels,
+              cwd=app_path,
+              verbose=verbose,
+              failure_message=f"Deployment failed! Please try running 'acc-py app deploy --deploy-base {deploy_base} "
+                              f"{app_folder}/*.whl' and check the logs. If you are deploying a new version, make sure "
+                              f"you increased the version number (re-deploy is not allowed). If you have many .whl "
+                              f"files, try deleting them all and repeating this command.")
+    for wheel in wheels:
+        os.remove(wheel)
+
+
+def list_deployments(deploy_base: str) -> Set[str]:
+    """
+    :param deploy_base: where the applications are deployed
+    :return: the folders of all the deployed versions (<deploy_base>/<app>/<version>), relative to deploy_base
+    """
+    deployments = set()
+    try:
+        with os.scandir(deploy_base) as apps:
+            for app in apps:
+                if app.is_dir() and not app.name.startswith("."):
+                    with os.scandir(app.path) as versions:
+                        # Not the '.current' pointers (see publish.set_current())
+                        deployments.update(os.path.join(app.name, version.name) for version in versions
+                                           if version.is_dir(follow_symlinks=False)
+                                           and not version.name.startswith("."))
+    except OSError as e:
+        logging.debug(f"Could not list the deployments in {deploy_base}: {e}")
+    return deployments
+
+
+def find_python(folder: str) -> str:
+    """
+    :param folder: a deployed version of an application
+    :return: the interpreter of its environment, so that the bytecode matches the Python version that will run it.
+        The current interpreter if none is found.
+    """
+    for root, dirs, _ in os.walk(folder):
+        if root[len(folder):].count(os.sep) >= 3:
+            dirs.clear()
+        for name in ("python3", "python"):
+            candidate = os.path.join(root, "bin", name)
+            if os.access(candidate, os.X_OK):
+                return candidate
+    return sys.executable
+
+
+def compile_deployment(folder: str, optimization_levels: Sequence[int], verbose: bool,
+                       final_folder: Optional[str] = None) -> None:
+    """
+    Compiles all the Python sources of a deployment, in parallel, so that the users launching it never need to
+    (and would not be able to, if the folder is read-only for them).
+    The .pyc files are based on unchecked hashes rather than timestamps: they are reproducible and they stay valid
+    when the files are copied. The ones pip wrote while installing are compiled again, to get these properties and
+    the final path in their tracebacks. A failure only means that some files are compiled on the fly at runtime.
+    :param folder: the deployed version
+    :param optimization_levels: for which optimization levels to compile the sources (0, 1 for -O, 2 for -OO)
+    :param verbose: whether to show the output of the compilation
+    :param final_folder: where the deployment will be published, if it's still being staged (see publish)
+    """
+    try:
+        run_stage(name="compileall",
+                  command=[find_python(folder), "-c", COMPILE_SCRIPT, folder, final_folder or folder] +
+                          [str(level) for level in optimization_levels],
+                  cwd=folder,
+                  verbose=verbose,
+                  failure_message=f"Some files of {folder} could not be compiled: they will be compiled when "
+                                  f"the application starts.")
+    except OSError as e:
+        logging.debug(e)
+
+
+def find_wheels(folder: Union[str, Path]) -> List[str]:
+    """
+    :param folder: where to look for wheels
+    :return: the paths of all the wheels found in the folder
+    """
+    return sorted(glob.glob(os.path.join(str(folder), "*.whl")))
+
+
+def deploy_app(app_path: Union[str, Path], deploy_base: str, acc_py_path: str, project_type: Optional[str],
+               verbose: bool, relock: bool = False, optimization_levels: Sequence[int] = (0, )) -> List[str]:
+    """
+    Runs the deploy pipeline for the given project type. acc-py deploys into a staging folder, and the new versions
+    are published into the deploy base once complete (see publish).
+    :param app_path: path to the project to deploy
+    :param deploy_base: where to deploy the application
+    :param acc_py_path: folder containing the acc-py executable
+    :param project_type: either 'pyqt' or 'comrad'
+    :param verbose: whether to show the output of the tools
+    :param relock: for PyQt projects, whether to lock the dependencies again even if a cached lock is available
+    :param optimization_levels: the optimization levels to precompile the deployed sources for (see
+        compile_deployment()). Nothing is precompiled if empty.
+    :return: the versions deployed, as <app>/<version> (see list_deployments())
+    :raises OSError if any stage fails
+    """
+    with publish.staging(deploy_base) as staging_base:
+        if project_type == "pyqt":
+            deploy_pyqt_app(app_path, deploy_base, acc_py_path, verbose, relock=relock, staging_base=staging_base)
+        else:
+            deploy_comrad_app(app_path, deploy_base, acc_py_path, verbose, staging_base=staging_base)
+        deployments = sorted(list_deployments(staging_base))
+        if optimization_levels:
+            for deployment in deployments:
+                cli.list_subtask(f"Compiling {deployment}")
+                compile_deployment(os.path.join(staging_base, deployment), optimization_levels, verbose,
+                                   final_folder=os.path.join(deploy_base, deployment))
+        publish.publish(staging_base, deploy_base, deployments)
+    return deployments
@@ -0,0 +1,75 @@
+"""
+The checks done before deploying. They are independent from each other (looking for the project files, asking
+Git for the status of the repository and for its remote), so they run in parallel, and each of them runs only once:
+the results are shared by everything that needs them (the deployability check, the readiness check and the
+detection of the project type).
+"""
+from typing import Callable, Dict, NamedTuple, Optional, Union
+import os
+import time
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from bipy_gui_manager.utils import tracing
+from bipy_gui_manager.utils import version_control as vcs
+
+
+class PreflightResult(NamedTuple):
+    has_setup: bool  # setup.py: a PyQt project
+    has_pyproject: bool  # app/pyproject.toml: a ComRAD project
+    status: Optional[vcs.RepoStatus]  # None if the folder is not a Git repository
+    remote_url: Optional[str]
+    elapsed: float  # Wall time taken by all the checks, in seconds
+
+    @property
+    def is_git(self) -> bool:
+        return self.status is not None
+
+    @property
+    def is_python_project(self) -> bool:
+        return self.has_setup or self.has_pyproject
+
+    @property
+    def project_type(self) -> Optional[str]:
+        """ 'comrad' or 'pyqt' (like deploy.find_project_type()), or None if it's not a Python project """
+        if self.has_pyproject:
+            return "comrad"
+        if self.has_setup:
+            return "pyqt"
+        return None
+
+
+def _get_status(path: str) -> Optional[vcs.RepoStatus]:
+    try:
+        return vcs.GitSession(path).status()
+    except OSError as e:
+        logging.debug(f"{path} is NOT a Git repository: {e}")
+        return None
+
+
+def run_preflight(path: Union[str, Path]) -> PreflightResult:
+    """
+    Runs all the pre-flight checks on the project in parallel.
+    :param path: the project to check
+    :return: the results of the checks
+    """
+    path = str(path)
+    checks = {
+        "has_setup": lambda: os.path.exists(os.path.join(path, "setup.py")),
+        "has_pyproject": lambda: os.path.exists(os.path.join(path, "app", "pyproject.toml")),
+        "status": lambda: _get_status(path),
+        "remote_url": lambda: vcs.get_remote_url(path),
+    }  # type: Dict[str, Callable[[], object]]
+
+    with tracing.span("pre-flight checks") as span:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+            futures = {name: pool.submit(check) for name, check in checks.items()}
+            results = {name: future.result() for name, future in futures.items()}
+        elapsed = time.perf_counter() - start
+        span.attributes["elapsed_ms"] = round(elapsed * 1000, 1)
+
+    result = PreflightResult(elapsed=elapsed, **results)
+    logging.debug(f"Pre-flight checks took {elapsed * 1000:.1f} ms: {result}")
+    return result
@@ -0,0 +1,413 @@
+"""
+Publishing into the deploy base. acc-py deploys into a hidden staging folder inside the deploy base, then each
+new version is moved into place with a single rename, under an advisory lock shared by all the deployers. This way
+the users launching applications (who never take the lock, so never wait) and the other deployers never see a
+half-written version: a version folder either does not exist or is complete.
+
+The files acc-py keeps next to the versions of an application (its description of the versions deployed) are copied
+into the staging folder first, so that acc-py updates them, and they are replaced when the new version is published.
+A staging folder is locked while in use: the ones left behind by a crashed deploy are discarded by the next deploy,
+or by 'gc'.
+
+Each application has a hidden '.current' symlink next to its versions, pointing to the version to launch (see
+run.run): hidden like everything else of the manager, so that acc-py and the AppLauncher don't take it for a version.
+Publishing a version makes it current; 'rollback' and 'promote' (see deploy.release) switch it atomically too.
+
+Before being published, the files of a new version are linked into the store of the deploy base (see deploy.store),
+so that the files identical to the ones of the versions deployed before take no space.
+
+Publishing also refreshes the index of the applications of the deploy base ('.apps', one name per line), read by
+the completion scripts of all the users (see completion.completion).
+
+The hidden entries of the deploy base (staging folders, the lock, the store, the index) are ignored by everything
+listing the apps.
+"""
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import os
+import re
+import json
+import time
+import shutil
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from bipy_gui_manager.deploy import store
+from bipy_gui_manager.utils import fs, trash, tracing
+
+LOCK_NAME = ".bipy-gui-manager.lock"
+STAGING_PREFIX = ".deploy.staging-"  # See create_staging_base()
+STAGING_LOCK_NAME = ".lock"
+SEEDS_NAME = ".seeds.json"
+STALE_STAGING_AGE = 24 * 3600  # In seconds: for the staging folders that were never locked
+CURRENT_NAME = ".current"
+APP_INDEX_NAME = ".apps"  # See update_app_index()
+# The files that can contain the absolute path of a virtualenv (apart from compiled files, see relocate())
+RELOCATED_NAMES = ("pyvenv.cfg", "direct_url.json")
+RELOCATED_SUFFIXES = (".pth", ".egg-link")
+RELOCATE_MAX_SIZE = 1024 * 1024
+
+
+def get_lock_path(deploy_base: str) -> str:
+    """ :return: the lock taken to publish into the deploy base """
+    return os.path.join(deploy_base, LOCK_NAME)
+
+
+def create_staging_base(deploy_base: str) -> str:
+    """
+    :param deploy_base: where the application will be published
+    :return: a new hidden folder in the deploy base (so on the same filesystem), to deploy into
+    """
+    staging_base = fs.sibling_path(os.path.join(os.path.abspath(deploy_base), "deploy"), "staging")
+    os.makedirs(staging_base)
+    logging.debug(f"Staging deploy base: {staging_base}")
+    _seed_app_files(deploy_base, staging_base)
+    return staging_base
+
+
+def _seed_app_files(deploy_base: str, staging_base: str) -> None:
+    """
+    Copies the files found next to the versions of each application into the staging folder, recording their size
+    and mtime, to find out at publish time whether another deploy changed them meanwhile (see publish()).
+    """
+    seeds = {}
+    with os.scandir(deploy_base) as apps:
+        for app in apps:
+            if not app.is_dir(follow_symlinks=False) or app.name.startswith("."):
+                continue
+            with os.scandir(app.path) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False) and not entry.name.startswith("."):
+                        stat = entry.stat(follow_symlinks=False)
+                        os.makedirs(os.path.join(staging_base, app.name), exist_ok=True)
+                        shutil.copy2(entry.path, os.path.join(staging_base, app.name, entry.name))
+                        seeds[os.path.join(app.name, entry.name)] = [stat.st_size, stat.st_mtime_ns]
+    with open(os.path.join(staging_base, SEEDS_NAME), "w") as f:
+        json.dump(seeds, f)
+
+
+def _load_seeds(staging_base: str) -> Dict[str, List[int]]:
+    try:
+        with open(os.path.join(staging_base, SEEDS_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def find_stale_staging(deploy_base: str) -> List[str]:
+    """
+    :param deploy_base: the deploy base to look into
+    :return: the staging folders left behind by the deploys that crashed: their lock is not held anymore (see
+        staging()), or they never had one and are old
+    """
+    try:
+        with os.scandir(deploy_base) as entries:
+            candidates = [entry.path for entry in entries
+                          if entry.name.startswith(STAGING_PREFIX) and entry.is_dir(follow_symlinks=False)]
+    except OSError as e:
+        logging.debug(f"Could not list the staging folders of {deploy_base}: {e}")
+        return []
+    stale = []
+    for path in candidates:
+        lock_path = os.path.join(path, STAGING_LOCK_NAME)
+        try:
+            if os.path.exists(lock_path):
+                with fs.locked(lock_path, blocking=False):
+                    pass
+            elif time.time() - os.stat(path).st_mtime < STALE_STAGING_AGE:
+                continue
+        except OSError as e:
+            logging.debug(f"{path} is in use: {e}")
+            continue
+        stale.append(path)
+    return stale
+
+
+def discard_stale_staging(deploy_base: str) -> List[str]:
+    """
+    Discards the staging folders left behind by the deploys that crashed (see find_stale_staging()).
+    :param deploy_base: the deploy base to clean up
+    :return: the folders discarded
+    """
+    discarded = []
+    for path in find_stale_staging(deploy_base):
+        try:
+            trash.discard(path)
+            discarded.append(path)
+        except OSError as e:
+            logging.debug(f"Could not discard {path}: {e}")
+    return discarded
+
+
+@contextmanager
+def staging(deploy_base: str) -> Iterator[str]:
+    """
+    Provides a staging folder in the deploy base (see create_staging_base()) for the time of the context, then
+    discards it. It's locked meanwhile, so that the other deployers know it's in use.
+    :param deploy_base: where the application will be published
+    """
+    discard_stale_staging(deploy_base)
+    staging_base = create_staging_base(deploy_base)
+    try:
+        with fs.locked(os.path.join(staging_base, STAGING_LOCK_NAME)):
+            yield staging_base
+    finally:
+        trash.discard(staging_base)
+
+
+def _is_in_bin(path: str) -> bool:
+    return os.path.basename(os.path.dirname(path)) == "bin"
+
+
+def _needs_relocation(path: str) -> bool:
+    name = os.path.basename(path)
+    return _is_in_bin(path) or name in RELOCATED_NAMES or name.endswith(RELOCATED_SUFFIXES)
+
+
+def _is_script(path: str, content: bytes) -> bool:
+    """
+    :return: True if the file is a text script (see run.mirror._fix_script()), not i.e. a compiled program. The
+        activate scripts of the virtualenv have no shebang, as they are sourced.
+    """
+    return (content.startswith(b"#!") or os.path.basename(path).startswith("activate")) and b"\0" not in content
+
+
+def relocate(folder: str, old_base: str, new_base: str) -> List[str]:
+    """
+    Replaces the paths under old_base by the same paths under new_base in the files of a virtualenv that contain
+    absolute paths (the scripts in bin/, pyvenv.cfg, .pth files...). The compiled files are not concerned: they are
+    compiled with their final path (see pipeline.compile_deployment()). The other files of bin/ (i.e. executables)
+    are left alone: the paths have different lengths, so replacing them would move everything after them.
+    :param folder: the folder to fix
+    :param old_base: where the folder was built
+    :param new_base: where it's going to be moved
+    :return: the files changed
+    """
+    old, new = old_base.encode(), new_base.encode()
+    changed = []
+    for root, _, names in os.walk(folder):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.islink(path) or not _needs_relocation(path) or os.path.getsize(path) > RELOCATE_MAX_SIZE:
+                continue
+            with open(path, "rb") as f:
+                content = f.read()
+            if old in content and _is_in_bin(path) and not _is_script(path, content):
+                logging.debug(f"Not relocating {path}: it's not a script")
+            elif old in content:
+                # Replaced rather than written in place: the file might be a hardlink (see release.promote())
+                temporary = fs.sibling_path(path, "relocating")
+                with open(temporary, "wb") as f:
+                    f.write(content.replace(old, new))
+                shutil.copymode(path, temporary)
+                os.replace(temporary, path)
+                changed.append(path)
+    logging.debug(f"Relocated {len(changed)} files of {folder} from {old_base} to {new_base}")
+    return changed
+
+
+def version_key(version: str) -> Tuple:
+    """ :return: a sorting key ordering versions naturally (1.10 after 1.9) """
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"[.\-_+]", version))
+
+
+def list_versions(deploy_base: str, app: str) -> List[str]:
+    """
+    :param deploy_base: where the application is deployed
+    :param app: the name of the application
+    :return: the versions deployed, oldest first. Empty if the application is not deployed.
+    """
+    try:
+        with os.scandir(os.path.join(deploy_base, app)) as entries:
+            versions = [entry.name for entry in entries
+                        if entry.is_dir(follow_symlinks=False) and not entry.name.startswith(".")]
+    except OSError as e:
+        logging.debug(f"Could not list the versions of {app} in {deploy_base}: {e}")
+        return []
+    return sorted(versions, key=version_key)
+
+
+def get_current(deploy_base: str, app: str) -> Optional[str]:
+    """
+    :param deploy_base: where the application is deployed
+    :param app: the name of the application
+    :return: the version the '.current' pointer of the application points to, or None if it has none (or if the
+        version does not exist anymore)
+    """
+    pointer = os.path.join(deploy_base, app, CURRENT_NAME)
+    try:
+        version = os.path.basename(os.readlink(pointer))
+    except OSError:
+        return None
+    return version if os.path.isdir(os.path.join(deploy_base, app, version)) else None
+
+
+def set_current(deploy_base: str, app: str, version: str) -> None:
+    """
+    Points the '.current' pointer of the application to a version, atomically: who reads it sees either the old
+    version or the new one. Call with the lock of the deploy base held (see get_lock_path()).
+    :param deploy_base: where the application is deployed
+    :param app: the name of the application
+    :param version: the version to make current. Must be deployed.
+    :raises ValueError if the version is not deployed
+    """
+    if not os.path.isdir(os.path.join(deploy_base, app, version)) or version.startswith(".") or \
+            version == CURRENT_NAME:
+        raise ValueError(f"Version {version} of {app} is not deployed in {deploy_base}")
+    pointer = os.path.join(deploy_base, app, CURRENT_NAME)
+    temporary = fs.sibling_path(pointer, "switching")
+    os.symlink(version, temporary)  # Relative, so that the deploy base can be mounted anywhere
+    os.replace(temporary, pointer)
+    logging.debug(f"{app} {version} is now current in {deploy_base}")
+
+
+def get_app_index_path(deploy_base: str) -> str:
+    """ :return: the index of the applications of the deploy base (see update_app_index()) """
+    return os.path.join(deploy_base, APP_INDEX_NAME)
+
+
+def update_app_index(deploy_base: str) -> None:
+    """
+    Rewrites the index of the applications of the deploy base, if it changed. It's readable by everybody, as the
+    completion scripts of all the users read it. Call with the lock of the deploy base held (see get_lock_path()).
+    :param deploy_base: the deploy base to index
+    :raises OSError if the index could not be written
+    """
+    with os.scandir(deploy_base) as entries:
+        apps = sorted(entry.name for entry in entries
+                      if entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."))
+    content = "".join(f"{app}\n" for app in apps)
+    path = get_app_index_path(deploy_base)
+    try:
+        with open(path) as f:
+            if f.read() == content:
+                return
+    except OSError:
+        pass
+    fs.replace_file_content(path, content)
+    os.chmod(path, 0o644)
+    logging.debug(f"Updated the application index {path}")
+
+
+def _fsync(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_tree(path: str) -> None:
+    """ Flushes all the files and folders of a tree to disk, in parallel """
+    entries = []
+    for root, _, names in os.walk(path):
+        entries.append(root)
+        entries += [os.path.join(root, name) for name in names if not os.path.islink(os.path.join(root, name))]
+    with ThreadPoolExecutor(max_workers=fs.default_workers()) as pool:
+        list(pool.map(_fsync, entries, chunksize=64))
+
+
+def publish(staging_base: str, deploy_base: str, deployments: Sequence[str], built_in: Optional[str] = None) -> None:
+    """
+    Moves the versions deployed in the staging folder into the deploy base, and makes them current. Their files
+    are linked into the store of the deploy base first (see store.link_tree()).
+    :param staging_base: the staging folder (see create_staging_base())
+    :param deploy_base: where to publish the versions
+    :param deployments: the versions to publish, as <app>/<version> (see pipeline.list_deployments())
+    :param built_in: the deploy base the versions were built for, if not the staging folder (i.e. when promoting)
+    :raises OSError if a version exists already in the deploy base (it would not be complete while replaced), or if
+        another deploy changed the files of the application since the staging folder was created
+    """
+    staging_base, deploy_base = os.path.abspath(staging_base), os.path.abspath(deploy_base)
+    with tracing.span("publish", deployments=len(deployments)):
+        for deployment in deployments:
+            relocate(os.path.join(staging_base, deployment), os.path.abspath(built_in or staging_base), deploy_base)
+        apps = sorted({os.path.dirname(deployment) for deployment in deployments})
+        for app in apps:
+            _relocate_app_files(staging_base, app, os.path.abspath(built_in or staging_base), deploy_base)
+        for deployment in deployments:
+            try:
+                with tracing.span("dedupe", deployment=deployment):
+                    store.link_tree(deploy_base, os.path.join(staging_base, deployment))
+            except OSError as e:
+                # The version just takes more space
+                logging.debug(f"Could not link {deployment} into the store: {e}")
+        fsync_tree(staging_base)
+
+        with fs.locked(get_lock_path(deploy_base)):
+            for deployment in deployments:
+                if os.path.lexists(os.path.join(deploy_base, deployment)):
+                    raise OSError(f"{deployment} is deployed already in {deploy_base}: re-deploy is not allowed, "
+                                  f"increase the version number")
+            seeds = _load_seeds(staging_base)
+            for app in apps:
+                _check_app_files(staging_base, deploy_base, app, seeds)
+            for app in apps:
+                _publish_app_files(staging_base, deploy_base, app)
+            for deployment in deployments:
+                logging.debug(f"Publishing {deployment} in {deploy_base}")
+                os.rename(os.path.join(staging_base, deployment), os.path.join(deploy_base, deployment))
+            for app in apps:
+                set_current(deploy_base, app, max((os.path.basename(deployment) for deployment in deployments
+                                                   if os.path.dirname(deployment) == app), key=version_key))
+                _fsync(os.path.join(deploy_base, app))
+            update_app_index(deploy_base)
+
+
+def _list_app_files(staging_base: str, app: str) -> List[os.DirEntry]:
+    with os.scandir(os.path.join(staging_base, app)) as entries:
+        return [entry for entry in entries
+                if not entry.is_dir(follow_symlinks=False) and not entry.name.startswith(".")]
+
+
+def _relocate_app_files(staging_base: str, app: str, old_base: str, new_base: str) -> None:
+    """ Replaces the paths under old_base by the ones under new_base in the files written by acc-py for the app """
+    for entry in _list_app_files(staging_base, app):
+        if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_size <= RELOCATE_MAX_SIZE:
+            with open(entry.path, "rb") as f:
+                content = f.read()
+            if old_base.encode() in content:
+                with open(entry.path, "wb") as f:
+                    f.write(content.replace(old_base.encode(), new_base.encode()))
+
+
+def _check_app_files(staging_base: str, deploy_base: str, app: str, seeds: Dict[str, List[int]]) -> None:
+    """
+    :raises OSError if a file of the application was changed in the deploy base since it was copied into the
+        staging folder (see _seed_app_files()): replacing it would lose the changes of the other deploy
+    """
+    for entry in _list_app_files(staging_base, app):
+        destination = os.path.join(deploy_base, app, entry.name)
+        if entry.is_symlink() or not os.path.lexists(destination):
+            continue
+        stat = os.lstat(destination)
+        if seeds.get(os.path.join(app, entry.name)) != [stat.st_size, stat.st_mtime_ns] and \
+                not _same_content(entry.path, destination):
+            raise OSError(f"{destination} was changed by another deploy of {app} in the meantime: deploy again")
+
+
+def _same_content(path: str, other_path: str) -> bool:
+    with open(path, "rb") as f, open(other_path, "rb") as other:
+        return f.read() == other.read()
+
+
+def _publish_app_files(staging_base: str, deploy_base: str, app: str) -> None:
+    """
+    Creates the folder of the application in the deploy base if needed, and replaces the files that acc-py wrote
+    next to the versions by the ones of the staging folder, that describe the new versions too.
+    """
+    app_path = os.path.join(deploy_base, app)
+    os.makedirs(app_path, exist_ok=True)
+    for entry in _list_app_files(staging_base, app):
+        destination = os.path.join(app_path, entry.name)
+        if entry.is_symlink():
+            if os.path.lexists(destination):
+                continue
+            temporary = fs.sibling_path(destination, "publishing")
+            os.symlink(os.readlink(entry.path), temporary)
+        else:
+            if os.path.lexists(destination) and _same_content(entry.path, destination):
+                continue
+            temporary = fs.sibling_path(destination, "publishing")
+            shutil.copy2(entry.path, temporary)
+        os.replace(temporary, destination)
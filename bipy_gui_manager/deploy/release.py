@@ -0,0 +1,122 @@
+"""
+Promotion and rollback of deployed versions, without rebuilding anything: both only switch the '.current' pointer
+of the application (see publish.set_current()). Promotion first brings the version from the development deploy
+base into the operational one, hardlinking its files (so it takes no space and no time on the same filesystem).
+"""
+from typing import Optional, Tuple
+import os
+import logging
+import argparse
+
+from bipy_gui_manager import OPERATIONAL_DEPLOY_PATH, DEVELOPMENT_DEPLOY_PATH
+from bipy_gui_manager.deploy import publish
+from bipy_gui_manager.utils import cli as cli
+from bipy_gui_manager.utils import fs, tracing
+
+
+def promote_version(app: str, version: Optional[str] = None, source_base: Optional[str] = None,
+                    target_base: Optional[str] = None) -> str:
+    """
+    Makes a version deployed in source_base the current one in target_base.
+    :param app: the name of the application
+    :param version: the version to promote. Defaults to the current one in source_base, or the latest one.
+    :param source_base: where the version is deployed. Defaults to the development deploy base.
+    :param target_base: where to promote it. Defaults to the operational deploy base.
+    :return: the version promoted
+    :raises ValueError if the version is not deployed in source_base
+    :raises OSError if it could not be copied
+    """
+    source_base = str(source_base or DEVELOPMENT_DEPLOY_PATH)
+    target_base = str(target_base or OPERATIONAL_DEPLOY_PATH)
+    versions = publish.list_versions(source_base, app)
+    version = version or publish.get_current(source_base, app) or (versions[-1] if versions else None)
+    if version is None:
+        raise ValueError(f"{app} is not deployed in {source_base}")
+    if version not in versions:
+        raise ValueError(f"Version {version} of {app} is not deployed in {source_base}")
+
+    deployment = os.path.join(app, version)
+    if os.path.isdir(os.path.join(target_base, deployment)):
+        logging.debug(f"{deployment} is in {target_base} already: only switching the pointer")
+        with fs.locked(publish.get_lock_path(target_base)):
+            publish.set_current(target_base, app, version)
+        return version
+
+    with publish.staging(target_base) as staging_base:
+        with tracing.span("promote copy"):
+            # The symlinks of the virtualenv (i.e. bin/python) stay symlinks
+            fs.clone_tree(os.path.join(source_base, deployment), os.path.join(staging_base, deployment),
+                          mode="hardlink", symlinks=True)
+            with os.scandir(os.path.join(source_base, app)) as entries:
+                for entry in entries:
+                    destination = os.path.join(staging_base, app, entry.name)
+                    # The ones of target_base (see publish.create_staging_base()) describe its versions
+                    if entry.is_file(follow_symlinks=False) and not entry.name.startswith(".") and \
+                            not os.path.lexists(destination):
+                        fs.copy_file(entry.path, destination)
+        # The compiled files keep the development path in their tracebacks: the sources are the same
+        publish.publish(staging_base, target_base, [deployment], built_in=source_base)
+    return version
+
+
+def rollback_version(deploy_base: str, app: str, version: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Makes another version of the application current.
+    :param deploy_base: where the application is deployed
+    :param app: the name of the application
+    :param version: the version to go back to. Defaults to the one before the current one.
+    :return: the version that was current, and the one that is current now
+    :raises ValueError if there is no such version
+    """
+    with fs.locked(publish.get_lock_path(deploy_base)):
+        versions = publish.list_versions(deploy_base, app)
+        if not versions:
+            raise ValueError(f"{app} is not deployed in {deploy_base}")
+        current = publish.get_current(deploy_base, app) or versions[-1]
+        if version is None:
+            older = [other for other in versions if publish.version_key(other) < publish.version_key(current)]
+            if not older:
+                raise ValueError(f"There is no version of {app} older than {current}")
+            version = older[-1]
+        elif version not in versions:
+            raise ValueError(f"Version {version} of {app} is not deployed. Versions available: "
+                             f"{', '.join(versions)}")
+        publish.set_current(deploy_base, app, version)
+    return current, version
+
+
+def promote(parameters: argparse.Namespace):
+    """
+    Script for 'promote': makes a development version of an application the operational one.
+    :param parameters: the parameters passed through the CLI
+    :return: None, but the version is the current one in the operational deploy base
+    """
+    if parameters.verbose:
+        logging.basicConfig(format='[%(levelname)s] %(message)s', level=logging.DEBUG)
+    try:
+        version = promote_version(parameters.app, parameters.version)
+    except (OSError, ValueError) as e:
+        logging.debug(e)
+        cli.negative_feedback(f"Promotion failed: {e}")
+        return
+    cli.positive_feedback(f"{parameters.app} {version} is now the operational version.")
+
+
+def rollback(parameters: argparse.Namespace):
+    """
+    Script for 'rollback': goes back to another deployed version of an application.
+    :param parameters: the parameters passed through the CLI
+    :return: None, but the version is the current one
+    """
+    if parameters.verbose:
+        logging.basicConfig(format='[%(levelname)s] %(message)s', level=logging.DEBUG)
+    deploy_base = str(OPERATIONAL_DEPLOY_PATH if parameters.operational else DEVELOPMENT_DEPLOY_PATH)
+    try:
+        previous, version = rollback_version(deploy_base, parameters.app, parameters.version)
+    except (OSError, ValueError) as e:
+        logging.debug(e)
+        cli.negative_feedback(f"Rollback failed: {e}")
+        return
+    cli.positive_feedback(f"{parameters.app} is back to version {version} (was {previous}).")
+    cli.give_hint(f"'bipy-gui-manager rollback {'-o' if parameters.operational else '-d'} {parameters.app} "
+                  f"--to {previous}' undoes this.")
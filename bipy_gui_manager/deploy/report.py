@@ -0,0 +1,56 @@
+from typing import Any, Dict
+import json
+import time
+import socket
+import logging
+import platform
+
+from bipy_gui_manager.utils.tracing import Tracer
+
+
+REPORT_FORMAT_VERSION = 1
+
+
+def build_report(tracer: Tracer, **metadata) -> Dict[str, Any]:
+    """
+    Collects the timings of all the stages traced during a deploy into a JSON-serializable dictionary.
+    :param tracer: the tracer that recorded the deploy
+    :param metadata: any additional information to store in the report (project name, type, deploy base...)
+    :return: the report
+    """
+    stages = []
+    for span in sorted(tracer.spans, key=lambda s: s.start):
+        stage = {
+            "name": span.name,
+            "category": span.category,
+            "depth": span.depth,
+            "start_s": round(span.start - tracer.origin, 6),
+            "duration_s": round(span.duration, 6),
+        }
+        stage.update(span.attributes)
+        if span.error:
+            stage["error"] = span.error
+        stages.append(stage)
+
+    report = {
+        "format_version": REPORT_FORMAT_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": socket.gethostname(),
+        "python": platform.python_version(),
+        "total_s": round(tracer.total_time(), 6),
+    }
+    report.update(metadata)
+    report["stages"] = stages
+    return report
+
+
+def write_report(path: str, tracer: Tracer, **metadata) -> None:
+    """
+    Saves the deploy report as JSON. See build_report().
+    :param path: where to save the report
+    :param tracer: the tracer that recorded the deploy
+    :param metadata: any additional information to store in the report
+    """
+    logging.debug(f"Writing deploy report to {path}")
+    with open(path, "w") as f:
+        json.dump(build_report(tracer, **metadata), f, indent=2, default=str)
@@ -0,0 +1,76 @@
+"""
+Transforms the requirements of a project before they are given to pip, i.e. to make the Kerberos GitLab URLs usable.
+The rewrites are idempotent: transforming requirements that were already transformed changes nothing.
+"""
+from typing import List, NamedTuple, Pattern, Tuple
+import re
+import logging
+
+from bipy_gui_manager.utils import fs
+
+# (pattern, replacement) applied to the requirement part of each line, in order
+URL_REWRITES = [
+    # pip can't authenticate on https://gitlab.cern.ch:8443 unless the (empty) credentials are explicit
+    (re.compile(r"://gitlab\.cern\.ch:8443"), "://:@gitlab.cern.ch:8443"),
+]  # type: List[Tuple[Pattern, str]]
+
+# A comment starts with a # at the beginning of the line or after a whitespace (a # in a URL is a fragment)
+COMMENT_PATTERN = re.compile(r"(^|\s+)#")
+
+
+class RequirementLine(NamedTuple):
+    requirement: str  # i.e. 'numpy>=1.0', 'git+https://...', '-r other.txt'. Might be empty.
+    comment: str  # Everything from the comment marker on, including the whitespace before it, or ''
+    ending: str  # The line ending, or '' for the last line
+
+
+def parse_requirements(content: str) -> List[RequirementLine]:
+    """
+    :param content: the content of a requirements file
+    :return: its lines, split so that the original content can be rebuilt exactly from them
+    """
+    lines = []
+    for line in content.splitlines(keepends=True):
+        body = line.rstrip("\r\n")
+        ending = line[len(body):]
+        match = COMMENT_PATTERN.search(body)
+        split = match.start() if match else len(body)
+        lines.append(RequirementLine(requirement=body[:split], comment=body[split:], ending=ending))
+    return lines
+
+
+def rewrite_requirement(requirement: str) -> str:
+    """
+    :param requirement: a requirement, without comments
+    :return: the requirement with all the URL_REWRITES applied
+    """
+    for pattern, replacement in URL_REWRITES:
+        requirement = pattern.sub(replacement, requirement)
+    return requirement
+
+
+def transform_requirements(content: str) -> str:
+    """
+    :param content: the content of a requirements file
+    :return: the content with all the requirements rewritten. Comments are left untouched.
+    """
+    return "".join(rewrite_requirement(line.requirement) + line.comment + line.ending
+                   for line in parse_requirements(content))
+
+
+def transform_requirements_file(path: str) -> bool:
+    """
+    Transforms a requirements file in place, without touching it if it's up to date already.
+    :param path: the requirements file
+    :return: True if the file was modified, False if it was up to date
+    :raises OSError if the file can't be read or written
+    """
+    with open(path) as f:
+        content = f.read()
+    transformed = transform_requirements(content)
+    if transformed == content:
+        logging.debug(f"{path} needs no transformation")
+        return False
+    fs.replace_file_content(path, transformed)
+    logging.debug(f"Transformed the requirements in {path}")
+    return True
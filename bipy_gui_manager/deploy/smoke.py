@@ -0,0 +1,135 @@
+"""
+Post-deploy smoke test: launches the version just deployed without a display (Qt's offscreen platform), waits for
+the first iteration of its event loop (see run.startup), then closes it. The time it took is compared with the one
+measured for the previous version, to catch the changes that make the application slower to start.
+
+The report of each version is kept with it, in the deploy base ('<app>/.<version>.smoke.json', hidden like the
+other files of the manager): the previous version is the baseline whoever deployed it.
+"""
+from typing import Any, Dict, NamedTuple, Optional
+import os
+import json
+import glob
+import logging
+
+from bipy_gui_manager.deploy import publish
+from bipy_gui_manager.deploy.publish import version_key
+from bipy_gui_manager.run import startup
+from bipy_gui_manager.run.run import APP_RUN_SCRIPT, get_version_view
+from bipy_gui_manager.utils import fs, tracing
+
+REPORT_SUFFIX = ".smoke.json"
+HEADLESS_ENVIRONMENT = {"QT_QPA_PLATFORM": "offscreen"}
+DEFAULT_TIMEOUT = 60.0  # In seconds
+DEFAULT_THRESHOLD = 20.0  # Slowdown tolerated before reporting a regression, in percent
+
+
+class SmokeResult(NamedTuple):
+    app: str
+    version: str
+    started: bool  # Whether the event loop of the application started
+    startup_seconds: Optional[float]
+    baseline_version: Optional[str]  # The version compared with, if any was measured
+    baseline_seconds: Optional[float]
+    regression: bool  # Whether the version starts slower than the baseline, beyond the threshold
+    message: str
+
+    @property
+    def passed(self) -> bool:
+        return self.started and not self.regression
+
+
+def get_report_path(deploy_base: str, app: str, version: str) -> str:
+    """ :return: where the headless startup report of a deployed version is kept (see save_report()) """
+    return os.path.join(deploy_base, app, f".{version}{REPORT_SUFFIX}")
+
+
+def save_report(deploy_base: str, report: Dict[str, Any]) -> str:
+    """
+    Keeps the headless startup report of a version next to it, for the smoke tests of the next versions, whoever
+    deploys them. It's readable by everybody.
+    :param deploy_base: where the version is deployed
+    :param report: the report (see startup.build_report())
+    :return: the path of the report
+    """
+    path = get_report_path(deploy_base, report["app"], report["version"])
+    with fs.locked(publish.get_lock_path(deploy_base)):
+        fs.replace_file_content(path, json.dumps(report, indent=2))
+        os.chmod(path, 0o644)
+    return path
+
+
+def find_baseline(deploy_base: str, app: str, version: str) -> Optional[Dict[str, Any]]:
+    """
+    :param deploy_base: where the application is deployed
+    :param app: the name of the application
+    :param version: the version being tested
+    :return: the headless startup report of the latest version before this one, if any was measured
+    """
+    previous = []
+    for path in glob.glob(os.path.join(glob.escape(os.path.join(deploy_base, app)), f".*{REPORT_SUFFIX}")):
+        try:
+            with open(path) as f:
+                report = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.debug(f"Invalid startup report {path}: {e}")
+            continue
+        if report.get("startup_seconds") is not None and report.get("version") and \
+                version_key(report["version"]) < version_key(version):
+            previous.append(report)
+    return max(previous, key=lambda report: version_key(report["version"])) if previous else None
+
+
+def smoke_test(deploy_base: str, deployment: str, acc_py_path: str, timeout: float = DEFAULT_TIMEOUT,
+               threshold: float = DEFAULT_THRESHOLD) -> SmokeResult:
+    """
+    Launches a deployed version headless and checks that it starts, and that it does not start slower than the
+    previous version.
+    :param deploy_base: where the application is deployed
+    :param deployment: the version to test, as <app>/<version> (see pipeline.list_deployments())
+    :param acc_py_path: folder containing the acc-py executable
+    :param timeout: how long the application has to start, in seconds
+    :param threshold: how much slower than the previous version (in percent) the version can start
+    :return: the outcome of the test
+    """
+    app, version = os.path.split(deployment)
+    with tracing.span("smoke test", app=app, version=version) as span:
+        try:
+            # Through a view of the deploy base, so that acc-py can't pick another version
+            command = ["/bin/bash", str(APP_RUN_SCRIPT), app, get_version_view(deploy_base, app, version),
+                       str(acc_py_path)]
+            result = startup.launch(command, timeout=timeout, env=HEADLESS_ENVIRONMENT)
+        except OSError as e:
+            logging.debug(e)
+            return SmokeResult(app, version, False, None, None, None, False, f"{app} could not be launched: {e}")
+        report = startup.build_report(app, startup.find_version(deploy_base, app, result.probes) or version,
+                                      result, headless=True)
+        span.attributes["startup_seconds"] = report["startup_seconds"]
+
+    if report["version"] != version:
+        return SmokeResult(app, version, False, None, None, None, False,
+                           f"acc-py launched version {report['version']} of {app} instead of {version}")
+    if report["startup_seconds"] is None:
+        if result.returncode is None:
+            message = f"{app} {version} did not start within {timeout:.0f}s"
+        else:
+            message = f"{app} {version} exited before starting (exit code {result.returncode})"
+        return SmokeResult(app, version, False, None, None, None, False, message)
+
+    try:
+        save_report(deploy_base, report)
+    except OSError as e:
+        logging.debug(f"Could not save the startup report: {e}")
+    seconds = report["startup_seconds"]
+    baseline = find_baseline(deploy_base, app, version)
+    if baseline is None:
+        return SmokeResult(app, version, True, seconds, None, None, False,
+                           f"{app} {version} started in {seconds:.2f}s (no previous version measured)")
+    baseline_seconds = baseline["startup_seconds"]
+    slowdown = (seconds / baseline_seconds - 1) * 100 if baseline_seconds else 0.0
+    regression = slowdown > threshold
+    message = f"{app} {version} started in {seconds:.2f}s, {slowdown:+.0f}% compared to {baseline['version']} " \
+              f"({baseline_seconds:.2f}s)"
+    if regression:
+        message += f": more than the {threshold:.0f}% tolerated"
+    return SmokeResult(app, version, True, seconds, baseline["version"], baseline_seconds, regression, message)
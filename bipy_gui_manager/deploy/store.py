@@ -0,0 +1,143 @@
+"""
+Content-addressed store of a deploy base: every version of every application carries its own virtualenv, with the
+same PyQt, numpy, accwidgets... The store keeps one file per content (.store/objects/<sha256>-<mode>), and the
+files of the versions are hardlinks to it (see utils.cas), so identical files take space (and page cache) once. Its
+folders are writable by their group, so that all the deployers can add objects.
+
+New versions are linked into the store when they are published (see publish.publish()), the versions deployed
+before can be linked with 'dedupe'. A file is replaced by its hardlink with a rename, so anybody reading it sees
+either the old file or the new one, which have the same content.
+
+The deployed files are never written in place (see publish.relocate()), so sharing them is safe. The sources of
+precompiled files are the exception: a hardlink has the mtime of the object, so the sources whose .pyc files are
+validated by mtime are left alone, or Python would consider their .pyc outdated.
+"""
+from typing import FrozenSet, NamedTuple, Optional, Tuple
+import os
+import stat
+import glob
+import errno
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from bipy_gui_manager.utils import cas, fs
+
+STORE_NAME = ".store"
+# Errors that only prevent a file from being linked: read-only folder, too many links to the object...
+_SKIPPED_ERRORS = {errno.EACCES, errno.EPERM, errno.EROFS, errno.EMLINK, errno.EXDEV, errno.ENOENT}
+
+
+class DedupeResult(NamedTuple):
+    files: int  # Files read
+    linked: int  # Files replaced by a link to the store
+    saved: int  # Bytes freed by the links
+    skipped: int  # Files that could not be linked
+
+
+def get_store_path(deploy_base: str, *subfolders: str) -> str:
+    """
+    :param deploy_base: the deploy base the store belongs to
+    :param subfolders: the subfolders to append to the path of the store
+    :return: where the store is: a hidden folder of the deploy base, so on the same filesystem
+    """
+    return os.path.join(deploy_base, STORE_NAME, *subfolders)
+
+
+def _has_timestamp_pyc(path: str) -> bool:
+    """ :return: True if path is a source with a .pyc file validated by the mtime of the source """
+    folder, name = os.path.split(path)
+    for pyc in glob.glob(os.path.join(folder, "__pycache__", glob.escape(name[:-len(".py")]) + ".*.pyc")):
+        try:
+            with open(pyc, "rb") as f:
+                header = f.read(8)
+        except OSError:
+            continue
+        # Since Python 3.7, the second word of the header holds flags: 0 means validated by timestamp (PEP 552)
+        if len(header) == 8 and int.from_bytes(header[4:8], "little") & 0b1 == 0:
+            return True
+    return False
+
+
+def link_file(deploy_base: str, path: str) -> int:
+    """
+    Replaces a file by a hardlink to the object of the store with the same content, or adds it to the store if
+    there is no such object yet.
+    :param deploy_base: the deploy base the file is in
+    :param path: the file to link
+    :return: how many bytes were freed: the size of the file if it was replaced, otherwise 0
+    :raises OSError if the file could not be read or linked
+    """
+    file_stat = os.lstat(path)
+    objects_path = get_store_path(deploy_base, "objects")
+    name = cas.get_object_name(cas.hash_file(path), file_stat.st_mode)
+    try:
+        object_stat = os.stat(os.path.join(objects_path, name))
+    except FileNotFoundError:
+        temporary = cas.get_temporary_path(objects_path, shared=True)
+        os.link(path, temporary)
+        cas.insert(objects_path, temporary, name, shared=True)
+        return 0
+    if os.path.samestat(object_stat, file_stat):
+        return 0
+    temporary = fs.sibling_path(path, "dedupe")
+    os.link(os.path.join(objects_path, name), temporary)
+    try:
+        os.replace(temporary, path)
+    except OSError:
+        os.remove(temporary)
+        raise
+    return file_stat.st_size
+
+
+def get_object_inodes(deploy_base: str) -> FrozenSet[Tuple[int, int]]:
+    """ :return: the (device, inode) of the objects in the store: the files with these are linked already """
+    return cas.list_inodes(get_store_path(deploy_base, "objects"))
+
+
+def link_tree(deploy_base: str, folder: str, known_inodes: FrozenSet[Tuple[int, int]] = frozenset(),
+              workers: Optional[int] = None) -> DedupeResult:
+    """
+    Links all the files of a folder into the store, in parallel.
+    :param deploy_base: the deploy base the folder is in
+    :param folder: the folder, i.e. a version of an application
+    :param known_inodes: the inodes of the objects (see get_object_inodes()): these files are not read again
+    :param workers: how many files to process in parallel
+    :return: what was done
+    """
+    files = []
+    for root, _, names in os.walk(folder):
+        for name in names:
+            path = os.path.join(root, name)
+            file_stat = os.lstat(path)
+            # Empty files are not worth a link each: there are thousands of empty __init__.py
+            if stat.S_ISREG(file_stat.st_mode) and file_stat.st_size > 0 and \
+                    (file_stat.st_dev, file_stat.st_ino) not in known_inodes:
+                files.append(path)
+
+    def link(path: str) -> Tuple[int, bool]:
+        if path.endswith(".py") and _has_timestamp_pyc(path):
+            return 0, False
+        try:
+            return link_file(deploy_base, path), True
+        except OSError as e:
+            if e.errno not in _SKIPPED_ERRORS:
+                raise
+            logging.debug(f"Could not link {path} into the store: {e}")
+            return 0, False
+
+    with ThreadPoolExecutor(max_workers=workers or fs.default_workers()) as pool:
+        results = list(pool.map(link, files, chunksize=16))
+    saved = [size for size, _ in results if size]
+    result = DedupeResult(len(files), len(saved), sum(saved), sum(1 for _, done in results if not done))
+    logging.debug(f"Linked {result.linked} of the {result.files} files of {folder} into the store "
+                  f"({result.saved} bytes freed, {result.skipped} skipped)")
+    return result
+
+
+def collect_garbage(deploy_base: str) -> int:
+    """
+    Removes the objects that no version uses anymore (i.e. the versions were deleted).
+    :param deploy_base: the deploy base the store belongs to
+    :return: how many bytes were freed
+    """
+    return cas.collect_garbage(get_store_path(deploy_base, "objects"))
@@ -0,0 +1,166 @@
+"""
+'deploy --watch': keeps the readiness of a project up to date while the developer works on it, re-running only the
+checks affected by each change, and deploys it as soon as it's ready with a version that was not deployed yet.
+"""
+from typing import Callable, Dict, List, Optional, Set
+import os
+import logging
+
+from bipy_gui_manager.utils import cli as cli
+from bipy_gui_manager.utils import version_control as vcs
+from bipy_gui_manager.utils.watch import create_watcher, EVERYTHING
+
+CHECKS = ("branch", "remote", "clean", "version")
+# Folders whose content can't affect the readiness of a project (or is ignored by Git anyway)
+EXCLUDED_FOLDERS = {"venv", ".venv", "__pycache__", "build", "dist", "node_modules", ".pytest_cache", ".mypy_cache",
+                    ".tox", ".idea"}
+# What's worth watching in .git (HEAD, index, config and packed-refs are directly in it)
+WATCHED_GIT_FOLDERS = {"refs"}
+
+
+def is_excluded(relative_folder: str) -> bool:
+    """
+    :param relative_folder: a folder, relative to the root of the project
+    :return: True if changes in this folder can't affect the readiness of the project
+    """
+    parts = relative_folder.split(os.sep)
+    if parts[0] == ".git":
+        return len(parts) > 1 and parts[1] not in WATCHED_GIT_FOLDERS
+    return parts[-1] in EXCLUDED_FOLDERS or parts[-1].endswith(".egg-info")
+
+
+def checks_invalidated_by(relative_path: str) -> Set[str]:
+    """
+    :param relative_path: something that changed, relative to the root of the project
+    :return: the checks whose result might have changed because of it
+    """
+    parts = relative_path.split(os.sep)
+    if relative_path == EVERYTHING or relative_path == ".git":
+        return set(CHECKS)
+    if parts[0] != ".git":
+        # Any change in the working tree can make it dirty (or clean), or change the version
+        return {"clean", "version"}
+    if parts[1] == "HEAD":
+        return {"branch", "clean", "version"}
+    if parts[1] == "config":
+        return {"remote", "clean"}
+    if parts[1] in ("index", "packed-refs", "refs"):
+        return {"clean", "version"}
+    return set()
+
+
+class ReadinessState:
+    """
+    The result of the checks done before deploying (see deploy.is_ready_to_deploy()), each one cached until
+    invalidated.
+    """
+
+    def __init__(self, path: str, project_type: Optional[str], version_getter: Callable[[str, Optional[str]], str]):
+        """
+        :param path: the project
+        :param project_type: either 'pyqt' or 'comrad'
+        :param version_getter: returns the version of the project, given its path and type
+        """
+        self.path = path
+        self.project_type = project_type
+        self.version_getter = version_getter
+        self.results = {}  # type: Dict[str, object]
+        self._runners = {
+            "branch": lambda: vcs.get_git_branch(self.path),
+            "remote": lambda: vcs.get_remote_url(self.path),
+            "clean": lambda: vcs.is_git_dir_clean(self.path),
+            "version": lambda: self.version_getter(self.path, self.project_type),
+        }
+
+    def invalidate(self, changes: Set[str]) -> None:
+        """
+        :param changes: the paths that changed, relative to the project
+        """
+        for change in changes:
+            for check in checks_invalidated_by(change):
+                self.results.pop(check, None)
+
+    def refresh(self) -> List[str]:
+        """
+        Re-runs the checks that were invalidated.
+        :return: the names of the checks that were run
+        """
+        run = [check for check in CHECKS if check not in self.results]
+        for check in run:
+            try:
+                self.results[check] = self._runners[check]()
+            except (OSError, ValueError) as e:
+                logging.debug(f"Check '{check}' failed: {e}")
+                self.results[check] = e
+        if run:
+            logging.debug(f"Re-ran the checks {run}: {self.results}")
+        return run
+
+    @property
+    def version(self) -> Optional[str]:
+        version = self.results.get("version")
+        return version if isinstance(version, str) else None
+
+    def problems(self) -> List[str]:
+        """
+        :return: the reasons why the project can't be deployed, empty if it's ready.
+        """
+        problems = []
+        if self.results.get("branch") != "master":
+            problems.append("not on master")
+        if self.results.get("clean") is not True:
+            problems.append("uncommitted and/or unpushed changes")
+        if not isinstance(self.results.get("remote"), str):
+            problems.append("no remote")
+        if self.version is None:
+            problems.append("version not found")
+        return problems
+
+
+def watch_and_deploy(path: str, project_type: Optional[str], deploy_function: Callable[[], bool],
+                     version_getter: Callable[[str, Optional[str]], str], watcher=None, debounce: float = 0.5,
+                     stop: Callable[[], bool] = lambda: False,
+                     is_deployed: Callable[[str], bool] = lambda version: False) -> None:
+    """
+    Watches the project and deploys it every time it becomes ready to deploy with a new version.
+    :param path: the project
+    :param project_type: either 'pyqt' or 'comrad'
+    :param deploy_function: deploys the project, returns True if successful
+    :param version_getter: returns the version of the project, given its path and type
+    :param watcher: what reports the changes (see utils.watch). Watches path if not given.
+    :param debounce: how long to wait for more changes after one is detected, in seconds
+    :param stop: called before every check: if it returns True, the watch stops
+    :param is_deployed: returns True if the given version is deployed already (i.e. before the watch started)
+    """
+    state = ReadinessState(path, project_type, version_getter)
+    attempted = set()  # Versions deployed (or that failed to), as re-deploying a version is not allowed
+    last_message = None
+
+    with watcher or create_watcher(path, exclude=is_excluded) as watcher:
+        cli.positive_feedback(f"Watching {path} for changes. Press Ctrl+C to stop.")
+        while not stop():
+            state.refresh()
+            problems = state.problems()
+            if problems:
+                message = "Not ready to deploy: {}".format(", ".join(problems))
+            elif state.version in attempted or is_deployed(state.version):
+                attempted.add(state.version)
+                message = f"Version {state.version} was deployed already: waiting for a new version"
+            else:
+                attempted.add(state.version)
+                cli.positive_feedback(f"Version {state.version} is ready: deploying it")
+                deploy_function()
+                message = None
+            if message and message != last_message:
+                cli.list_subtask(message)
+            last_message = message
+
+            changes = watcher.wait(timeout=1.0)
+            if changes:
+                # Let the burst of changes (i.e. a commit) settle
+                more_changes = watcher.wait(timeout=debounce)
+                while more_changes:
+                    changes |= more_changes
+                    more_changes = watcher.wait(timeout=debounce)
+                logging.debug(f"Changed: {sorted(changes)}")
+                state.invalidate(changes)
@@ -10,7 +10,13 @@ import argcomplete
 from bipy_gui_manager.utils import cli as cli
 from bipy_gui_manager.new.new_project import new_project
 from bipy_gui_manager.deploy.deploy import deploy
+from bipy_gui_manager.deploy.smoke import DEFAULT_TIMEOUT as DEFAULT_SMOKE_TIMEOUT, \
+    DEFAULT_THRESHOLD as DEFAULT_SMOKE_THRESHOLD
+from bipy_gui_manager.deploy.release import promote, rollback
 from bipy_gui_manager.run.run import run, get_runnable_apps_for_argcomplete
+from bipy_gui_manager.template.template import build as build_template
+from bipy_gui_manager.maintenance.maintenance import gc, dedupe
+from bipy_gui_manager.completion.completion import install as install_completion, SHELLS
 
 
 # Gracefully handle Ctrl+C and other kill signals
@@ -28,6 +34,18 @@ def main():
     """
     This function acts mainly as a frontend for the different subcommands.
     """
+    parser = build_parser()
+
+    # Parse and call relevant subcommand
+    argcomplete.autocomplete(parser)
+    arguments = parser.parse_args(args=None if sys.argv[1:] else ['--help'])
+    arguments.func(arguments)  # Necessary for the subparsers
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    :return: the parser of the CLI, with all the subcommands
+    """
     parser = argparse.ArgumentParser(epilog=f"type '{os.path.basename(sys.argv[0])} "
                                             f"<command> --help' to learn more about their options.")
     parser.add_argument('-v', '--verbose', dest='verbose', action='store_true',
@@ -86,12 +104,35 @@ def main():
                                     help="[DEBUG] Copy the template from a custom location on the filesystem. "
                                          "NOTE: further customizations might break if the template does not correspond "
                                          "to the default one.")
+    new_project_parser.add_argument('--template-pack', dest='template_pack', default=None,
+                                    help="[DEBUG] Extract the template from a template pack (see 'template build').")
+    new_project_parser.add_argument('--template-clone-mode', dest='template_clone_mode', default='auto',
+                                    choices=('auto', 'reflink', 'hardlink', 'copy'),
+                                    help="[DEBUG] How to copy the template given with --template-path. 'auto' uses "
+                                         "copy-on-write clones where the filesystem supports them and a parallel "
+                                         "copy otherwise. 'hardlink' is the fastest, but files edited in place later "
+                                         "will change in the template too.")
+    new_project_parser.add_argument('--push-compression', dest='push_compression', default=None, type=int,
+                                    choices=range(-1, 10), metavar='{-1..9}',
+                                    help="Compression level of the first upload to GitLab (Git's core.compression). "
+                                         "Lower it to upload large projects faster on fast networks.")
+    new_project_parser.add_argument('--push-threads', dest='push_threads', default=None, type=int,
+                                    help="How many threads Git can use to compress the first upload to GitLab "
+                                         "(Git's pack.threads, 0 means one per CPU).")
     new_project_parser.add_argument('--template-url', dest='template_url',
                                     help="[DEBUG] Copy the template from a custom URL."
                                          "NOTE: further customizations might break if the template does not correspond "
                                          "to the default one.")
+    new_project_parser.add_argument('--resume', dest='resume', default=None, metavar='PATH',
+                                    help="Continue the creation of the project in PATH from the step that failed, "
+                                         "reusing the information given and the GitLab repository created by the "
+                                         "failed attempt.")
     new_project_parser.add_argument('--crash', dest='crash', action='store_true',
                                     help="[DEBUG] Do not try to recover from errors.")
+    new_project_parser.add_argument('--trace', dest='trace_file', default=None, metavar='FILE',
+                                    help="Print a summary of the time spent in each step at the end, and save a "
+                                         "detailed trace in FILE (Chrome trace format, open it in chrome://tracing "
+                                         "or https://ui.perfetto.dev).")
 
     # Separate parser for duplicate flags
     # (https://stackoverflow.com/questions/7498595/python-argparse-add-argument-to-multiple-subparsers)
@@ -119,6 +160,32 @@ def main():
     deploy_parser.add_argument('--entry-point', dest='entry_point', default=None, type=str,
                                help="The entry point name. This parameter is required only if the entry point name "
                                     "differs from the project name.")
+    deploy_parser.add_argument('--relock', dest='relock', action='store_true',
+                               help="Resolve the dependencies again even if they did not change since the last "
+                                    "deploy (PyQt projects only).")
+    deploy_parser.add_argument('--compile-optimize', dest='optimization_levels', type=int, nargs='*', default=[0],
+                               choices=(0, 1, 2), metavar='LEVEL',
+                               help="The optimization levels to precompile the deployed Python files for: 0 (the "
+                                    "default), 1 (python -O), 2 (python -OO). Pass no level to skip precompiling.")
+    deploy_parser.add_argument('--smoke-test', dest='smoke_test', action='store_true',
+                               help="After deploying, launch the app headless to check that it starts, and compare "
+                                    "its startup time with the one of the previous version.")
+    deploy_parser.add_argument('--smoke-timeout', dest='smoke_timeout', type=float, default=DEFAULT_SMOKE_TIMEOUT,
+                               metavar='SECONDS',
+                               help=f"How long the app has to start during the smoke test. Defaults to "
+                                    f"{DEFAULT_SMOKE_TIMEOUT:.0f}s.")
+    deploy_parser.add_argument('--smoke-threshold', dest='smoke_threshold', type=float,
+                               default=DEFAULT_SMOKE_THRESHOLD, metavar='PERCENT',
+                               help=f"How much slower than the previous version the app can start before the smoke "
+                                    f"test reports a regression. Defaults to {DEFAULT_SMOKE_THRESHOLD:.0f}%%.")
+    deploy_parser.add_argument('--strict', dest='strict', action='store_true',
+                               help="Fail if the smoke test fails or reports a regression.")
+    deploy_parser.add_argument('--watch', dest='watch', action='store_true',
+                               help="Keep watching the project and deploy it automatically every time it's ready "
+                                    "(on master, clean, pushed) with a version that was not deployed yet.")
+    deploy_parser.add_argument('--report', dest='report_file', default=None, metavar='FILE',
+                               help="Save a JSON report in FILE with the duration, CPU time and peak memory usage of "
+                                    "each stage of the deploy.")
 
     # 'run' subcommand
 
@@ -128,9 +195,77 @@ def main():
     run_parser.add_argument('app', nargs='?', metavar="APP_NAME",
                             choices=get_runnable_apps_for_argcomplete(),
                             help="Name of the deployed app to run.")
+    run_parser.add_argument('--profile-startup', dest='profile_startup', action='store_true',
+                            help="Measure how long the app takes to start (import times and time until its window "
+                                 "is ready), then close it. The report is saved to compare versions.")
+    run_parser.add_argument('--cprofile', dest='cprofile', action='store_true',
+                            help="With --profile-startup, also profile the startup with cProfile.")
+    run_parser.add_argument('--local-mirror', dest='local_mirror', action='store_true',
+                            help="Copy the app on the local disk (once per version) and launch it from there, "
+                                 "to avoid reading its files over the network at every launch.")
 
-    # Parse and call relevant subcommand
-    argcomplete.autocomplete(parser)
-    argcomplete.autocomplete(op_dev_parser)
-    arguments = parser.parse_args(args=None if sys.argv[1:] else ['--help'])
-    arguments.func(arguments)  # Necessary for the subparsers
+    # 'promote' subcommand
+    promote_parser = subparsers.add_parser('promote', help="Makes a version deployed for development the operational "
+                                                           "one, without rebuilding it.")
+    promote_parser.set_defaults(func=promote)
+    promote_parser.add_argument('app', metavar="APP_NAME", help="Name of the deployed app to promote.")
+    promote_parser.add_argument('--version', dest='version', default=None,
+                                help="The version to promote. Defaults to the current development version.")
+
+    # 'rollback' subcommand
+    rollback_parser = subparsers.add_parser('rollback', parents=[op_dev_parser],
+                                            help="Makes 'run' launch another deployed version of the app (by default "
+                                                 "the one before the current one).")
+    rollback_parser.set_defaults(func=rollback)
+    rollback_parser.add_argument('app', metavar="APP_NAME", help="Name of the deployed app to roll back.")
+    rollback_parser.add_argument('--to', dest='version', default=None,
+                                 help="The version to go back to. Defaults to the one before the current one.")
+
+    # 'template' subcommand
+    template_parser = subparsers.add_parser('template', help="Tools to manage the project templates.")
+    template_parser.set_defaults(func=lambda _: template_parser.print_help())
+    template_subparsers = template_parser.add_subparsers()
+    template_build_parser = template_subparsers.add_parser('build',
+                                                           help="Builds a template pack (to use with "
+                                                                "'new --template-pack') out of a template folder.")
+    template_build_parser.set_defaults(func=build_template)
+    template_build_parser.add_argument('template_path', metavar='TEMPLATE_PATH',
+                                       help="Path to the template folder.")
+    template_build_parser.add_argument('--output', '-o', dest='output', default=None,
+                                       help="Where to save the template pack. "
+                                            "Defaults to <name>-<version>.tar.gz in the current directory.")
+    template_build_parser.add_argument('--name', dest='name', default=None,
+                                       help="Name of the template. Defaults to the name of the template folder.")
+    template_build_parser.add_argument('--version', dest='version', default=None,
+                                       help="Version of the template. Defaults to the output of 'git describe' if the "
+                                            "template is a Git repository.")
+
+    # 'gc' subcommand
+    gc_parser = subparsers.add_parser('gc', help="Deletes what was left in the trash by interrupted cleanups "
+                                                 "(overwritten projects, failed installations).")
+    gc_parser.set_defaults(func=gc)
+    gc_parser.add_argument('--dry-run', dest='dry_run', action='store_true',
+                           help="Only list what would be deleted.")
+
+    # 'dedupe' subcommand
+    dedupe_parser = subparsers.add_parser('dedupe', parents=[op_dev_parser],
+                                          help="Hardlinks the files that are identical across the deployed versions "
+                                               "of the apps, so that they take space once.")
+    dedupe_parser.set_defaults(func=dedupe)
+    dedupe_parser.add_argument('--workers', dest='workers', type=int, default=None,
+                               help="How many files to read in parallel.")
+
+    # 'completion' subcommand
+    completion_parser = subparsers.add_parser('completion', help="Tools to set up the completion of the commands "
+                                                                 "in the shell.")
+    completion_parser.set_defaults(func=lambda _: completion_parser.print_help())
+    completion_subparsers = completion_parser.add_subparsers()
+    completion_install_parser = completion_subparsers.add_parser('install',
+                                                                 help="Installs a completion script that does not "
+                                                                      "need to start Python on every TAB press.")
+    completion_install_parser.set_defaults(func=lambda arguments: install_completion(arguments, parser))
+    completion_install_parser.add_argument('--shell', dest='shell', default=None, choices=SHELLS,
+                                           help="The shell to generate the script for. Defaults to the current one.")
+    completion_install_parser.add_argument('--print', dest='print_script', action='store_true',
+                                           help="Print the script instead of installing it.")
+    return parser
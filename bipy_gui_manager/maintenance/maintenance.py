@@ -0,0 +1,80 @@
+import os
+import logging
+import argparse
+
+from bipy_gui_manager import OPERATIONAL_DEPLOY_PATH, DEVELOPMENT_DEPLOY_PATH
+from bipy_gui_manager.deploy import pipeline, publish, store
+from bipy_gui_manager.utils import cli as cli
+from bipy_gui_manager.utils import trash, tracing
+
+
+def gc(parameters: argparse.Namespace):
+    """
+    Purges what the background deletions left in the trash (i.e. if they were interrupted by a reboot), and the
+    staging folders left in the deploy bases by the deploys that crashed.
+    :param parameters: the parameters passed through the CLI
+    :return: None, but empties the trash folders of the current user.
+    """
+    if parameters.verbose:
+        logging.basicConfig(format='[%(levelname)s] %(message)s', level=logging.DEBUG)
+
+    leftovers = trash.list_trash()
+    for deploy_base in sorted({str(OPERATIONAL_DEPLOY_PATH), str(DEVELOPMENT_DEPLOY_PATH)}):
+        leftovers += publish.find_stale_staging(deploy_base)
+    if not leftovers:
+        cli.positive_feedback("Nothing to clean up.")
+        return
+
+    for path in leftovers:
+        cli.list_subtask(f"{'Would delete' if parameters.dry_run else 'Deleting'} {path}")
+        if not parameters.dry_run:
+            try:
+                trash.delete_tree(path)
+            except OSError as e:
+                logging.debug(e)
+                cli.negative_feedback(f"Failed to delete {path}: {e}")
+    if not parameters.dry_run:
+        cli.positive_feedback(f"Trash emptied ({len(leftovers)} items).")
+
+
+def dedupe(parameters: argparse.Namespace):
+    """
+    Links the files of all the versions deployed in a deploy base into its store (see deploy.store), so that the
+    files found in several versions take space once. The versions deployed with this version of the manager are
+    linked already when published: this is for the older ones.
+    :param parameters: the parameters passed through the CLI
+    :return: None, but the identical files of the deploy base are hardlinks to the same file.
+    """
+    if parameters.verbose:
+        logging.basicConfig(format='[%(levelname)s] %(message)s', level=logging.DEBUG)
+    deploy_base = str(OPERATIONAL_DEPLOY_PATH if parameters.operational else DEVELOPMENT_DEPLOY_PATH)
+
+    try:
+        deployments = sorted(pipeline.list_deployments(deploy_base))
+        # The files linked by a previous run are not read again
+        known_inodes = store.get_object_inodes(deploy_base)
+    except OSError as e:
+        logging.debug(e)
+        cli.negative_feedback(f"Could not read {deploy_base}: {e}")
+        return
+    if not deployments:
+        cli.positive_feedback(f"Nothing is deployed in {deploy_base}.")
+        return
+
+    saved = skipped = 0
+    for deployment in deployments:
+        cli.list_subtask(f"Deduplicating {deployment}")
+        try:
+            with tracing.span("dedupe", deployment=deployment):
+                result = store.link_tree(deploy_base, os.path.join(deploy_base, deployment), known_inodes,
+                                         parameters.workers)
+        except OSError as e:
+            logging.debug(e)
+            cli.negative_feedback(f"Failed to deduplicate {deployment}: {e}")
+            continue
+        saved, skipped = saved + result.saved, skipped + result.skipped
+    saved += store.collect_garbage(deploy_base)
+    cli.positive_feedback(f"Deduplicated {len(deployments)} versions: {saved / 1024 ** 2:.1f} MiB freed.")
+    if skipped:
+        cli.give_hint(f"{skipped} files could not be linked (see --verbose): they might belong to another user, "
+                      f"or be sources of files precompiled with timestamps.")
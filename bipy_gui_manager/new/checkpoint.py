@@ -0,0 +1,117 @@
+"""
+Records which stages of the creation of a project completed, with their outputs (i.e. the data of the GitLab
+repository created), so that 'new --resume' can retry a failed creation from the stage that failed.
+The checkpoint lives in the user's cache, not in the project: it must not end up in the project's repository.
+"""
+from typing import Any, Callable, Dict, Optional
+import os
+import json
+import hashlib
+import logging
+
+from bipy_gui_manager.utils import cli, fs
+
+# The data collected from the user that must not be written to disk
+SECRET_KEYS = ("author_token", )
+
+
+def get_checkpoint_path(project_path: str) -> str:
+    """
+    :param project_path: the final location of the project
+    :return: where the checkpoint of the creation of that project is saved
+    """
+    key = hashlib.sha1(os.path.abspath(project_path).encode()).hexdigest()
+    return fs.get_cache_path("checkpoints", f"{key}.json")
+
+
+class Checkpoint:
+    """
+    The progress of the creation of a project. Saved after every completed stage.
+    """
+
+    def __init__(self, project_data: Dict[str, Any], build_path: Optional[str] = None,
+                 options: Optional[Dict[str, Any]] = None, stages: Optional[Dict[str, Any]] = None):
+        """
+        :param project_data: the information collected about the project (see project_info.collect())
+        :param build_path: where the project is being built
+        :param options: the CLI options that the stages still to run depend on (i.e. whether to use GitLab)
+        :param stages: the stages completed so far, with their outputs
+        """
+        self.project_data = dict(project_data)
+        self.build_path = build_path
+        self.options = dict(options or {})
+        self.stages = dict(stages or {})
+        self.path = get_checkpoint_path(self.project_data["project_path"])
+
+    @classmethod
+    def load(cls, project_path: str) -> 'Checkpoint':
+        """
+        :param project_path: the final location of the project
+        :return: the checkpoint of the creation of that project
+        :raises ValueError if there is no valid checkpoint for it
+        """
+        path = get_checkpoint_path(project_path)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            checkpoint = cls(data["project_data"], data.get("build_path"), data.get("options"), data["stages"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.debug(f"Could not load the checkpoint {path}: {e}")
+            raise ValueError(f"There is nothing to resume for {project_path}: either its creation did not fail or "
+                             f"it was cleaned up.")
+        logging.debug(f"Loaded the checkpoint {path}: stages {list(checkpoint.stages)} completed")
+        return checkpoint
+
+    def save(self) -> None:
+        """ Writes the checkpoint to disk, replacing the previous version atomically """
+        data = {
+            "project_data": {key: value for key, value in self.project_data.items() if key not in SECRET_KEYS},
+            "build_path": self.build_path,
+            "options": self.options,
+            "stages": self.stages,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fs.replace_file_content(self.path, json.dumps(data, indent=2, default=str))
+        except OSError as e:
+            # Only resuming is affected
+            logging.debug(f"Could not save the checkpoint {self.path}: {e}")
+
+    def is_done(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def complete(self, stage: str, output: Any = None) -> None:
+        """
+        Records that a stage completed.
+        :param stage: the name of the stage
+        :param output: what the stage returned. Must be serializable to JSON.
+        """
+        self.stages[stage] = output
+        self.save()
+
+    def forget(self, *stages: str) -> None:
+        """ Records that the given stages must run again, i.e. because what they produced was discarded """
+        for stage in stages:
+            self.stages.pop(stage, None)
+        self.save()
+
+    def run(self, stage: str, function: Callable[[], Any]) -> Any:
+        """
+        Runs a stage, unless it completed already.
+        :param stage: the name of the stage
+        :param function: runs the stage, and returns its output (see complete())
+        :return: the output of the stage, either just computed or recorded when it completed
+        """
+        if self.is_done(stage):
+            cli.list_subtask(f"Skipping '{stage}': it was completed already")
+            return self.stages[stage]
+        output = function()
+        self.complete(stage, output)
+        return output
+
+    def delete(self) -> None:
+        """ Removes the checkpoint, i.e. once the project is created or discarded """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -1,2 +1,21 @@
 GROUP_NAME = "bisw-python"
 GROUP_ID = 7856  # Group ID for bisw-python
+GITLAB_URL = "https://gitlab.cern.ch"
+
+# Placeholders found in the templates, in the order they are replaced, with the name of the value replacing them
+TEMPLATE_TOKENS = [
+    ("sy-bi-pyqt-template", "project_name"),
+    ("sy-bi-comrad-template", "project_name"),
+    ("sy_bi_pyqt_template", "project_name_underscores"),
+    ("SY BI PyQt Template Code", "project_desc"),
+    ("SY BI PyQt Template", "project_name_capitals"),
+    ("SY BI ComRAD Template", "project_desc"),
+    ("Sara Zanzottera", "project_author"),
+    ("sara.zanzottera@cern.ch", "project_email"),
+    ("gitlab-group", "gitlab_space"),
+]
+# Placeholders that can appear in folder names
+PATH_TOKENS = [
+    ("sy_bi_pyqt_template", "project_name_underscores"),
+    ("sy-bi-pyqt-template", "project_name"),
+]
@@ -0,0 +1,137 @@
+"""
+Decides which files of a template need to be customized by looking at their content rather than at their extension.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional
+import os
+import json
+import mmap
+import codecs
+import hashlib
+import logging
+
+from bipy_gui_manager.utils import fs
+from bipy_gui_manager.utils import version_control as vcs
+
+SNIFF_SIZE = 8192  # Only this much of each file is read to decide whether it's text
+MMAP_THRESHOLD = 1024 * 1024  # Text files larger than this are memory-mapped to look for placeholders
+
+
+class Classification(NamedTuple):
+    is_text: bool
+    tokens: List[str]  # The tokens found in the file
+    size: int
+
+
+def sniff_is_text(block: bytes) -> bool:
+    """
+    :param block: the first bytes of a file
+    :return: True if the block looks like UTF-8 text (no NUL bytes and decodable), False otherwise
+    """
+    if b"\0" in block:
+        return False
+    try:
+        # Incremental decoding tolerates a multi-byte character truncated at the end of the block
+        codecs.getincrementaldecoder("utf-8")().decode(block, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def find_tokens(path: str, tokens: Iterable[bytes], size: int, block: bytes) -> List[str]:
+    """
+    Looks for the tokens in the file, without loading large files in memory.
+    :param path: the file to search
+    :param tokens: the tokens to look for, encoded
+    :param size: the size of the file
+    :param block: the first SNIFF_SIZE bytes of the file, already read
+    :return: the tokens found
+    """
+    if size <= len(block):
+        return [token.decode() for token in tokens if token in block]
+
+    with open(path, 'rb') as f:
+        if size > MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                return [token.decode() for token in tokens if content.find(token) != -1]
+        content = f.read()
+    return [token.decode() for token in tokens if token in content]
+
+
+class FileClassifier:
+    """
+    Classifies the files of a template as binary or text, and finds which placeholders the text files contain.
+    If the template version is known, the results are cached, so that later instantiations of the same version
+    of the template don't need to read the files again.
+    """
+
+    def __init__(self, tokens: Iterable[str], template_version: Optional[str] = None):
+        self.tokens = [token.encode() for token in tokens]
+        self.cache_file = None  # type: Optional[str]
+        self.cache = {}  # type: Dict[str, Classification]
+        self.dirty = False
+
+        if template_version:
+            # The tokens are part of the key: if they change, the cached results are no longer valid
+            key = hashlib.sha1("\n".join([template_version] + list(tokens)).encode()).hexdigest()
+            self.cache_file = fs.get_cache_path("classification", f"{key}.json")
+            self._load_cache()
+
+    def _load_cache(self) -> None:
+        try:
+            with open(self.cache_file) as f:
+                self.cache = {path: Classification(*values) for path, values in json.load(f).items()}
+            logging.debug(f"Loaded {len(self.cache)} file classifications from {self.cache_file}")
+        except (OSError, ValueError, TypeError):
+            logging.debug(f"No valid file classification cache in {self.cache_file}")
+
+    def classify(self, path: str, relative_path: str) -> Classification:
+        """
+        :param path: the file to classify
+        :param relative_path: path of the file relative to the template root, used as cache key
+        :return: the classification of the file
+        """
+        size = os.path.getsize(path)
+        cached = self.cache.get(relative_path)
+        if cached is not None and cached.size == size:
+            return cached
+
+        with open(path, 'rb') as f:
+            block = f.read(SNIFF_SIZE)
+        is_text = sniff_is_text(block)
+        classification = Classification(is_text=is_text,
+                                        tokens=find_tokens(path, self.tokens, size, block) if is_text else [],
+                                        size=size)
+        self.cache[relative_path] = classification
+        self.dirty = True
+        return classification
+
+    def save(self) -> None:
+        """ Saves the cache, if the template version is known and anything new was classified """
+        if not self.cache_file or not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            fs.replace_file_content(self.cache_file, json.dumps({path: list(c) for path, c in self.cache.items()}))
+            self.dirty = False
+        except OSError as e:
+            # The cache is just an optimization
+            logging.debug(f"Could not save the file classification cache: {e}")
+
+
+def get_template_version(template_path: str) -> Optional[str]:
+    """
+    Identifies the version of a template by its Git commit.
+    :param template_path: the template folder
+    :return: the commit hash, or None if the template is not a Git repository or has local changes
+        (in which case its content can't be identified by the commit alone)
+    """
+    try:
+        git = vcs.GitSession(template_path)
+        lines = git.rev_parse('--show-toplevel', 'HEAD')
+        status = git.status()
+    except OSError:
+        return None
+    if len(lines) != 2 or status.changes or not os.path.samefile(lines[0], template_path):
+        # Either not a repo on its own (i.e. a subfolder of another repo), or with local changes
+        return None
+    return lines[1].strip()
@@ -1,64 +1,118 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 import os
 import shutil
 import logging
 import argparse
 
-from bipy_gui_manager.new import project_info
-from bipy_gui_manager.utils import version_control, cli
+from bipy_gui_manager.new import project_info, template_pack, file_classifier
+from bipy_gui_manager.new.checkpoint import Checkpoint
+from bipy_gui_manager.new.constants import TEMPLATE_TOKENS, PATH_TOKENS
+from bipy_gui_manager.utils import version_control, cli, tracing, fs, trash
+
+# The stages that modify the template in place: if one of them did not complete, the build folder is in an unknown
+# state, so they all run again on a fresh template
+TEMPLATE_STAGES = ("get_template", "apply_customizations", "generate_readme")
 
 
 def new_project(parameters: argparse.Namespace):
     """
     Main 'script' for the creation process. Calls, in order, all the functions required to setup a project properly.
     :param parameters: the parameters passed through the CLI
-    :return: None, but creates a project according to the information gathered.
+    :return: the information gathered about the project if it was created, None otherwise.
     """
     if parameters.verbose:
         logging.basicConfig(format='[%(levelname)s] %(message)s', level=logging.DEBUG)
+    tracer = tracing.reset_tracer()
 
     # Initially defined here to be available for an eventual cleanup procedure, if something goes wrong
     valid_project_data = {}
+    # Where the project is being built: a hidden sibling of the project folder until it's published
+    build_path = None
+    # Which stages completed, so that a failed creation can be resumed
+    checkpoint = None
     try:
         cli.print_welcome()
 
-        print("  Setup: \n")
-        valid_project_data = project_info.collect(parameters)
+        if parameters.resume:
+            with tracing.span("resume"):
+                checkpoint = resume(parameters.resume, gitlab_token=parameters.gitlab_token)
+            valid_project_data = checkpoint.project_data
+            build_path = checkpoint.build_path
+            cli.positive_feedback(f"Resuming the creation of {valid_project_data['project_path']}")
+        else:
+            cli.print_section("Setup: ")
+            with tracing.span("collect"):
+                valid_project_data = project_info.collect(parameters)
+
+            # The project is assembled aside and appears in its final location only once complete
+            build_path = fs.sibling_path(valid_project_data["project_path"], "staging")
+            checkpoint = Checkpoint(valid_project_data, build_path, options={
+                "gitlab": parameters.gitlab,
+                "clone_protocol": parameters.clone_protocol,
+                "template_clone_mode": parameters.template_clone_mode,
+            })
+            checkpoint.save()
+        logging.debug(f"Building the project in {build_path}")
+        options = checkpoint.options
 
         cli.draw_line()
-        print("  Installation:\n")
-
-        get_template(project_path=valid_project_data["project_path"],
-                     clone_protocol=parameters.clone_protocol,
-                     template_path=valid_project_data.get("template_path", None),
-                     template_url=valid_project_data.get("template_url", None),
-                     project_type=valid_project_data.get("project_type", None))
-
-        apply_customizations(project_path=valid_project_data["project_path"],
-                             project_name=valid_project_data["project_name"],
-                             project_desc=valid_project_data["project_desc"],
-                             project_author=valid_project_data["author_full_name"],
-                             project_email=valid_project_data["author_email"],
-                             gitlab_space=valid_project_data.get("gitlab_space", ""))
-
-        generate_readme(project_path=valid_project_data["project_path"],
-                        project_name=valid_project_data["project_name"],
-                        project_desc=valid_project_data["project_desc"],
-                        project_author=valid_project_data["author_full_name"],
-                        project_email=valid_project_data["author_email"],
-                        gitlab_repo=valid_project_data.get("repo_url", None))
-
-        setup_version_control(project_path=valid_project_data["project_path"],
-                              gitlab=parameters.gitlab,
-                              project_name=valid_project_data["project_name"],
-                              project_desc=valid_project_data["project_desc"],
-                              gitlab_token=valid_project_data.get("author_token", None),
-                              repo_type=valid_project_data.get("repo_type", "test"),
-                              repo_url=valid_project_data.get("repo_url", None),
-                              author_name=valid_project_data["author_cern_id"])
-
-        install_project(project_path=valid_project_data["project_path"],
-                        verbose=parameters.verbose)
+        cli.print_section("Installation:")
+
+        with tracing.span("get_template"):
+            if not all(checkpoint.is_done(stage) for stage in TEMPLATE_STAGES):
+                # Whatever a previous attempt left behind, i.e. a template half customized
+                discard_project(build_path)
+                checkpoint.forget(*TEMPLATE_STAGES)
+            manifest = checkpoint.run("get_template", lambda: get_template(
+                project_path=build_path,
+                clone_protocol=options["clone_protocol"],
+                template_path=valid_project_data.get("template_path", None),
+                template_url=valid_project_data.get("template_url", None),
+                project_type=valid_project_data.get("project_type", None),
+                clone_mode=options["template_clone_mode"],
+                template_pack_path=valid_project_data.get("template_pack", None)))
+
+        with tracing.span("apply_customizations"):
+            checkpoint.run("apply_customizations", lambda: apply_customizations(
+                project_path=build_path,
+                project_name=valid_project_data["project_name"],
+                project_desc=valid_project_data["project_desc"],
+                project_author=valid_project_data["author_full_name"],
+                project_email=valid_project_data["author_email"],
+                gitlab_space=valid_project_data.get("gitlab_space", ""),
+                manifest=manifest))
+
+        with tracing.span("generate_readme"):
+            checkpoint.run("generate_readme", lambda: generate_readme(
+                project_path=build_path,
+                project_name=valid_project_data["project_name"],
+                project_desc=valid_project_data["project_desc"],
+                project_author=valid_project_data["author_full_name"],
+                project_email=valid_project_data["author_email"],
+                gitlab_repo=valid_project_data.get("repo_url", None)))
+
+        with tracing.span("setup_version_control"):
+            setup_version_control(project_path=build_path,
+                                  gitlab=options["gitlab"],
+                                  project_name=valid_project_data["project_name"],
+                                  project_desc=valid_project_data["project_desc"],
+                                  gitlab_token=valid_project_data.get("author_token", None),
+                                  repo_type=valid_project_data.get("repo_type", "test"),
+                                  repo_url=valid_project_data.get("repo_url", None),
+                                  author_name=valid_project_data["author_cern_id"],
+                                  push_compression=parameters.push_compression,
+                                  push_threads=parameters.push_threads,
+                                  checkpoint=checkpoint)
+
+        with tracing.span("publish"):
+            # The virtualenv contains absolute paths: the project must be in its final location before installing it
+            checkpoint.run("publish", lambda: fs.publish_tree(build_path, valid_project_data["project_path"]))
+            build_path = valid_project_data["project_path"]
+
+        with tracing.span("install_project"):
+            install_project(project_path=valid_project_data["project_path"],
+                            verbose=parameters.verbose)
+        checkpoint.delete()
 
         cli.draw_line()
         cli.positive_feedback("New project '{}' installed successfully.\033[1A".format(
@@ -91,6 +145,7 @@ def new_project(parameters: argparse.Namespace):
                               f"start working.\n\n"
                               f"Happy development!\033[1A", newline=False)
         cli.draw_line()
+        return valid_project_data
 
     except Exception as e:
         cli.negative_feedback("A fatal error occurred: {}".format(e))
@@ -101,29 +156,78 @@ def new_project(parameters: argparse.Namespace):
 
         if valid_project_data and "project_path" in valid_project_data.keys():
             # Try a quick cleanup
-            cleanup_on_failure(project_path=valid_project_data["project_path"],
-                               interactive=parameters.interactive,
-                               force_cleanup=parameters.cleanup_on_failure)
+            cleaned = cleanup_on_failure(project_path=build_path or valid_project_data["project_path"],
+                                         interactive=parameters.interactive,
+                                         force_cleanup=parameters.cleanup_on_failure)
+            if checkpoint is not None and cleaned:
+                checkpoint.delete()
+            elif checkpoint is not None:
+                cli.give_hint(f"once the problem is solved, type 'bipy-gui-manager new --resume "
+                              f"{valid_project_data['project_path']}' to continue from the step that failed.")
 
         cli.negative_feedback("Exiting\n")
+        return None
+
+    finally:
+        if parameters.trace_file:
+            cli.print_section("Timings:")
+            cli.print_text(tracer.summary())
+            tracer.write_chrome_trace(parameters.trace_file)
+            cli.positive_feedback("Trace saved in {}".format(parameters.trace_file))
+        else:
+            logging.debug("Timings:\n" + tracer.summary())
+
+
+def resume(project_path: str, gitlab_token: Optional[str] = None) -> Checkpoint:
+    """
+    Loads the checkpoint of a failed creation, to continue it from the stage that failed.
+    :param project_path: the final location of the project, as given to the failed creation
+    :param gitlab_token: a GitLab access token given through the CLI, if any. If the GitLab repository was not
+        created yet, the user is authenticated again if no token is given (tokens are never saved).
+    :return: the checkpoint, with the project data complete
+    :raises ValueError if the creation can't be resumed
+    """
+    checkpoint = Checkpoint.load(os.path.abspath(os.path.expanduser(project_path)))
+    project_data = checkpoint.project_data
+
+    if checkpoint.is_done("publish"):
+        checkpoint.build_path = project_data["project_path"]
+    if all(checkpoint.is_done(stage) for stage in TEMPLATE_STAGES) and not os.path.isdir(checkpoint.build_path):
+        checkpoint.delete()
+        raise ValueError(f"The folder where the project was being created ({checkpoint.build_path}) does not exist "
+                         f"anymore: please create the project again.")
+
+    if checkpoint.options.get("gitlab") and not checkpoint.is_done("create_gitlab_repository"):
+        if gitlab_token is not None:
+            project_data["author_token"] = "private_token={}".format(gitlab_token)
+        else:
+            project_data["author_token"] = project_info.authenticate_user(project_data["author_cern_id"])
+    return checkpoint
 
 
 def get_template(project_path: str, clone_protocol: str, template_path: Optional[str] = None,
-                 template_url: Optional[str] = None, project_type: Optional[str] = None) -> None:
+                 template_url: Optional[str] = None, project_type: Optional[str] = None,
+                 clone_mode: str = "auto", template_pack_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     Retrieves the template code for the new project.
     :param project_path: Where to create the new project
     :param clone_protocol: Which protocol to use to clone the template from GitLab (https, ssh, kerberos)
-    :param template_path: If given, points to a local path to copy the content of, instead of cloning from GitLab
+    :param template_path: If given, points to a local path to copy the content of, instead of cloning from GitLab.
+        The template is never modified.
     :param template_url: If given, points to a URL to copy the content of, instead of cloning from the regular repo
     :param project_type: Whether this is a ComRAD or a PyQt project
-    :return: Nothing, but creates a folder with the template code
+    :param clone_mode: How to copy the files of a local template (see utils.fs.clone_tree())
+    :param template_pack_path: If given, points to a template pack to extract (see template_pack.build_pack())
+    :return: the manifest of the template pack, if the template comes from one, None otherwise.
+        Creates a folder with the template code.
     """
+    if template_pack_path is not None:
+        cli.positive_feedback("Extracting the template pack {}".format(template_pack_path), newline=False)
+        return template_pack.extract_pack(template_pack_path, project_path)
+
     if template_path is not None:
         cli.positive_feedback("Copying the template from {}".format(template_path), newline=False)
-        shutil.copytree(template_path, project_path)
-        # FIXME Change this into a os.rename operation?
-        shutil.move(template_path, os.path.join(os.path.dirname(template_path), os.path.basename(project_path)))
+        fs.clone_tree(template_path, project_path, mode=clone_mode)
 
     elif template_url is not None:
         cli.positive_feedback("Downloading the template from {}".format(template_url), newline=False)
@@ -175,7 +279,7 @@ def download_template(project_path: str, clone_protocol: str, custom_url: Option
 
 
 def apply_customizations(project_path: str, project_name: str, project_desc: str, project_author: str,
-                         project_email: str, gitlab_space: str = "") -> None:
+                         project_email: str, gitlab_space: str = "", manifest: Optional[Dict[str, Any]] = None) -> None:
     """
     Modify the template by applying all the customizations specified in setup.
     :param project_path: path to the project folder
@@ -185,6 +289,9 @@ def apply_customizations(project_path: str, project_name: str, project_desc: str
     :param project_email: email of the project's author, or support email
     :param gitlab_space: either bisw-python or the username (i.e. the GitLab group where the project is hosted).
         Note that this parameter might be an empty string if the ``--no-gitlab`` flag is passed.
+    :param manifest: if the template comes from a template pack, its manifest. Only the files and folders listed
+        in the manifest will be processed. If not given, the template is scanned to find the text files containing
+        placeholders (binary files are never modified).
     """
     cli.positive_feedback("Applying customizations", newline=False)
 
@@ -192,54 +299,83 @@ def apply_customizations(project_path: str, project_name: str, project_desc: str
     project_name_capitals = project_name.replace("-", " ").title()
     logging.debug("Python package name is set to {} and the name in capitals is {}".format(project_name_underscores,
                                                                                            project_name_capitals))
+    values = {
+        "project_name": project_name,
+        "project_name_underscores": project_name_underscores,
+        "project_name_capitals": project_name_capitals,
+        "project_desc": project_desc,
+        "project_author": project_author,
+        "project_email": project_email,
+        "gitlab_space": gitlab_space,
+    }
+    replacements = [(token, values[key]) for token, key in TEMPLATE_TOKENS]
+    path_replacements = [(token, values[key]) for token, key in PATH_TOKENS]
     try:
-        if os.path.exists(f"{project_path}/sy_bi_pyqt_template"):
-            logging.debug("Renaming the root dir from sy_bi_pyqt_template to {}".format(project_name_underscores))
-            shutil.move(f"{project_path}/sy_bi_pyqt_template", f"{project_path}/{project_name_underscores}")
-
-        logging.debug("Remove images/ folder")
-        shutil.rmtree("{}/images".format(project_path))
-
-        # Edit the files and double-check on the directories
-        logging.debug("Performing replacements into the template files")
-        for rootdir, dirs, files in os.walk(project_path):
-            for filename in files:
-                filepath = os.path.join(rootdir, filename)
-
-                # Filtering to avoid binary files
-                if filename.split(".")[-1] in ["py", "md", "ui", "qrc", "yml", "gitignore", "sh", "in", "rst", "toml"]:
-                    logging.debug("Processing file {}".format(filepath))
-                    with open(filepath, 'r') as f:
-                        s = f.read()
-                    s = s.replace("sy-bi-pyqt-template", project_name)
-                    s = s.replace("sy-bi-comrad-template", project_name)
-                    s = s.replace("sy_bi_pyqt_template", project_name_underscores)
-                    s = s.replace("SY BI PyQt Template Code", project_desc)
-                    s = s.replace("SY BI PyQt Template", project_name_capitals)
-                    s = s.replace("SY BI ComRAD Template", project_desc)
-                    s = s.replace("Sara Zanzottera", project_author)
-                    s = s.replace("sara.zanzottera@cern.ch", project_email)
-                    s = s.replace("gitlab-group", gitlab_space)
-                    with open(filepath, "w") as f:
-                        f.write(s)
-
-            for dirname in dirs:
-                if "sy_bi_pyqt_template" in dirname:
-                    dirpath = os.path.join(rootdir, dirname)
-                    logging.debug("Replacing 'sy_bi_pyqt_template' with '{}' in the folder '{}'".format(
-                        project_name_underscores, dirpath))
-                    os.rename(dirpath, dirpath.replace("sy_bi_pyqt_template", project_name_underscores))
-                if "sy-bi-pyqt-template" in dirname:
-                    dirpath = os.path.join(rootdir, dirname)
-                    logging.debug("Replacing 'sy-bi-pyqt-template' with '{}' in the folder named '{}'".format(
-                        project_name, dirpath))
-                    os.rename(dirpath, dirpath.replace("sy-bi-pyqt-template", project_name))
+        if manifest is None:
+            # Find out which files need to be customized, reusing the results of previous runs if possible
+            tokens = [token for token, _ in TEMPLATE_TOKENS]
+            classifier = file_classifier.FileClassifier(tokens, file_classifier.get_template_version(project_path))
+            manifest = template_pack.scan_template(project_path, tokens, [token for token, _ in PATH_TOKENS],
+                                                   classifier=classifier)
+            classifier.save()
+        apply_manifest_customizations(project_path, manifest, replacements, path_replacements)
 
     except Exception as e:
         cli.negative_feedback("Failed to apply customizations")
         raise e
 
 
+def apply_manifest_customizations(project_path: str, manifest: Dict[str, Any], replacements: List[Tuple[str, str]],
+                                  path_replacements: List[Tuple[str, str]]) -> None:
+    """
+    Applies the customizations to a template, touching only the files and the folders listed in its manifest.
+    :param project_path: path to the project folder
+    :param manifest: the manifest of the template (see template_pack.scan_template())
+    :param replacements: the placeholders to replace in the files, with their values, in order
+    :param path_replacements: the placeholders to replace in the folder names, with their values
+    """
+    logging.debug("Performing replacements into the {} template files listed in the manifest".format(
+        len(manifest["files"])))
+    for relative_path in manifest["files"]:
+        if relative_path.split("/")[0] == "images":
+            continue
+        logging.debug("Processing file {}".format(relative_path))
+        customize_file(os.path.join(project_path, *relative_path.split("/")), replacements)
+
+    # Deepest first, so the paths of the folders still to rename stay valid
+    for relative_path in sorted(manifest["renames"], key=lambda p: p.count("/"), reverse=True):
+        parent, dirname = os.path.split(os.path.join(project_path, *relative_path.split("/")))
+        new_dirname = dirname
+        for token, value in path_replacements:
+            new_dirname = new_dirname.replace(token, value)
+        logging.debug("Renaming the folder '{}' into '{}'".format(relative_path, new_dirname))
+        os.rename(os.path.join(parent, dirname), os.path.join(parent, new_dirname))
+
+    logging.debug("Remove images/ folder")
+    shutil.rmtree("{}/images".format(project_path))
+
+
+def customize_file(filepath: str, replacements: List[Tuple[str, str]]) -> None:
+    """
+    Replaces the placeholders in the given file. The file is rewritten only if something changed.
+    :param filepath: the file to customize
+    :param replacements: the placeholders to replace, with their values, in order
+    """
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            original = f.read()
+    except UnicodeDecodeError:
+        # Only the beginning of the file is checked when classifying it
+        logging.debug("{} is not valid UTF-8 text: skipping it".format(filepath))
+        return
+    s = original
+    for token, value in replacements:
+        s = s.replace(token, value)
+    # Replace rather than overwrite, not to modify the template in case the file is a hardlink
+    if s != original:
+        fs.replace_file_content(filepath, s, encoding='utf-8')
+
+
 def generate_readme(project_path: str, project_name: str, project_desc: str, project_author: str,
                     project_email: str, gitlab_repo: str) -> None:
     """
@@ -275,8 +411,7 @@ def generate_readme(project_path: str, project_name: str, project_desc: str, pro
         s = s.replace("_Here goes the project description_", project_desc)
         s = s.replace("the project author", project_author)
         s = s.replace("author@cern.ch", project_email)
-        with open(readme, "w") as f:
-            f.write(s)
+        fs.replace_file_content(readme, s)
 
         cli.give_hint("check the README for typos and complete it with a more in-depth description of your project.")
 
@@ -287,7 +422,8 @@ def generate_readme(project_path: str, project_name: str, project_desc: str, pro
 
 def setup_version_control(project_path: str, gitlab: bool, project_name: Optional[str], project_desc: Optional[str],
                           gitlab_token: Optional[str], repo_type: Optional[str], repo_url: Optional[str],
-                          author_name: str) -> None:
+                          author_name: str, push_compression: Optional[int] = None,
+                          push_threads: Optional[int] = None, checkpoint: Optional[Checkpoint] = None) -> None:
     """
     Sets up the local and remote version control for the project.
     :param project_path: Path to the new project
@@ -298,23 +434,38 @@ def setup_version_control(project_path: str, gitlab: bool, project_name: Optiona
     :param repo_url: URL to the GitLab repo
     :param repo_type: Repository URL
     :param author_name: the name (CERN ID) of the user creating the project
+    :param push_compression: compression level of the first push (see version_control.push_first_commit())
+    :param push_threads: threads used to compress the first push (see version_control.push_first_commit())
+    :param checkpoint: if given, the steps that completed already are skipped, and the ones that complete are
+        recorded in it
     :return:
     """
-    cli.positive_feedback("Setting up local Git repository", newline=False)
+    def run(stage, function):
+        return checkpoint.run(stage, function) if checkpoint is not None else function()
 
-    # In most cases, the failure is due to .git not existing.
-    # In any case, if the failure is due to something else, most likely git will fail right after.
-    logging.debug("Remove potential .git/ folders present in the downloaded template")
-    shutil.rmtree("{}/.git".format(project_path), ignore_errors=True)
+    def init_local_repo():
+        cli.positive_feedback("Setting up local Git repository", newline=False)
 
-    version_control.init_local_repo(project_path)
+        # In most cases, the failure is due to .git not existing.
+        # In any case, if the failure is due to something else, most likely git will fail right after.
+        logging.debug("Remove potential .git/ folders present in the downloaded template")
+        shutil.rmtree("{}/.git".format(project_path), ignore_errors=True)
 
-    if gitlab:
+        version_control.init_local_repo(project_path)
+
+    def create_gitlab_repository():
         cli.positive_feedback("Creating repository on GitLab", newline=False)
-        version_control.create_gitlab_repository(repo_type, project_name, project_desc, auth_token=gitlab_token, author_name=author_name)
+        return version_control.create_gitlab_repository(repo_type, project_name, project_desc,
+                                                        auth_token=gitlab_token, author_name=author_name)
 
-        cli.positive_feedback("Uploading project on GitLab", newline=False)
-        version_control.push_first_commit(project_path, repo_url)
+    run("init_local_repo", init_local_repo)
+    if gitlab:
+        # If this was done by a previous attempt, the repository is not created again
+        repo_data = run("create_gitlab_repository", create_gitlab_repository)
+
+        cli.positive_feedback("Uploading project on GitLab")
+        run("push_first_commit", lambda: version_control.push_first_commit(
+            project_path, repo_url, repo_data=repo_data, compression=push_compression, threads=push_threads))
 
 
 def install_project(project_path: str, verbose: bool, project_type: str = 'comrad') -> None:
@@ -339,7 +490,8 @@ def install_project(project_path: str, verbose: bool, project_type: str = 'comra
     logging.debug(f"Move in the project's directory: {project_path}")
     os.chdir(project_path)
     logging.debug("Execute .tmp.sh with Bash source")
-    error = os.WEXITSTATUS(os.system(f"/bin/bash -c \"source ./.tmp.sh {project_type.lower()} {verbose}\""))
+    with tracing.span("install-project.sh", category="subprocess"):
+        error = os.WEXITSTATUS(os.system(f"/bin/bash -c \"source ./.tmp.sh {project_type.lower()} {verbose}\""))
     logging.debug(f"Move back to original working directory: {current_dir}")
     os.chdir(current_dir)
 
@@ -356,23 +508,38 @@ def install_project(project_path: str, verbose: bool, project_type: str = 'comra
         raise OSError(f"New project failed to install: {error}.")
 
 
-def cleanup_on_failure(project_path: str, interactive: bool, force_cleanup: bool) -> None:
+def cleanup_on_failure(project_path: str, interactive: bool, force_cleanup: bool) -> bool:
     """
     In case of failure, this function is called to verify whether the user wants to
     do a cleanup of the folders created so far, and cleans up if positive.
     :param project_path: Folder to delete
     :param interactive: Whether the script can ask the user interactively
     :param force_cleanup: Just cleanup without asking
-    :return: Nothing, but might delete the project folder.
+    :return: True if the project folder was deleted, False otherwise.
     """
     if force_cleanup:
         logging.debug("--force-cleanup was passed: cleaning up directly")
         cli.negative_feedback("Cleaning up...")
-        shutil.rmtree(project_path, ignore_errors=True)
+        discard_project(project_path)
+        return True
 
     elif interactive:
         answer = cli.handle_failure("Do you want to clean up what was created so far? "
                                     "This will delete the folder {}. (yes/no)".format(project_path))
         if answer == "y" or answer == "yes":
             cli.negative_feedback("Cleaning up...")
-            shutil.rmtree(project_path, ignore_errors=True)
+            discard_project(project_path)
+            return True
+    return False
+
+
+def discard_project(project_path: str) -> None:
+    """
+    Removes the given folder without waiting for its content to be deleted. Never raises.
+    :param project_path: Folder to delete
+    """
+    try:
+        trash.discard(project_path)
+    except OSError as e:
+        logging.debug(f"Could not move {project_path} aside ({e}): deleting it in place")
+        shutil.rmtree(project_path, ignore_errors=True)
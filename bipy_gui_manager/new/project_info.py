@@ -150,6 +150,13 @@ def collect(parameters: argparse.Namespace) -> Mapping[str, Union[str, bool]]:
         else:
             raise ValueError("The template_path value ({}) is not a directory.".format(parameters.template_path))
 
+    if parameters.template_pack:
+        logging.debug("A template pack was passed: {}".format(parameters.template_pack))
+        if os.path.isfile(parameters.template_pack):
+            project_parameters["template_pack"] = parameters.template_pack
+        else:
+            raise ValueError("The template_pack value ({}) is not a file.".format(parameters.template_pack))
+
     if parameters.template_url:
         # No real validation possible
         logging.debug("A template URL was passed: {}".format(parameters.template_url))
@@ -0,0 +1,155 @@
+"""
+Template packs: a template folder stored as a single compressed archive, whose first member is a manifest listing
+which files contain which placeholders and which folders need to be renamed. Instantiating a template from a pack
+needs a single streaming pass over the archive, and the customization touches only the files listed in the manifest.
+"""
+from typing import Any, Dict, Iterable, Optional, Tuple
+import io
+import os
+import json
+import time
+import logging
+import tarfile
+
+from bipy_gui_manager.new.file_classifier import FileClassifier
+
+MANIFEST_NAME = ".bipy-template-manifest.json"
+PACK_FORMAT_VERSION = 1
+EXCLUDED_FOLDERS = (".git", )
+
+
+def scan_template(template_path: str, tokens: Iterable[str], path_tokens: Iterable[str],
+                  classifier: Optional[FileClassifier] = None) -> Dict[str, Any]:
+    """
+    Finds which files of the template contain placeholders and which folders have placeholders in their name.
+    Binary files are ignored.
+    :param template_path: the template folder
+    :param tokens: the placeholders to look for in the files
+    :param path_tokens: the placeholders to look for in the folder names
+    :param classifier: the classifier to use (i.e. to reuse cached results). Must look for the same tokens.
+    :return: a dictionary with the keys 'files' (relative path -> list of placeholders found) and 'renames'
+        (relative paths of the folders to rename). Paths always use '/' as separator.
+    """
+    classifier = classifier or FileClassifier(tokens)
+    path_tokens = list(path_tokens)
+    files, renames = {}, []
+    for rootdir, dirs, filenames in os.walk(template_path):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDED_FOLDERS)
+        relative_root = os.path.relpath(rootdir, template_path)
+        for dirname in dirs:
+            if any(token in dirname for token in path_tokens):
+                renames.append(_relative(relative_root, dirname))
+        for filename in sorted(filenames):
+            relative_path = _relative(relative_root, filename)
+            classification = classifier.classify(os.path.join(rootdir, filename), relative_path)
+            if classification.tokens:
+                files[relative_path] = classification.tokens
+    return {"files": files, "renames": renames}
+
+
+def _relative(relative_root: str, name: str) -> str:
+    return name if relative_root == "." else "/".join(relative_root.split(os.sep) + [name])
+
+
+def build_pack(template_path: str, output_path: str, tokens: Iterable[Tuple[str, str]],
+               path_tokens: Iterable[Tuple[str, str]], name: Optional[str] = None,
+               version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Creates a template pack out of a template folder.
+    :param template_path: the template folder
+    :param output_path: where to save the pack (a .tar.gz archive)
+    :param tokens: the placeholders to index, as (placeholder, value name) pairs (see constants.TEMPLATE_TOKENS)
+    :param path_tokens: the placeholders that can be found in folder names (see constants.PATH_TOKENS)
+    :param name: the name of the template. Defaults to the name of the folder.
+    :param version: the version of the template.
+    :return: the manifest of the pack
+    """
+    if not os.path.isdir(template_path):
+        raise ValueError(f"The template path '{template_path}' is not a directory.")
+
+    manifest = {
+        "format_version": PACK_FORMAT_VERSION,
+        "name": name or os.path.basename(os.path.abspath(template_path)),
+        "version": version or "unversioned",
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "tokens": [token for token, _ in tokens],
+    }
+    manifest.update(scan_template(template_path, manifest["tokens"], [token for token, _ in path_tokens]))
+    logging.debug(f"{len(manifest['files'])} files with placeholders and {len(manifest['renames'])} folders to "
+                  f"rename found in {template_path}")
+
+    manifest_data = json.dumps(manifest, indent=1).encode()
+    with tarfile.open(output_path, "w:gz") as pack:
+        # The manifest goes first, so it can be read before extracting anything
+        info = tarfile.TarInfo(MANIFEST_NAME)
+        info.size = len(manifest_data)
+        info.mtime = int(time.time())
+        pack.addfile(info, io.BytesIO(manifest_data))
+        for entry in sorted(os.listdir(template_path)):
+            if entry not in EXCLUDED_FOLDERS:
+                pack.add(os.path.join(template_path, entry), arcname=entry,
+                         filter=lambda member: None if os.path.basename(member.name) in EXCLUDED_FOLDERS else member)
+    return manifest
+
+
+def read_manifest(pack_path: str) -> Dict[str, Any]:
+    """
+    Reads the manifest of a template pack without extracting it.
+    :param pack_path: the template pack
+    :return: the manifest
+    :raises ValueError if the file is not a template pack
+    """
+    with tarfile.open(pack_path, "r|gz") as pack:
+        return _read_manifest_member(pack, pack.next())
+
+
+def _read_manifest_member(pack: tarfile.TarFile, member: Optional[tarfile.TarInfo]) -> Dict[str, Any]:
+    if member is None or member.name != MANIFEST_NAME:
+        raise ValueError(f"{pack.name} is not a template pack: it does not start with a manifest")
+    manifest = json.loads(pack.extractfile(member).read().decode())
+    if manifest.get("format_version") != PACK_FORMAT_VERSION:
+        raise ValueError(f"Unsupported template pack format: {manifest.get('format_version')}")
+    return manifest
+
+
+def extract_pack(pack_path: str, destination: str) -> Dict[str, Any]:
+    """
+    Extracts a template pack into destination in a single streaming pass.
+    :param pack_path: the template pack
+    :param destination: where to extract the template (must not exist)
+    :return: the manifest of the pack
+    :raises ValueError if the file is not a valid template pack
+    """
+    if os.path.lexists(destination):
+        raise FileExistsError(f"'{destination}' already exists")
+    os.makedirs(destination)
+    root = os.path.realpath(destination)
+
+    with tarfile.open(pack_path, "r|gz") as pack:
+        manifest = _read_manifest_member(pack, pack.next())
+        # Iterating over the TarFile would restart from the manifest, which can't be read twice in stream mode
+        member = pack.next()
+        while member is not None:
+            if not _is_safe_member(member, root):
+                raise ValueError(f"Template pack {pack_path} contains an unsafe path: {member.name}")
+            if hasattr(tarfile, "data_filter"):
+                pack.extract(member, root, filter="data")
+            else:
+                pack.extract(member, root)
+            member = pack.next()
+    logging.debug(f"Template pack {manifest['name']} version {manifest['version']} extracted in {destination}")
+    return manifest
+
+
+def _is_safe_member(member: tarfile.TarInfo, root: str) -> bool:
+    """ Checks that the member, and its target if it's a link, would end up within root """
+    target = os.path.realpath(os.path.join(root, member.name))
+    if not target.startswith(root + os.sep):
+        return False
+    if member.issym():
+        link_target = os.path.realpath(os.path.join(os.path.dirname(target), member.linkname))
+    elif member.islnk():
+        link_target = os.path.realpath(os.path.join(root, member.linkname))
+    else:
+        return True
+    return link_target.startswith(root + os.sep)
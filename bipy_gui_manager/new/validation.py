@@ -1,8 +1,9 @@
 from typing import Any, Optional, Tuple
 import os
-import shutil
 from pyphonebook import PhoneBook, PhoneBookEntry
 from bipy_gui_manager.utils import cli as cli
+from bipy_gui_manager.utils import tracing
+from bipy_gui_manager.utils import trash
 from bipy_gui_manager.new.constants import GROUP_NAME
 
 
@@ -57,7 +58,7 @@ def validate_base_path(base_path: str, project_name: str, interactive: bool = Tr
     if os.path.exists(project_path):
         if overwrite:
             cli.list_subtask("Overwriting folder {}".format(project_path))
-            shutil.rmtree(project_path)
+            trash.discard(project_path)
             return base_path, True
         elif not interactive:
             raise OSError("Directory '{}' already exists.".format(project_path))
@@ -66,7 +67,7 @@ def validate_base_path(base_path: str, project_name: str, interactive: bool = Tr
                                         "Do you want to overwrite it or to enter another path? (overwrite/another)")
             if answer == "overwrite":
                 cli.list_subtask("Overwriting existing folder")
-                shutil.rmtree(project_path)
+                trash.discard(project_path)
                 return base_path, True
             return None, False
     return base_path, True
@@ -142,11 +143,12 @@ def validate_cern_id(cern_id: Optional[str]) -> Tuple[Optional[PhoneBookEntry],
     if cern_id is None:
         return None, False
 
-    phonebook = PhoneBook()
-    if not phonebook.validate_login_name(cern_id):
-        return None, False
+    with tracing.span("PhoneBook lookup", category="network"):
+        phonebook = PhoneBook()
+        if not phonebook.validate_login_name(cern_id):
+            return None, False
 
-    entries = phonebook.search_by_login_name(cern_id)
+        entries = phonebook.search_by_login_name(cern_id)
     if len(entries) == 1 and cern_id in entries[0].login_name:
         entry = entries[0]
         entry.login_name = entry.login_name[0]  # Assume this use has only the login name we validated it on
@@ -0,0 +1,272 @@
+"""
+Local mirror of the deployed applications, for 'run --local-mirror'. The deploy bases are on a network filesystem,
+where every import of a PyQt application is a round-trip: the mirror copies the version to run on a local disk
+once, and the application is launched from there.
+
+The files are stored by content (objects/<sha256>-<mode>, see utils.cas) and the mirrored versions are trees of
+hardlinks to them, so the files that don't change between versions are stored once. A version is mirrored only
+when it appears in the deploy base: launching the same version again does not read the network at all. When the
+mirror grows beyond its size limit, the least recently run versions are evicted.
+
+Layout of the mirror:
+    objects/<xx>/<sha256>-<mode>           The content of the files
+    bases/<key>/<app>/<version>/           One folder per deploy base (<key> identifies it): used as deploy base
+    manifests/<key>/<app>/<version>.json   For each file of a version: size, mtime and object
+    usage.json                             When each version was last run
+"""
+from typing import Dict, List, Optional, Set, Tuple
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from bipy_gui_manager.deploy.publish import list_versions, version_key
+from bipy_gui_manager.utils import cas, fs, trash
+
+DEFAULT_MAX_SIZE = 10 * 1024 ** 3  # In bytes
+SCRIPT_MAX_SIZE = 1024 * 1024  # Larger files in bin/ are not scripts whose shebang could need fixing
+
+
+def get_mirror_path(*subfolders: str) -> str:
+    """
+    :param subfolders: the subfolders to append to the path of the mirror
+    :return: where the mirror is: in the cache, unless BIPY_GUI_MANAGER_MIRROR_PATH says otherwise
+    """
+    return os.path.join(os.environ.get("BIPY_GUI_MANAGER_MIRROR_PATH", fs.get_cache_path("mirror")), *subfolders)
+
+
+def get_max_size() -> int:
+    """ :return: the size limit of the mirror in bytes, from BIPY_GUI_MANAGER_MIRROR_MAX_SIZE (in GiB) if set """
+    try:
+        return int(float(os.environ["BIPY_GUI_MANAGER_MIRROR_MAX_SIZE"]) * 1024 ** 3)
+    except (KeyError, ValueError):
+        return DEFAULT_MAX_SIZE
+
+
+def get_base_key(deploy_base: str) -> str:
+    """ :return: the name identifying the deploy base in the mirror """
+    return hashlib.sha1(os.path.abspath(deploy_base).encode()).hexdigest()[:12]
+
+
+def get_mirror_base(deploy_base: str) -> str:
+    """ :return: the mirror of the deploy base, to use as deploy base when launching the applications """
+    return get_mirror_path("bases", get_base_key(deploy_base))
+
+
+def find_latest_version(deploy_base: str, app: str) -> Optional[str]:
+    """
+    :param deploy_base: where the application is deployed
+    :param app: the name of the application
+    :return: the latest version deployed, or None if there is none
+    """
+    versions = list_versions(deploy_base, app)
+    return versions[-1] if versions else None
+
+
+def _store(path: str, stat: os.stat_result, content: Optional[bytes] = None) -> str:
+    """
+    Adds a file to the objects of the mirror, unless they have it already.
+    :param path: the file to store
+    :param stat: its stat
+    :param content: if given, the content to store instead of the one of the file
+    :return: the name of the object (relative to the objects folder)
+    """
+    temporary = cas.get_temporary_path(get_mirror_path("objects"))
+    if content is None:
+        digest = cas.hash_file(path, copy_to=temporary)
+    else:
+        digest = hashlib.sha256(content).hexdigest()
+        with open(temporary, "wb") as output:
+            output.write(content)
+    os.chmod(temporary, stat.st_mode & 0o7777)
+    os.utime(temporary, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    name = cas.get_object_name(digest, stat.st_mode)
+    cas.insert(get_mirror_path("objects"), temporary, name)
+    return name
+
+
+def _is_in_bin(path: str) -> bool:
+    return os.path.basename(os.path.dirname(path)) == "bin"
+
+
+def _fix_script(path: str, stat: os.stat_result, source: str, destination: str) -> Optional[bytes]:
+    """
+    :return: the content of the file with the paths of the source version replaced by the ones of the mirror, if it's
+        a script (in a bin/ folder, starting with a shebang) referring to the source version. Otherwise None.
+    """
+    if not _is_in_bin(path) or stat.st_size > SCRIPT_MAX_SIZE:
+        return None
+    with open(path, "rb") as f:
+        content = f.read()
+    if not content.startswith(b"#!") or source.encode() not in content:
+        return None
+    return content.replace(source.encode(), destination.encode())
+
+
+def _mirror_tree(source: str, staging: str, destination: str, known: Dict[str, List]) -> Dict[str, List]:
+    """
+    Mirrors a version of an application.
+    :param source: the deployed version
+    :param staging: where to build the mirror
+    :param destination: where the mirror will be published (the scripts refer to it)
+    :param known: the manifest of another version: the files with the same path, size and mtime are not read again
+    :return: the manifest of the version
+    """
+    files = []
+    for root, dirs, names in os.walk(source):
+        relative_root = os.path.relpath(root, source)
+        os.makedirs(os.path.join(staging, relative_root), exist_ok=True)
+        for name in dirs + names:
+            path = os.path.join(root, name)
+            target = os.path.normpath(os.path.join(staging, relative_root, name))
+            if os.path.islink(path):
+                os.symlink(os.readlink(path), target)
+            elif name in names:
+                files.append((os.path.normpath(os.path.join(relative_root, name)), path, target))
+
+    def mirror_file(file: Tuple[str, str, str]) -> Tuple[str, List]:
+        relative, path, target = file
+        stat = os.stat(path)
+        entry = known.get(relative)
+        # The scripts can't be reused: their content depends on the version (see _fix_script())
+        if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns] and not _is_in_bin(relative) and \
+                os.path.exists(get_mirror_path("objects", entry[2])):
+            name = entry[2]
+        else:
+            name = _store(path, stat, _fix_script(path, stat, source, destination))
+        os.link(get_mirror_path("objects", name), target)
+        return relative, [stat.st_size, stat.st_mtime_ns, name]
+
+    # The folders are not read-only, unlike the deployed ones: Python can write the missing .pyc files
+    with ThreadPoolExecutor(max_workers=fs.default_workers()) as pool:
+        return dict(pool.map(mirror_file, files))
+
+
+def _mirror_app_files(deploy_base: str, mirror_base: str, app: str) -> None:
+    """ Copies the files found next to the versions of the application (the metadata of the deploy tool) """
+    os.makedirs(os.path.join(mirror_base, app), exist_ok=True)
+    with os.scandir(os.path.join(deploy_base, app)) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                shutil.copy2(entry.path, os.path.join(mirror_base, app, entry.name))
+
+
+def _load_json(path: str) -> Dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_json(path: str, data: Dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fs.replace_file_content(path, json.dumps(data, indent=1))
+
+
+def _mark_used(version_id: str) -> None:
+    usage = _load_json(get_mirror_path("usage.json"))
+    usage[version_id] = time.time()
+    _save_json(get_mirror_path("usage.json"), usage)
+
+
+def sync(deploy_base: str, app: str, version: Optional[str] = None, max_size: Optional[int] = None) -> str:
+    """
+    Makes sure that the mirror has the version of the application.
+    :param deploy_base: where the application is deployed
+    :param app: the name of the application
+    :param version: the version to mirror. The latest one deployed if not given.
+    :param max_size: the size limit of the mirror in bytes (see get_max_size())
+    :return: the mirror of the deploy base, to launch the application from
+    :raises ValueError if the application is not deployed
+    :raises OSError if the version could not be mirrored
+    """
+    version = version or find_latest_version(deploy_base, app)
+    if version is None:
+        raise ValueError(f"{app} is not deployed in {deploy_base}")
+    key = get_base_key(deploy_base)
+    mirror_base = get_mirror_base(deploy_base)
+    destination = os.path.join(mirror_base, app, version)
+    version_id = "/".join((key, app, version))
+
+    with fs.locked(get_mirror_path(".lock")):
+        if os.path.isdir(destination):
+            logging.debug(f"{app} {version} is mirrored already in {destination}")
+            _mark_used(version_id)
+            return mirror_base
+
+        start = time.perf_counter()
+        manifests_folder = get_mirror_path("manifests", key, app)
+        known = {}
+        if os.path.isdir(manifests_folder):
+            others = [name[:-len(".json")] for name in os.listdir(manifests_folder) if name.endswith(".json")]
+            if others:
+                known = _load_json(os.path.join(manifests_folder, max(others, key=version_key) + ".json"))
+        os.makedirs(get_mirror_path("objects"), exist_ok=True)
+        os.makedirs(os.path.join(mirror_base, app), exist_ok=True)
+        staging = fs.sibling_path(destination, "mirror")
+        try:
+            manifest = _mirror_tree(os.path.join(deploy_base, app, version), staging, destination, known)
+            _mirror_app_files(deploy_base, mirror_base, app)
+            fs.publish_tree(staging, destination)
+        except BaseException:
+            trash.delete_tree(staging)
+            raise
+        _save_json(os.path.join(manifests_folder, version + ".json"), manifest)
+        _mark_used(version_id)
+        logging.debug(f"Mirrored {app} {version} ({len(manifest)} files) in {time.perf_counter() - start:.1f}s")
+        evict(max_size if max_size is not None else get_max_size(), keep={version_id})
+    return mirror_base
+
+
+def get_size() -> int:
+    """ :return: the space taken by the objects of the mirror, in bytes """
+    size = 0
+    for root, _, names in os.walk(get_mirror_path("objects")):
+        for name in names:
+            try:
+                size += os.lstat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                pass
+    return size
+
+
+def collect_garbage() -> int:
+    """
+    Removes the objects that no mirrored version uses anymore.
+    :return: how many bytes were freed
+    """
+    return cas.collect_garbage(get_mirror_path("objects"))
+
+
+def evict(max_size: int, keep: Set[str] = frozenset()) -> List[str]:
+    """
+    Removes the least recently run versions until the mirror fits in its size limit. Call with the mirror locked.
+    :param max_size: the size limit in bytes
+    :param keep: the versions (<key>/<app>/<version>) not to evict, i.e. the one about to run
+    :return: the versions evicted
+    """
+    usage = _load_json(get_mirror_path("usage.json"))
+    evicted = []
+    size = get_size()
+    for version_id in sorted(usage, key=usage.get):
+        if size <= max_size:
+            break
+        if version_id in keep:
+            continue
+        key, app, version = version_id.split("/")
+        logging.debug(f"Evicting {app} {version} from the mirror ({size} bytes > {max_size})")
+        trash.delete_tree(get_mirror_path("bases", key, app, version))
+        try:
+            os.remove(get_mirror_path("manifests", key, app, version + ".json"))
+        except FileNotFoundError:
+            pass
+        del usage[version_id]
+        evicted.append(version_id)
+        size -= collect_garbage()
+    if evicted:
+        _save_json(get_mirror_path("usage.json"), usage)
+    return evicted
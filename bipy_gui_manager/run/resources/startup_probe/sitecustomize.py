@@ -0,0 +1,135 @@
+"""
+Startup probe for the applications launched by 'bipy-gui-manager run --profile-startup'. The folder of this module is
+put at the beginning of PYTHONPATH, so every Python process of the launch loads it at startup: it does nothing
+unless BIPY_GUI_MANAGER_PROBE_DIR is set.
+
+In the processes that import PyQt5, it records (in <BIPY_GUI_MANAGER_PROBE_DIR>/<pid>.json) when the first iteration
+of the Qt event loop runs, i.e. when the window is ready. Optionally it profiles the process with cProfile until then
+(BIPY_GUI_MANAGER_PROBE_CPROFILE) and quits the application right after (BIPY_GUI_MANAGER_PROBE_QUIT).
+
+This module only uses the standard library and must work with any Python 3 version the applications use.
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import importlib
+import importlib.abc
+
+PROBE_DIR = os.environ.get("BIPY_GUI_MANAGER_PROBE_DIR")
+QT_MODULES = ("PyQt5.QtCore", "PyQt5.QtGui", "PyQt5.QtWidgets")
+APP_CLASSES = ("QCoreApplication", "QGuiApplication", "QApplication")
+
+_loaded_at = time.time()
+_profiler = None
+_state = {"qt_imported": False, "recorded": False}
+
+
+def _load_hidden_sitecustomize():
+    """ Loads the sitecustomize of the environment, if any: this module hides it """
+    here = os.path.dirname(os.path.abspath(__file__))
+    this_module = sys.modules.pop("sitecustomize", None)
+    original_path = list(sys.path)
+    sys.path[:] = [path for path in sys.path if os.path.abspath(path or ".") != here]
+    try:
+        importlib.import_module("sitecustomize")
+    except ImportError:
+        pass
+    finally:
+        sys.path[:] = original_path
+        if this_module is not None:
+            sys.modules["sitecustomize"] = this_module
+
+
+def _record(event_loop_reached):
+    if _state["recorded"]:
+        return
+    _state["recorded"] = True
+    result = {
+        "pid": os.getpid(),
+        "argv": sys.argv,
+        "prefix": sys.prefix,
+        "probe_loaded": _loaded_at,
+        "event_loop_reached": time.time() if event_loop_reached else None,
+        "cprofile": None,
+    }
+    if _profiler is not None:
+        _profiler.disable()
+        result["cprofile"] = os.path.join(PROBE_DIR, "{}.prof".format(os.getpid()))
+        _profiler.dump_stats(result["cprofile"])
+    path = os.path.join(PROBE_DIR, "{}.json".format(os.getpid()))
+    with open(path + ".tmp", "w") as f:
+        json.dump(result, f)
+    os.replace(path + ".tmp", path)
+
+
+def _on_first_iteration():
+    _record(event_loop_reached=True)
+    if os.environ.get("BIPY_GUI_MANAGER_PROBE_QUIT"):
+        sys.modules["PyQt5.QtCore"].QCoreApplication.quit()
+
+
+def _wrap_exec(original):
+    def exec_(*args, **kwargs):
+        # Runs as soon as the event loop processes its first events
+        sys.modules["PyQt5.QtCore"].QTimer.singleShot(0, _on_first_iteration)
+        return original(*args, **kwargs)
+    return staticmethod(exec_)
+
+
+def _patch_qt_module(module):
+    _state["qt_imported"] = True
+    for class_name in APP_CLASSES:
+        cls = getattr(module, class_name, None)
+        for method in ("exec_", "exec"):
+            if cls is not None and method in vars(cls):
+                setattr(cls, method, _wrap_exec(getattr(cls, method)))
+
+
+class _PatchingLoader(importlib.abc.Loader):
+    """ Loads a Qt module with its own loader, then patches the application classes it defines """
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.loader.exec_module(module)
+        _patch_qt_module(module)
+
+
+class _QtFinder(importlib.abc.MetaPathFinder):
+    """ Intercepts the import of the Qt modules defining the application classes """
+
+    def find_spec(self, name, path, target=None):
+        if name not in QT_MODULES:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _PatchingLoader(spec.loader)
+                return spec
+        return None
+
+
+def _at_exit():
+    # Only the processes running a Qt application report: not the launchers
+    if _state["qt_imported"]:
+        _record(event_loop_reached=False)
+
+
+if PROBE_DIR:
+    if os.environ.get("BIPY_GUI_MANAGER_PROBE_CPROFILE"):
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    sys.meta_path.insert(0, _QtFinder())
+    atexit.register(_at_exit)
+
+_load_hidden_sitecustomize()
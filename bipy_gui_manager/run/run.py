@@ -1,10 +1,14 @@
+from typing import List, Optional
 import os
 import logging
 import argparse
 from pathlib import Path
 
 from bipy_gui_manager import OPERATIONAL_DEPLOY_PATH, DEVELOPMENT_DEPLOY_PATH, ACC_PY_PATH
+from bipy_gui_manager.deploy import publish
+from bipy_gui_manager.run import mirror, startup
 from bipy_gui_manager.utils import cli as cli
+from bipy_gui_manager.utils import fs, trash, tracing
 
 
 APP_RUN_SCRIPT = (Path(__file__).parent / "resources" / "app_run.sh").absolute()
@@ -22,7 +26,21 @@ def run(parameters: argparse.Namespace):
                               "Remember that it must be deployed before it can be run with this command.")
         return
 
-    repo_path = OPERATIONAL_DEPLOY_PATH if parameters.operational else DEVELOPMENT_DEPLOY_PATH
+    repo_path = str(OPERATIONAL_DEPLOY_PATH if parameters.operational else DEVELOPMENT_DEPLOY_PATH)
+    # The version chosen with 'rollback' or 'promote', if any. Otherwise acc-py launches the latest one.
+    version = publish.get_current(repo_path, app)
+    if parameters.local_mirror:
+        repo_path = use_local_mirror(app, repo_path, version)
+    if version:
+        try:
+            repo_path = get_version_view(repo_path, app, version)
+        except OSError as e:
+            logging.debug(f"Could not make a view of {app} {version}: {e}")
+            cli.negative_feedback(f"Could not select version {version}: launching the latest version of {app}.")
+
+    if parameters.profile_startup:
+        profile_startup(app, repo_path, cprofile=parameters.cprofile, version=version)
+        return
 
     try:
         logging.debug("Execute app_run.sh")
@@ -37,8 +55,117 @@ def run(parameters: argparse.Namespace):
         return
 
 
+def get_version_view(deploy_base: str, app: str, version: str) -> str:
+    """
+    acc-py chooses itself which version of an application to launch: to launch a given one, it's given a view of the
+    deploy base that contains only that version. Views are made of symlinks, in the cache, and reused.
+    :param deploy_base: where the application is deployed
+    :param app: the name of the application
+    :param version: the version to launch
+    :return: the view, to use as deploy base
+    :raises OSError if the view could not be created
+    """
+    view = fs.get_cache_path("views", mirror.get_base_key(deploy_base), app, version)
+    if os.path.isdir(os.path.join(view, app, version)):
+        return view
+    app_path = os.path.abspath(os.path.join(deploy_base, app))
+    os.makedirs(os.path.dirname(view), exist_ok=True)
+    staging = fs.sibling_path(view, "staging")
+    os.makedirs(os.path.join(staging, app))
+    os.symlink(os.path.join(app_path, version), os.path.join(staging, app, version))
+    with os.scandir(app_path) as entries:
+        # The metadata written by acc-py next to the versions
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                os.symlink(entry.path, os.path.join(staging, app, entry.name))
+    try:
+        fs.publish_tree(staging, view)
+    except OSError:
+        # Made by another launch in the meantime
+        trash.delete_tree(staging)
+        if not os.path.isdir(os.path.join(view, app, version)):
+            raise
+    return view
+
+
+def use_local_mirror(app: str, repo_path: str, version: Optional[str] = None) -> str:
+    """
+    Mirrors a version of the application on the local disk, if it's not there yet.
+    :param app: the name of the application
+    :param repo_path: where the application is deployed
+    :param version: the version to mirror. The latest one if not given.
+    :return: the deploy base to launch the application from: the mirror, or repo_path if the mirroring failed
+    """
+    try:
+        with tracing.span("local mirror", app=app):
+            mirror_base = mirror.sync(repo_path, app, version)
+    except (OSError, ValueError) as e:
+        logging.debug(e)
+        cli.negative_feedback(f"Could not mirror {app} locally ({e}): launching it from {repo_path}.")
+        return repo_path
+    logging.debug(f"Launching {app} from the local mirror {mirror_base}")
+    return mirror_base
+
+
+def profile_startup(app: str, repo_path: str, cprofile: bool = False, version: Optional[str] = None) -> None:
+    """
+    Launches the application, measures its startup until the first iteration of its event loop, then closes it.
+    The report is saved in the cache, to compare it with the other versions of the application.
+    :param app: the name of the application
+    :param repo_path: where the application is deployed
+    :param cprofile: whether to profile the startup with cProfile too
+    :param version: the version that is launched, if known
+    """
+    cli.positive_feedback(f"Profiling the startup of {app}: it will close as soon as it's ready")
+    try:
+        result = startup.launch(["/bin/bash", str(APP_RUN_SCRIPT), app, repo_path, str(ACC_PY_PATH)],
+                                cprofile=cprofile)
+    except OSError as e:
+        logging.debug(e)
+        cli.negative_feedback(f"Could not launch {app}: {e}")
+        return
+    if not result.imports:
+        cli.negative_feedback(f"No import was measured: {app} could not be launched "
+                              f"(exit code {result.returncode}).")
+        return
+
+    version = version or startup.find_version(repo_path, app, result.probes)
+    report = startup.build_report(app, version, result)
+    previous = [other for other in startup.load_reports(app) if other.get("version") != version]
+    try:
+        report_path = startup.save_report(report)
+    except OSError as e:
+        logging.debug(e)
+        report_path = None
+        cli.negative_feedback(f"Could not save the startup report: {e}")
+
+    if report["startup_seconds"] is None:
+        cli.negative_feedback(f"{app} exited before its event loop started (exit code {result.returncode}): "
+                              f"only the imports were measured.")
+    for line in startup.format_report(report, previous[-1] if previous else None):
+        cli.list_subtask(line)
+    if report["cprofile"]:
+        cli.list_subtask("cProfile, by cumulative time:")
+        cli.print_text(report["cprofile"])
+    if report_path:
+        cli.positive_feedback(f"Startup report of {app} {version or ''} saved in {report_path}")
+
+
+def find_apps(deploy_path: str) -> List[str]:
+    """
+    :param deploy_path: a deploy base (see OPERATIONAL_DEPLOY_PATH and DEVELOPMENT_DEPLOY_PATH)
+    :return: the names of the apps deployed there, or an empty list if the folder does not exist
+    """
+    if not os.path.isdir(deploy_path):
+        logging.debug(f"Deploy path {deploy_path} not found: no apps listed from it")
+        return []
+    # The hidden entries are not apps (i.e. versions being deployed, see deploy.publish)
+    return [app.name for app in Path(deploy_path).iterdir() if app.is_dir() and not app.name.startswith(".")]
+
+
 def get_runnable_apps_for_argcomplete():
     """ Returns a list of all the app names found under BOTH the dev and ops deploy paths (for argcomplete) """
-    ops_apps = [os.path.basename(app) for app in Path(OPERATIONAL_DEPLOY_PATH).iterdir() if os.path.isdir(app)]
-    dev_apps = [os.path.basename(app) for app in Path(DEVELOPMENT_DEPLOY_PATH).iterdir() if os.path.isdir(app)]
-    return list(dict.fromkeys(ops_apps + dev_apps))
+    apps = []
+    for deploy_path in (OPERATIONAL_DEPLOY_PATH, DEVELOPMENT_DEPLOY_PATH):
+        apps += find_apps(deploy_path)
+    return list(dict.fromkeys(apps))
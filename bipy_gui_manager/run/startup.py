@@ -0,0 +1,283 @@
+"""
+Measures how long a deployed application takes to start. The application is launched with Python's import time
+profiler (PYTHONPROFILEIMPORTTIME) and with the startup probe (resources/startup_probe), that records when the
+first iteration of the Qt event loop runs and can profile the startup with cProfile.
+The import times are aggregated into a report, saved in the cache for each version of the application so that
+versions can be compared.
+"""
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+import io
+import os
+import re
+import sys
+import json
+import time
+import pstats
+import shutil
+import signal
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from subprocess import Popen, PIPE
+
+from bipy_gui_manager.utils import fs
+
+PROBE_PATH = (Path(__file__).parent / "resources" / "startup_probe").absolute()
+# i.e. "import time:       626 |       1630 |   json.decoder" (microseconds, then the nesting in the indentation)
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)\s*$")
+PROFILES_FOLDER = "startup-profiles"
+TOP_IMPORTS = 15
+
+
+class ImportTime(NamedTuple):
+    name: str
+    self_us: int  # Time spent importing the module itself, in microseconds
+    cumulative_us: int  # Including the modules it imported
+    depth: int  # 0 for the modules imported directly by the code, 1 for the modules they import, ...
+
+
+class LaunchResult(NamedTuple):
+    returncode: Optional[int]  # None if the application was stopped because it did not quit in time
+    started_at: float  # When the launch began (time.time())
+    imports: List[ImportTime]
+    probes: List[Dict[str, Any]]  # What the probe recorded in the processes running a Qt application
+
+
+def parse_import_time(line: str) -> Optional[ImportTime]:
+    """
+    :param line: a line printed on stderr by a Python process run with -X importtime
+    :return: the import described by the line, or None if the line is something else (i.e. the header)
+    """
+    match = IMPORT_TIME_PATTERN.match(line.rstrip("\n"))
+    if not match:
+        return None
+    self_us, cumulative_us, indentation, name = match.groups()
+    return ImportTime(name=name, self_us=int(self_us), cumulative_us=int(cumulative_us),
+                      depth=len(indentation) // 2)
+
+
+def launch(command: Sequence[str], cprofile: bool = False, quit_on_start: bool = True,
+           timeout: Optional[float] = None, env: Optional[Dict[str, str]] = None) -> LaunchResult:
+    """
+    Launches an application with the import time profiler and the startup probe. The lines printed on stderr that
+    are not import times are forwarded to the terminal.
+    :param command: the command launching the application (the processes it starts are profiled as well)
+    :param cprofile: whether to profile the startup with cProfile too (until the first event loop iteration)
+    :param quit_on_start: whether to quit the application as soon as its event loop runs
+    :param timeout: if given, the application is stopped if it did not exit after that many seconds
+    :param env: extra environment variables for the application
+    :return: what was measured
+    """
+    probe_dir = tempfile.mkdtemp(prefix="bipy-gui-manager-probe-")
+    environment = dict(os.environ, **(env or {}))
+    environment.update({
+        "PYTHONPROFILEIMPORTTIME": "1",
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(PROBE_PATH), environment.get("PYTHONPATH")])),
+        "BIPY_GUI_MANAGER_PROBE_DIR": probe_dir,
+    })
+    if cprofile:
+        environment["BIPY_GUI_MANAGER_PROBE_CPROFILE"] = "1"
+    if quit_on_start:
+        environment["BIPY_GUI_MANAGER_PROBE_QUIT"] = "1"
+
+    imports = []
+    started_at = time.time()
+    logging.debug(f"Launching {' '.join(command)} with the startup probe in {probe_dir}")
+    try:
+        # In its own process group: acc-py starts the application in a child process, which must be stopped too
+        process = Popen(command, env=environment, stderr=PIPE, universal_newlines=True, errors="replace",
+                        start_new_session=True)
+        finished, timed_out = threading.Event(), threading.Event()
+
+        # Reading stderr does not block the timeout: the application is killed from another thread if needed. The
+        # children inherit stderr, so the reading only ends once all of them exited.
+        def stop_on_timeout():
+            if not finished.wait(timeout):
+                logging.debug(f"{command[0]} did not exit in {timeout}s: stopping it")
+                timed_out.set()
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+        if timeout is not None:
+            threading.Thread(target=stop_on_timeout, daemon=True).start()
+        try:
+            for line in process.stderr:
+                import_time = parse_import_time(line)
+                if import_time is not None:
+                    imports.append(import_time)
+                elif not line.startswith("import time:"):
+                    sys.stderr.write(line)
+            returncode = process.wait()
+        finally:
+            finished.set()
+        if timed_out.is_set():
+            returncode = None
+        probes = read_probes(probe_dir)
+    finally:
+        shutil.rmtree(probe_dir, ignore_errors=True)
+    return LaunchResult(returncode=returncode, started_at=started_at, imports=imports, probes=probes)
+
+
+def read_probes(probe_dir: str) -> List[Dict[str, Any]]:
+    """
+    :param probe_dir: the folder where the startup probes wrote their results
+    :return: the results, with the cProfile data (if any) loaded as text since the folder is temporary
+    """
+    probes = []
+    for name in sorted(os.listdir(probe_dir)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(probe_dir, name)) as f:
+                probe = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.debug(f"Invalid probe result {name}: {e}")
+            continue
+        if probe.get("cprofile"):
+            probe["cprofile_stats"] = format_cprofile(probe["cprofile"])
+        probes.append(probe)
+    return probes
+
+
+def format_cprofile(stats_path: str, limit: int = 50) -> Optional[str]:
+    """
+    :param stats_path: the data saved by cProfile
+    :param limit: how many functions to list
+    :return: the functions that took the most cumulative time, as printed by pstats
+    """
+    output = io.StringIO()
+    try:
+        pstats.Stats(stats_path, stream=output).sort_stats("cumulative").print_stats(limit)
+    except (OSError, ValueError, TypeError) as e:
+        logging.debug(f"Could not read the cProfile data {stats_path}: {e}")
+        return None
+    return output.getvalue()
+
+
+def aggregate_imports(imports: Iterable[ImportTime]) -> List[Dict[str, Any]]:
+    """
+    :param imports: the imports measured (the same module can be imported by several processes)
+    :return: one entry per module, with its times summed over the processes, by descending cumulative time
+    """
+    modules = {}  # type: Dict[str, Dict[str, Any]]
+    for item in imports:
+        module = modules.setdefault(item.name, {"name": item.name, "self_us": 0, "cumulative_us": 0, "count": 0})
+        module["self_us"] += item.self_us
+        module["cumulative_us"] += item.cumulative_us
+        module["count"] += 1
+    return sorted(modules.values(), key=lambda module: (-module["cumulative_us"], module["name"]))
+
+
+def aggregate_packages(imports: Iterable[ImportTime]) -> List[Dict[str, Any]]:
+    """
+    :param imports: the imports measured
+    :return: the time spent in the modules of each top-level package (self times, so nothing is counted twice),
+        by descending time
+    """
+    packages = {}  # type: Dict[str, int]
+    for item in imports:
+        package = item.name.split(".")[0]
+        packages[package] = packages.get(package, 0) + item.self_us
+    return [{"name": name, "self_us": self_us}
+            for name, self_us in sorted(packages.items(), key=lambda package: (-package[1], package[0]))]
+
+
+def find_version(deploy_base: str, app: str, probes: Sequence[Dict[str, Any]]) -> Optional[str]:
+    """
+    :param deploy_base: where the application is deployed
+    :param app: the name of the application
+    :param probes: the results of the startup probes
+    :return: the version that ran, found from the environment of the application, or None if unknown
+    """
+    app_folder = os.path.realpath(os.path.join(deploy_base, app))
+    for probe in probes:
+        relative = os.path.relpath(os.path.realpath(probe.get("prefix") or "/"), app_folder)
+        if not relative.startswith(os.pardir) and relative != os.curdir:
+            return relative.split(os.sep)[0]
+    return None
+
+
+def build_report(app: str, version: Optional[str], result: LaunchResult, headless: bool = False) -> Dict[str, Any]:
+    """
+    :param app: the name of the application
+    :param version: the version that ran, if known
+    :param result: what was measured while launching it
+    :param headless: whether the application ran without a display (the timings are not comparable with the ones
+        measured on a display)
+    :return: the startup report (serializable to JSON)
+    """
+    reached = [probe["event_loop_reached"] for probe in result.probes if probe.get("event_loop_reached")]
+    return {
+        "app": app,
+        "version": version,
+        "headless": headless,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        # Launch to first event loop iteration: what the user waits for
+        "startup_seconds": round(min(reached) - result.started_at, 3) if reached else None,
+        "import_seconds": round(sum(item.self_us for item in result.imports) / 1e6, 3),
+        "returncode": result.returncode,
+        "packages": aggregate_packages(result.imports),
+        "imports": aggregate_imports(result.imports),
+        "cprofile": next((probe["cprofile_stats"] for probe in result.probes if probe.get("cprofile_stats")), None),
+    }
+
+
+def get_report_path(app: str, version: Optional[str], headless: bool = False) -> str:
+    """ :return: where the startup report of a version of an application is saved """
+    return fs.get_cache_path(PROFILES_FOLDER, app, f"{version or 'unknown'}{'.headless' if headless else ''}.json")
+
+
+def save_report(report: Dict[str, Any]) -> str:
+    """
+    Saves the report, replacing the previous one of the same version.
+    :return: the path of the report
+    """
+    path = get_report_path(report["app"], report["version"], report.get("headless", False))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fs.replace_file_content(path, json.dumps(report, indent=2))
+    return path
+
+
+def load_reports(app: str, headless: bool = False) -> List[Dict[str, Any]]:
+    """
+    :param app: the name of the application
+    :param headless: whether to load the reports of the headless launches (see build_report()) or the other ones
+    :return: the saved startup reports of all the versions of an application, oldest first
+    """
+    folder = fs.get_cache_path(PROFILES_FOLDER, app)
+    reports = []
+    for path in Path(folder).glob("*.json") if os.path.isdir(folder) else []:
+        try:
+            with open(path) as f:
+                report = json.load(f)
+            if report.get("headless", False) == headless:
+                reports.append(report)
+        except (OSError, ValueError) as e:
+            logging.debug(f"Invalid startup report {path}: {e}")
+    return sorted(reports, key=lambda report: report.get("created", ""))
+
+
+def format_report(report: Dict[str, Any], previous: Optional[Dict[str, Any]] = None,
+                  top: int = TOP_IMPORTS) -> List[str]:
+    """
+    :param report: a startup report
+    :param previous: the report of another version to compare with, if any
+    :param top: how many imports to list
+    :return: the lines summarizing the report
+    """
+    def seconds(value):
+        return "n/a" if value is None else f"{value:.2f}s"
+
+    lines = [f"Startup: {seconds(report['startup_seconds'])} (imports: {seconds(report['import_seconds'])})"]
+    if previous is not None:
+        lines.append(f"Version {previous['version']}: {seconds(previous.get('startup_seconds'))} "
+                     f"(imports: {seconds(previous.get('import_seconds'))})")
+    lines.append("Slowest packages: " + ", ".join(f"{package['name']} {package['self_us'] / 1e3:.0f}ms"
+                                                  for package in report["packages"][:5]))
+    lines.append(f"{'cumulative':>12} {'self':>10}  module")
+    lines += [f"{module['cumulative_us'] / 1e3:>10.1f}ms {module['self_us'] / 1e3:>8.1f}ms  {module['name']}"
+              for module in report["imports"][:top]]
+    return lines
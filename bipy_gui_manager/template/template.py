@@ -0,0 +1,50 @@
+import os
+import logging
+import argparse
+
+from bipy_gui_manager.new import template_pack
+from bipy_gui_manager.new.constants import TEMPLATE_TOKENS, PATH_TOKENS
+from bipy_gui_manager.utils import cli as cli
+from bipy_gui_manager.utils import version_control as vcs
+
+
+def build(parameters: argparse.Namespace):
+    """
+    Builds a template pack out of a template folder, so that it can be used with 'new --template-pack'.
+    :param parameters: the parameters passed through the CLI
+    :return: None, but creates the template pack.
+    """
+    if parameters.verbose:
+        logging.basicConfig(format='[%(levelname)s] %(message)s', level=logging.DEBUG)
+
+    template_path = os.path.abspath(parameters.template_path)
+    name = parameters.name or os.path.basename(template_path)
+    version = parameters.version or get_template_version(template_path)
+    output = parameters.output or os.path.join(os.getcwd(), f"{name}-{version}.tar.gz")
+
+    try:
+        cli.positive_feedback(f"Building template pack {name} version {version}", newline=False)
+        manifest = template_pack.build_pack(template_path, output, tokens=TEMPLATE_TOKENS, path_tokens=PATH_TOKENS,
+                                            name=name, version=version)
+    except (OSError, ValueError) as e:
+        logging.debug(e)
+        cli.negative_feedback(f"Failed to build the template pack: {e}")
+        return
+
+    cli.list_subtask(f"{len(manifest['files'])} files to customize, {len(manifest['renames'])} folders to rename")
+    cli.positive_feedback(f"Template pack saved in {output}")
+    cli.give_hint(f"use it with 'bipy-gui-manager new --template-pack {output}'")
+
+
+def get_template_version(template_path: str) -> str:
+    """
+    :param template_path: the template folder
+    :return: the output of 'git describe' if the template is a Git repository, 'unversioned' otherwise.
+    """
+    try:
+        stdout, _ = vcs.invoke_git(parameters=['describe', '--tags', '--always', '--dirty'], cwd=template_path,
+                                   neg_feedback="Failed to find the template version.")
+        return stdout.strip() or "unversioned"
+    except OSError:
+        logging.debug(f"Could not find the version of {template_path} with Git")
+        return "unversioned"
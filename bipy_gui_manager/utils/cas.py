@@ -0,0 +1,121 @@
+"""
+Content-addressed storage of files, shared by the local mirror (see run.mirror) and the store of the deploy bases
+(see deploy.store). Each content is kept once per file mode, as <objects>/<xx>/<sha256>-<mode>, and used through
+hardlinks: an object that has a single link is used by nobody anymore.
+"""
+from typing import FrozenSet, Optional, Tuple
+import os
+import uuid
+import hashlib
+
+BLOCK_SIZE = 1024 * 1024
+TEMPORARY_PREFIX = ".incoming-"
+# setgid, so that the group of the folders is inherited
+SHARED_FOLDER_MODE = 0o2775
+
+
+def make_folders(path: str, shared: bool = False) -> None:
+    """
+    Like os.makedirs(path, exist_ok=True).
+    :param path: the folder to create
+    :param shared: if True, the folders created are writable by their group, whatever the umask: all the users of
+        a shared store (i.e. in a deploy base) can add objects into them
+    """
+    if os.path.isdir(path):
+        return
+    make_folders(os.path.dirname(path), shared)
+    try:
+        os.mkdir(path)
+    except FileExistsError:
+        return
+    if shared:
+        os.chmod(path, SHARED_FOLDER_MODE)
+
+
+def hash_file(path: str, copy_to: Optional[str] = None) -> str:
+    """
+    :param path: the file to hash
+    :param copy_to: if given, the file is copied there while being read
+    :return: the sha256 of the content of the file
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        output = open(copy_to, "wb") if copy_to else None
+        try:
+            for block in iter(lambda: source.read(BLOCK_SIZE), b""):
+                digest.update(block)
+                if output:
+                    output.write(block)
+        finally:
+            if output:
+                output.close()
+    return digest.hexdigest()
+
+
+def get_object_name(digest: str, mode: int) -> str:
+    """
+    :param digest: the sha256 of the content (see hash_file())
+    :param mode: the mode of the file (only the permission bits are considered)
+    :return: the name of the object, relative to the objects folder
+    """
+    return os.path.join(digest[:2], f"{digest}-{mode & 0o7777:o}")
+
+
+def get_temporary_path(objects_path: str, shared: bool = False) -> str:
+    """ :return: a unique path in the objects folder (created if needed), to prepare an object before insert() """
+    make_folders(objects_path, shared)
+    return os.path.join(objects_path, f"{TEMPORARY_PREFIX}{uuid.uuid4().hex}")
+
+
+def insert(objects_path: str, temporary: str, name: str, shared: bool = False) -> bool:
+    """
+    Makes a file prepared aside the object with the given name, unless it exists already.
+    :param objects_path: the objects folder
+    :param temporary: the file to insert (see get_temporary_path()). It's removed if the object exists already.
+    :param name: the name of the object (see get_object_name())
+    :param shared: whether the folders created must be writable by their group (see make_folders())
+    :return: True if the file became the object, False if the object existed already
+    """
+    object_path = os.path.join(objects_path, name)
+    if os.path.exists(object_path):
+        os.remove(temporary)
+        return False
+    make_folders(os.path.dirname(object_path), shared)
+    # If another process inserted the same content meanwhile, either object is fine
+    os.replace(temporary, object_path)
+    return True
+
+
+def list_inodes(objects_path: str) -> FrozenSet[Tuple[int, int]]:
+    """ :return: the (device, inode) of the objects: the files with these are links to objects already """
+    inodes = set()
+    for root, _, names in os.walk(objects_path):
+        for name in names:
+            try:
+                stat = os.lstat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            inodes.add((stat.st_dev, stat.st_ino))
+    return frozenset(inodes)
+
+
+def collect_garbage(objects_path: str) -> int:
+    """
+    Removes the objects that nobody links to anymore (not the objects being prepared, see get_temporary_path()).
+    :param objects_path: the objects folder
+    :return: how many bytes were freed
+    """
+    freed = 0
+    for root, _, names in os.walk(objects_path):
+        for name in names:
+            path = os.path.join(root, name)
+            if name.startswith(TEMPORARY_PREFIX):
+                continue
+            try:
+                stat = os.lstat(path)
+                if stat.st_nlink == 1:
+                    os.remove(path)
+                    freed += stat.st_size
+            except FileNotFoundError:
+                pass
+    return freed
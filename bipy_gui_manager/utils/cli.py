@@ -1,38 +1,132 @@
 # TODO manage better those ANSI Color code escapes
+from typing import List, Tuple
+import threading
+from contextlib import contextmanager
+
+# What the messages are: each reporter decides how (and whether) to show them
+WELCOME = "welcome"
+LINE = "line"
+SECTION = "section"
+TEXT = "text"
+POSITIVE = "positive"
+SUBTASK = "subtask"
+HINT = "hint"
+NEGATIVE = "negative"
+
+
+class TerminalReporter:
+    """
+    Shows the messages to a human in a terminal, with colours, and asks the questions on the standard input.
+    """
+
+    def report(self, kind: str, message: str = "", newline: bool = True) -> None:
+        if kind == WELCOME:
+            print("_________________________________________________________________________\n")
+            print("  Welcome to BI's PyQt5 Project Setup Wizard!")
+            print("_________________________________________________________________________\n")
+        elif kind == LINE:
+            print("\n_________________________________________________________________________\n")
+        elif kind == SECTION:
+            print("  {}\n".format(message))
+        elif kind == POSITIVE:
+            if newline:
+                print("\033[0;32m=>\033[0;m {}\n".format(message))
+            else:
+                print("\033[0;32m=>\033[0;m {}  ".format(message))
+        elif kind == SUBTASK:
+            print("    - {}".format(message))
+        elif kind == HINT:
+            print("    - Hint: {}".format(message))
+        elif kind == NEGATIVE:
+            print("\033[0;31m=> Error!\033[0;33m {}\033[0;m".format(message))
+        else:
+            print(message)
+
+    def ask(self, kind: str, question: str) -> str:
+        if kind == NEGATIVE:
+            return input("\033[0;31m=> Error!\033[0;33m {} \033[0;m".format(question))
+        return input("\033[0;33m=>\033[0;m {}  ".format(question))
+
+
+class RecordingReporter:
+    """
+    Keeps the messages instead of showing them, i.e. for programs using the manager (see bipy_gui_manager.api).
+    Can't answer questions: anything that needs the user's input fails.
+    """
+
+    def __init__(self):
+        self.messages = []  # type: List[Tuple[str, str]]
+
+    def report(self, kind: str, message: str = "", newline: bool = True) -> None:
+        self.messages.append((kind, message))
+
+    def ask(self, kind: str, question: str) -> str:
+        raise OSError(f"Can't ask the user: '{question}'")
+
+    def errors(self) -> List[str]:
+        """ :return: the error messages reported so far """
+        return [message for kind, message in self.messages if kind == NEGATIVE]
+
+
+_DEFAULT_REPORTER = TerminalReporter()
+# Each thread can report to a different reporter (i.e. several operations running in the same process)
+_local = threading.local()
+
+
+def get_reporter():
+    """ :return: the reporter that receives the messages of the current thread """
+    return getattr(_local, "reporter", None) or _DEFAULT_REPORTER
+
+
+@contextmanager
+def use_reporter(reporter):
+    """
+    Sends the messages of the current thread to the given reporter, within the context.
+    :param reporter: an object with the same methods as TerminalReporter. If None, the current one is kept.
+    """
+    previous = getattr(_local, "reporter", None)
+    _local.reporter = reporter or previous
+    try:
+        yield get_reporter()
+    finally:
+        _local.reporter = previous
 
 
 def print_welcome():
-    print("_________________________________________________________________________\n")
-    print("  Welcome to BI's PyQt5 Project Setup Wizard!")
-    print("_________________________________________________________________________\n")
+    get_reporter().report(WELCOME)
 
 
 def draw_line():
-    print("\n_________________________________________________________________________\n")
+    get_reporter().report(LINE)
+
+
+def print_section(string):
+    get_reporter().report(SECTION, string)
+
+
+def print_text(string):
+    get_reporter().report(TEXT, string)
 
 
 def ask_input(string):
-    return input("\033[0;33m=>\033[0;m {}  ".format(string))
+    return get_reporter().ask(POSITIVE, string)
 
 
 def handle_failure(string):
-    return input("\033[0;31m=> Error!\033[0;33m {} \033[0;m".format(string))
+    return get_reporter().ask(NEGATIVE, string)
 
 
 def positive_feedback(string, newline=True):
-    if newline:
-        print("\033[0;32m=>\033[0;m {}\n".format(string))
-    else:
-        print("\033[0;32m=>\033[0;m {}  ".format(string))
+    get_reporter().report(POSITIVE, string, newline=newline)
 
 
 def list_subtask(string):
-    print("    - {}".format(string))
+    get_reporter().report(SUBTASK, string)
 
 
 def give_hint(string):
-    print("    - Hint: {}".format(string))
+    get_reporter().report(HINT, string)
 
 
 def negative_feedback(string):
-    print("\033[0;31m=> Error!\033[0;33m {}\033[0;m".format(string))
+    get_reporter().report(NEGATIVE, string)
@@ -0,0 +1,233 @@
+"""
+Filesystem helpers: fast tree cloning (reflinks, hardlinks or a parallel copy), link-safe file rewriting,
+staged (build aside, then rename) folder creation and advisory locks.
+"""
+from typing import Iterator, List, Optional
+import os
+import uuid
+import errno
+import fcntl
+import shutil
+import logging
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+FICLONE = 0x40049409  # From linux/fs.h: _IOW(0x94, 9, int)
+CHUNK_SIZE = 64 * 1024 * 1024  # Files larger than this are copied in parallel chunks
+CLONE_MODES = ("auto", "reflink", "hardlink", "copy")
+
+# Errors meaning "this filesystem (or this pair of filesystems) can't do it", as opposed to real failures
+_UNSUPPORTED = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.EBADF, errno.ENOSYS, errno.EPERM,
+                errno.EMLINK}
+
+
+def get_cache_path(*subfolders: str) -> str:
+    """
+    Returns the path to the manager's cache folder for the current user (or to one of its subfolders).
+    It can be changed with the BIPY_GUI_MANAGER_CACHE_PATH environment variable.
+    :param subfolders: the subfolders to append to the cache path
+    :return: the path. It might not exist yet.
+    """
+    default = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "bipy-gui-manager")
+    return os.path.join(os.environ.get("BIPY_GUI_MANAGER_CACHE_PATH", default), *subfolders)
+
+
+def default_workers() -> int:
+    """ Number of threads to use for I/O bound parallel operations """
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def reflink_file(src: str, dst: str) -> None:
+    """
+    Creates dst as a copy-on-write clone of src (works on Btrfs, XFS, and a few others).
+    :raises OSError if the filesystem does not support it.
+    """
+    try:
+        with open(src, 'rb') as source, open(dst, 'wb') as destination:
+            fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        raise
+    shutil.copystat(src, dst)
+
+
+def hardlink_file(src: str, dst: str) -> None:
+    """
+    Creates dst as a hardlink to src.
+    NOTE: writing dst in place will modify src as well: see replace_file_content()
+    :raises OSError if the filesystem does not support it.
+    """
+    os.link(src, dst)
+
+
+def copy_file(src: str, dst: str, chunk_size: int = CHUNK_SIZE) -> None:
+    """
+    Copies src into dst with its metadata. Files larger than chunk_size are copied in parallel chunks.
+    """
+    size = os.path.getsize(src)
+    if size <= chunk_size:
+        shutil.copy2(src, dst)
+        return
+
+    with open(src, 'rb') as source, open(dst, 'wb') as destination:
+        destination.truncate(size)
+
+        def copy_chunk(offset: int) -> None:
+            end = min(offset + chunk_size, size)
+            while offset < end:
+                data = os.pread(source.fileno(), min(end - offset, 1024 * 1024), offset)
+                if not data:
+                    raise OSError(f"{src} was truncated while being copied")
+                os.pwrite(destination.fileno(), data, offset)
+                offset += len(data)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(copy_chunk, range(0, size, chunk_size)))
+    shutil.copystat(src, dst)
+
+
+def clone_tree(src: str, dst: str, mode: str = "auto", workers: Optional[int] = None,
+               symlinks: bool = False) -> List[str]:
+    """
+    Recreates the content of src into dst (which must not exist) without ever modifying src.
+    :param src: the folder to clone
+    :param dst: where to clone it
+    :param mode: 'reflink' (copy-on-write clones), 'hardlink', 'copy' (parallel copy), or 'auto', which uses
+        reflinks where the filesystem supports them and falls back to copying otherwise. If reflinks or hardlinks
+        are requested and turn out not to be supported, copying is used as well.
+    :param workers: how many files to process in parallel
+    :param symlinks: if True, the symlinks are recreated as symlinks (i.e. in a virtualenv), otherwise what they
+        point to is cloned
+    :return: the paths of the files created, relative to dst
+    :raises FileNotFoundError if src is not a folder, FileExistsError if dst already exists
+    """
+    if mode not in CLONE_MODES:
+        raise ValueError(f"Clone mode not recognized: {mode}")
+    if not os.path.isdir(src):
+        raise FileNotFoundError(f"'{src}' is not a directory")
+    if os.path.lexists(dst):
+        raise FileExistsError(f"'{dst}' already exists")
+
+    directories, files, links = [], [], []
+    for rootdir, dirs, filenames in os.walk(src, followlinks=not symlinks):
+        relative_root = os.path.relpath(rootdir, src)
+        for names, entries in ((dirs, directories), (filenames, files)):
+            for name in names:
+                is_link = symlinks and os.path.islink(os.path.join(rootdir, name))
+                (links if is_link else entries).append(os.path.normpath(os.path.join(relative_root, name)))
+
+    os.makedirs(dst)
+    for directory in directories:
+        os.makedirs(os.path.join(dst, directory))
+    for link in links:
+        os.symlink(os.readlink(os.path.join(src, link)), os.path.join(dst, link))
+
+    all_files = sorted(files + links)
+
+    # Try the fast path on the first file to find out whether the filesystem supports it
+    if files and mode != "copy":
+        first = files[0]
+        try:
+            (hardlink_file if mode == "hardlink" else reflink_file)(os.path.join(src, first), os.path.join(dst, first))
+            mode = "hardlink" if mode == "hardlink" else "reflink"
+            files = files[1:]
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            logging.debug(f"{mode} not supported from {src} to {dst} ({e}): falling back to copy")
+            mode = "copy"
+    fast_clone = {"reflink": reflink_file, "hardlink": hardlink_file}.get(mode, None)
+    logging.debug(f"Cloning {src} into {dst} with mode '{mode}'")
+
+    def clone(relative_path: str) -> None:
+        source, destination = os.path.join(src, relative_path), os.path.join(dst, relative_path)
+        if fast_clone:
+            try:
+                fast_clone(source, destination)
+                return
+            except OSError as e:
+                # Symlinked folders might lead to another filesystem
+                if e.errno not in _UNSUPPORTED:
+                    raise
+        copy_file(source, destination)
+
+    with ThreadPoolExecutor(max_workers=workers or default_workers()) as pool:
+        list(pool.map(clone, files))
+
+    for directory in reversed(directories):
+        shutil.copystat(os.path.join(src, directory), os.path.join(dst, directory))
+    shutil.copystat(src, dst)
+    return all_files
+
+
+def replace_file_content(path: str, content: str, encoding: Optional[str] = None) -> None:
+    """
+    Writes content into path by replacing the file rather than writing it in place. This way, if path is
+    a hardlink (see clone_tree()), the other links are not modified.
+    :param path: the file to write
+    :param content: the new content of the file
+    :param encoding: the encoding to use. Defaults to the locale's one.
+    """
+    directory, name = os.path.split(path)
+    fd, temporary = tempfile.mkstemp(prefix=f".{name}.", dir=directory or ".")
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            f.write(content)
+        if os.path.exists(path):
+            shutil.copymode(path, temporary)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def sibling_path(path: str, label: str) -> str:
+    """
+    Returns a unique hidden path next to the given one, i.e. on the same filesystem, so that renaming between
+    the two is atomic and does not move any data.
+    :param path: the reference path
+    :param label: what the sibling is for (i.e. 'staging'), to make it recognizable
+    :return: the path, which does not exist yet.
+    """
+    parent, name = os.path.split(os.path.normpath(path))
+    return os.path.join(parent, ".{}.{}-{}".format(name, label, uuid.uuid4().hex[:8]))
+
+
+def publish_tree(staging_path: str, path: str) -> None:
+    """
+    Moves a folder built aside into its final location with a single rename.
+    :param staging_path: the folder built aside (see sibling_path())
+    :param path: where to publish it. Must not exist, or be an empty folder.
+    :raises OSError if path exists and is not empty
+    """
+    logging.debug(f"Publishing {staging_path} as {path}")
+    os.rename(staging_path, path)
+
+
+@contextmanager
+def locked(lock_path: str, blocking: bool = True) -> Iterator[None]:
+    """
+    Holds an exclusive advisory lock (flock) on the given file within the context, waiting for it if needed.
+    Only processes taking the same lock are excluded.
+    :param lock_path: the lock file. Created if it does not exist, writable by everybody: the lock of a deploy base
+        is shared by all the users deploying into it.
+    :param blocking: if False, raises BlockingIOError instead of waiting when the lock is held
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    try:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o666)
+        os.fchmod(fd, 0o666)  # The umask of the creator does not apply
+    except FileExistsError:
+        # Opened for writing: on NFS, flock is emulated with fcntl locks, which need it
+        fd = os.open(lock_path, os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
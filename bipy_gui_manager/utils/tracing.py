@@ -0,0 +1,154 @@
+from typing import Any, Dict, List, Optional
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+
+class Span:
+    """
+    A named and timed section of the execution. Spans can be nested: each span knows its parent and its depth.
+    Timings are taken with a monotonic clock and are relative to the origin of the tracer that created the span.
+    """
+
+    def __init__(self, name: str, category: str, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.attributes = dict(attributes)
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.end = None  # type: Optional[float]
+        self.error = None  # type: Optional[str]
+
+    @property
+    def duration(self) -> float:
+        """ Duration of the span in seconds. If the span is still open, the time elapsed so far. """
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+
+class Tracer:
+    """
+    Collects spans. Each thread has its own stack of open spans, so spans opened from worker threads
+    do not get mixed up with the ones of the main thread.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []  # type: List[Span]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, category: str = "stage", **attributes):
+        """
+        Times the code executed in the context.
+        :param name: name of the span, as it will be shown in the summary
+        :param category: kind of operation, i.e. 'stage', 'subprocess' or 'network'
+        :param attributes: any additional information to store with the span. Can be extended by the code inside
+            the context through the yielded span's ``attributes`` dictionary.
+        :return: the Span object
+        """
+        stack = self._stack()
+        span = Span(name=name, category=category, parent=stack[-1] if stack else None, attributes=attributes)
+        with self._lock:
+            self.spans.append(span)
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = "{}: {}".format(type(e).__name__, e)
+            raise
+        finally:
+            span.end = time.perf_counter()
+            stack.pop()
+            logging.debug("[trace] {} '{}' took {:.3f}s".format(category, name, span.duration))
+
+    def total_time(self) -> float:
+        """ Wall time elapsed since the tracer was created, in seconds. """
+        return time.perf_counter() - self.origin
+
+    def summary(self) -> str:
+        """
+        Renders the spans collected so far as a human readable table, nested spans indented under their parent.
+        :return: the table, as a string
+        """
+        total = self.total_time()
+        lines = ["    {:<52} {:>10} {:>8}".format("Step", "Time (s)", "Share")]
+        for span in sorted(self.spans, key=lambda s: s.start):
+            label = "  " * span.depth + (span.name if span.category == "stage"
+                                         else "{}: {}".format(span.category, span.name))
+            if span.error:
+                label += " (failed)"
+            share = 100 * span.duration / total if total else 0.0
+            lines.append("    {:<52} {:>10.3f} {:>7.1f}%".format(label[:52], span.duration, share))
+
+        for category in ("subprocess", "network"):
+            spans = [span for span in self.spans if span.category == category]
+            if spans:
+                spent = sum(span.duration for span in spans)
+                lines.append("    {:<52} {:>10.3f} {:>7.1f}%".format(
+                    "(all {} calls: {})".format(category, len(spans)), spent, 100 * spent / total if total else 0.0))
+        lines.append("    {:<52} {:>10.3f} {:>7.1f}%".format("Total", total, 100.0))
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Converts the spans collected so far into the Chrome Trace Event format
+        (can be loaded in chrome://tracing or https://ui.perfetto.dev)
+        :return: the trace, as a JSON-serializable dictionary
+        """
+        events = []
+        for span in self.spans:
+            args = {key: str(value) for key, value in span.attributes.items()}
+            if span.error:
+                args["error"] = span.error
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start - self.origin) * 1e6, 3),
+                "dur": round(span.duration * 1e6, 3),
+                "pid": os.getpid(),
+                "tid": span.thread_id,
+                "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> None:
+        """
+        Saves the trace on disk in the Chrome Trace Event format.
+        :param path: where to save the trace
+        """
+        logging.debug("Writing trace to {}".format(path))
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f, indent=1)
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """ Returns the tracer currently in use """
+    return _tracer
+
+
+def reset_tracer() -> Tracer:
+    """ Replaces the current tracer with an empty one and returns it """
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def span(name: str, category: str = "stage", **attributes):
+    """ Opens a span on the current tracer. See Tracer.span() """
+    return _tracer.span(name, category, **attributes)
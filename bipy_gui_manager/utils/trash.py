@@ -0,0 +1,179 @@
+"""
+A per-user trash for the folders the manager has to get rid of (overwritten projects, failed attempts...).
+Folders are moved into the trash with a rename, which is instant, and deleted afterwards by a detached process
+that removes their files in parallel, so that nobody has to wait for a virtualenv to be deleted file by file,
+maybe over NFS. Whatever such a process leaves behind (i.e. if the machine is rebooted) is purged by 'gc'.
+"""
+from typing import List, Optional, Tuple
+import os
+import sys
+import uuid
+import shutil
+import logging
+from subprocess import Popen, DEVNULL
+from concurrent.futures import ThreadPoolExecutor
+
+from bipy_gui_manager.utils import fs
+
+# Used when the cache folder is on another filesystem than the folder to discard (a rename can't cross filesystems)
+LOCAL_TRASH_NAME = ".bipy-gui-manager-trash-{uid}"
+LOCATIONS_FILE = "trash-locations"
+
+
+def get_trash_path(path: str) -> str:
+    """
+    Finds the trash folder to use for the given path. It must be on the same filesystem, so that moving path into
+    it is a rename: it's the 'trash' folder in the user's cache if possible, otherwise a hidden folder next to path.
+    :param path: the folder to discard
+    :return: the path to the trash folder. It might not exist yet.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    cache_trash = fs.get_cache_path("trash")
+    try:
+        os.makedirs(cache_trash, mode=0o700, exist_ok=True)
+        if same_filesystem(cache_trash, parent):
+            return cache_trash
+    except OSError as e:
+        logging.debug(f"Can't use {cache_trash} as trash: {e}")
+    return os.path.join(parent, LOCAL_TRASH_NAME.format(uid=os.getuid()))
+
+
+def same_filesystem(path: str, other_path: str) -> bool:
+    """ :return: True if a rename between the two paths is possible """
+    return os.stat(path).st_dev == os.stat(other_path).st_dev
+
+
+def get_trash_locations() -> List[str]:
+    """
+    :return: all the trash folders used so far by the current user that still exist.
+    """
+    locations = [fs.get_cache_path("trash")]
+    try:
+        with open(fs.get_cache_path(LOCATIONS_FILE)) as f:
+            locations += [line.strip() for line in f if line.strip()]
+    except OSError:
+        pass
+    return [location for i, location in enumerate(locations)
+            if location not in locations[:i] and os.path.isdir(location)]
+
+
+def _register_location(trash_path: str) -> None:
+    """ Remembers the trash folders outside of the cache, so that 'gc' can find them """
+    if trash_path == fs.get_cache_path("trash") or trash_path in get_trash_locations():
+        return
+    try:
+        os.makedirs(fs.get_cache_path(), exist_ok=True)
+        with open(fs.get_cache_path(LOCATIONS_FILE), "a") as f:
+            f.write(trash_path + "\n")
+    except OSError as e:
+        logging.debug(f"Could not register the trash folder {trash_path}: {e}")
+
+
+def move_to_trash(path: str) -> Optional[str]:
+    """
+    Moves a folder into the trash. The folder disappears immediately, but its content is not deleted.
+    :param path: the folder to discard
+    :return: the new path of the folder, or None if path did not exist
+    """
+    if not os.path.lexists(path):
+        return None
+    trash_path = get_trash_path(path)
+    os.makedirs(trash_path, mode=0o700, exist_ok=True)
+    _register_location(trash_path)
+    name = os.path.basename(os.path.normpath(path))
+    trashed = os.path.join(trash_path, f"{name}.{uuid.uuid4().hex[:8]}")
+    logging.debug(f"Moving {path} into the trash: {trashed}")
+    os.rename(path, trashed)
+    return trashed
+
+
+def delete_in_background(paths: List[str]) -> None:
+    """
+    Deletes the given paths from a detached process, which keeps running even if this one exits.
+    :param paths: what to delete. Nothing else should be using them.
+    """
+    if not paths:
+        return
+    logging.debug(f"Deleting {', '.join(paths)} in the background")
+    # The package might not be installed (i.e. when running from a checkout)
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_root, os.environ.get("PYTHONPATH")])))
+    Popen([sys.executable, "-m", "bipy_gui_manager.utils.trash"] + list(paths), env=env,
+          stdin=DEVNULL, stdout=DEVNULL, stderr=DEVNULL, start_new_session=True, close_fds=True)
+
+
+def discard(path: str) -> Optional[str]:
+    """
+    Makes a folder (or a file) disappear instantly, and deletes it in the background.
+    :param path: what to discard
+    :return: where the folder was moved before being deleted, or None if nothing was there.
+    """
+    if os.path.islink(path) or os.path.isfile(path):
+        os.remove(path)
+        return None
+    trashed = move_to_trash(path)
+    if trashed:
+        delete_in_background([trashed])
+    return trashed
+
+
+def _scan(path: str) -> Tuple[List[str], List[str]]:
+    """
+    :return: all the files (including symlinks) and folders under path. Folders are listed parents first.
+    """
+    files, folders = [], [path]
+    for folder in folders:  # Grows while iterating
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        folders.append(entry.path)
+                    else:
+                        files.append(entry.path)
+        except FileNotFoundError:
+            pass  # Someone else is deleting it too
+    return files, folders
+
+
+def _ignore_missing(function, path: str) -> None:
+    try:
+        function(path)
+    except FileNotFoundError:
+        pass
+
+
+def delete_tree(path: str, workers: Optional[int] = None) -> None:
+    """
+    Deletes a folder, removing its files in parallel. Tolerates someone else deleting it at the same time.
+    :param path: the folder to delete
+    :param workers: how many files to delete in parallel
+    """
+    if os.path.islink(path) or not os.path.isdir(path):
+        _ignore_missing(os.remove, path)
+        return
+    files, folders = _scan(path)
+    with ThreadPoolExecutor(max_workers=workers or fs.default_workers()) as pool:
+        list(pool.map(lambda file: _ignore_missing(os.remove, file), files, chunksize=64))
+    for folder in reversed(folders):
+        try:
+            os.rmdir(folder)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.debug(f"Could not remove {folder}: {e}")
+    # Anything left, i.e. files we had no permission to delete
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def list_trash() -> List[str]:
+    """
+    :return: all the entries of all the trash folders of the current user
+    """
+    return [os.path.join(location, entry) for location in get_trash_locations()
+            for entry in sorted(os.listdir(location))]
+
+
+if __name__ == "__main__":
+    # The background deleter (see delete_in_background())
+    for trashed_path in sys.argv[1:]:
+        delete_tree(trashed_path)
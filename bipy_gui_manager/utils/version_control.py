@@ -1,16 +1,198 @@
-from typing import Mapping, Optional, Tuple, Union
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
 import os
 import json
+import time
+import stat
+import shutil
 import urllib
 import logging
+import functools
 from pathlib import Path
 from urllib.error import HTTPError
 try:
     import requests  # requests might not be installed, but is needed only for the avatar upload
 except ImportError:
     pass
+try:
+    # dulwich is optional: if available, the first commit of new projects is created without spawning Git
+    import dulwich
+    from dulwich.repo import Repo
+    from dulwich.objects import Blob, Commit
+    from dulwich.index import commit_tree, index_entry_from_stat
+    from dulwich.ignore import IgnoreFilterManager
+except ImportError:
+    dulwich = None
 from subprocess import Popen, PIPE
-from bipy_gui_manager.new.constants import GROUP_ID
+from bipy_gui_manager.new.constants import GROUP_ID, GITLAB_URL
+from bipy_gui_manager.utils import tracing
+from bipy_gui_manager.utils import cli as cli
+
+
+# Some of Git's messages are parsed: they must not be translated
+GIT_ENVIRONMENT = {"LC_ALL": "C"}
+
+
+@functools.lru_cache(maxsize=None)
+def find_git() -> str:
+    """
+    :return: the path to the Git executable, looked up in the PATH only the first time
+    :raises OSError if Git is not installed
+    """
+    git = shutil.which("git")
+    if git is None:
+        raise OSError("Git was not found. Please make sure it's installed and in your PATH.")
+    logging.debug(f"Using Git from {git}")
+    return git
+
+
+class RepoStatus(NamedTuple):
+    branch: Optional[str]  # None if HEAD is detached
+    upstream: Optional[str]
+    ahead: int  # Commits not pushed to the upstream branch
+    behind: int
+    changes: List[str]  # Uncommitted changes and untracked files, as listed by 'git status --porcelain'
+
+
+class GitSession:
+    """
+    Runs Git commands in a given folder. The Git executable and the environment are resolved once per session,
+    the latency of each command is logged, and related read-only queries can be batched in a single call.
+    """
+
+    def __init__(self, cwd: Union[str, Path], git: Optional[str] = None):
+        self.cwd = str(cwd)
+        self.git = git or find_git()
+        self.env = dict(os.environ, **GIT_ENVIRONMENT)
+
+    def execute(self, parameters: Sequence[str], neg_feedback: str = "An error occurred in Git!",
+                input_data: Optional[bytes] = None) -> Tuple[bytes, bytes]:
+        """
+        Calls Git and returns its raw output.
+        :param parameters: parameters to pass to Git, as an array
+        :param neg_feedback: message to explain a potential failure
+        :param input_data: what to send to Git's standard input, if anything
+        :return (stdout, stderr) if successful
+        :raises OSError if it fails
+        """
+        logging.debug("invoke_git received the following parameters: {}".format(parameters))
+        command = [self.git] + list(parameters)
+        with tracing.span("git {}".format(parameters[0] if parameters else ""), category="subprocess"):
+            start = time.perf_counter()
+            if input_data is None:
+                git_query = Popen(command, cwd=self.cwd, stdout=PIPE, stderr=PIPE, env=self.env)
+                (stdout, stderr) = git_query.communicate()
+            else:
+                git_query = Popen(command, cwd=self.cwd, stdin=PIPE, stdout=PIPE, stderr=PIPE, env=self.env)
+                (stdout, stderr) = git_query.communicate(input_data)
+            elapsed = time.perf_counter() - start
+        logging.debug(f"git {' '.join(parameters)} took {elapsed * 1000:.1f} ms")
+
+        if git_query.poll() == 0:
+            logging.debug("invoke_git was successful")
+            return stdout, stderr
+        logging.debug(stdout.decode('utf-8', errors='replace') + "  -  " + stderr.decode('utf-8', errors='replace'))
+        raise OSError(neg_feedback)
+
+    def run(self, parameters: Sequence[str], neg_feedback: str = "An error occurred in Git!") -> Tuple[str, str]:
+        """
+        Like execute(), but decodes the output.
+        :return (stdout, stderr) if successful
+        :raises OSError if it fails
+        """
+        stdout, stderr = self.execute(parameters, neg_feedback)
+        logging.debug(f"Err: {stderr.decode('utf-8')}")
+        logging.debug(f"Out: {stdout.decode('utf-8')}")
+        return stdout.decode('utf-8'), stderr.decode('utf-8')
+
+    def stream(self, parameters: Sequence[str], neg_feedback: str = "An error occurred in Git!") -> None:
+        """
+        Calls Git letting it write directly to the terminal, i.e. to show its progress to the user.
+        :param parameters: parameters to pass to Git, as an array
+        :param neg_feedback: message to explain a potential failure
+        :raises OSError if it fails
+        """
+        logging.debug("stream_git received the following parameters: {}".format(parameters))
+        with tracing.span("git {}".format(parameters[0] if parameters else ""), category="subprocess"):
+            start = time.perf_counter()
+            returncode = Popen([self.git] + list(parameters), cwd=self.cwd, env=self.env).wait()
+            elapsed = time.perf_counter() - start
+        logging.debug(f"git {' '.join(parameters)} took {elapsed * 1000:.1f} ms")
+        if returncode:
+            raise OSError(neg_feedback)
+
+    def rev_parse(self, *arguments: str) -> List[str]:
+        """
+        Resolves several revisions or repository paths in a single call (i.e. rev_parse('--show-toplevel', 'HEAD'))
+        :return: one line of output for each argument
+        :raises OSError if any of them can't be resolved
+        """
+        stdout, _ = self.run(['rev-parse'] + list(arguments), neg_feedback=f"Failed to resolve {arguments}")
+        return stdout.splitlines()
+
+    def for_each_ref(self, ref_format: str, *patterns: str) -> List[str]:
+        """
+        Lists the refs matching the patterns in a single call.
+        :param ref_format: the format of each line (see 'git for-each-ref --format')
+        :param patterns: the refs to list (i.e. 'refs/heads'). All refs if not given.
+        :return: one formatted line per ref
+        """
+        stdout, _ = self.run(['for-each-ref', f'--format={ref_format}'] + list(patterns),
+                             neg_feedback="Failed to list the references")
+        return stdout.splitlines()
+
+    def cat_file(self, *objects: str) -> Dict[str, Optional[bytes]]:
+        """
+        Reads the content of several objects (i.e. 'HEAD:setup.py') in a single call.
+        :param objects: the objects to read
+        :return: the content of each object, None for the missing ones
+        """
+        stdout, _ = self.execute(['cat-file', '--batch'], neg_feedback="Failed to read the Git objects",
+                                 input_data="".join(f"{name}\n" for name in objects).encode())
+        contents, position = {}, 0
+        for name in objects:
+            header_end = stdout.index(b"\n", position)
+            header = stdout[position:header_end].split()
+            if header[-1] == b"missing" or header[-1] == b"ambiguous":
+                contents[name] = None
+                position = header_end + 1
+                continue
+            size = int(header[2])
+            contents[name] = stdout[header_end + 1:header_end + 1 + size]
+            position = header_end + 1 + size + 1  # The content is followed by a newline
+        return contents
+
+    def status(self) -> RepoStatus:
+        """
+        Collects the current branch, its distance from the upstream branch and the uncommitted changes in one call.
+        Works with all Git versions, as the porcelain format is stable.
+        :raises OSError if the folder is not a Git repository
+        """
+        stdout, _ = self.run(['status', '--porcelain', '--branch'], neg_feedback="Failed to get the Git status")
+        lines = stdout.splitlines()
+        if not lines or not lines[0].startswith("## "):
+            raise OSError(f"Git returned an unexpected message:\n{stdout}")
+        return _parse_branch_line(lines[0][3:], lines[1:])
+
+
+def _parse_branch_line(header: str, changes: List[str]) -> RepoStatus:
+    """ Parses the first line of 'git status --porcelain --branch', without its leading '## ' """
+    for unborn_prefix in ("No commits yet on ", "Initial commit on "):
+        if header.startswith(unborn_prefix):
+            return RepoStatus(header[len(unborn_prefix):].strip(), None, 0, 0, changes)
+    if header.startswith("HEAD (no branch)"):
+        return RepoStatus(None, None, 0, 0, changes)
+
+    tracking = ""
+    if " [" in header and header.endswith("]"):
+        header, tracking = header[:-1].split(" [", 1)
+    branch, _, upstream = header.partition("...")
+    ahead = behind = 0
+    for item in tracking.split(", "):
+        if item.startswith("ahead "):
+            ahead = int(item[len("ahead "):])
+        elif item.startswith("behind "):
+            behind = int(item[len("behind "):])
+    return RepoStatus(branch.strip(), upstream.strip() or None, ahead, behind, changes)
 
 
 def invoke_git(parameters=(), cwd=os.getcwd(), neg_feedback="An error occurred in Git!") -> Tuple[str, str]:
@@ -22,32 +204,28 @@ def invoke_git(parameters=(), cwd=os.getcwd(), neg_feedback="An error occurred i
     :return (stdout, stderr) if successful
     :raises OSError if it fails
     """
-    logging.debug("invoke_git received the following parameters: {}".format(parameters))
-    command = ['/usr/bin/git']
-    command.extend(parameters)
+    return GitSession(cwd).run(parameters, neg_feedback)
 
-    while True:
-        git_query = Popen(command, cwd=cwd, stdout=PIPE, stderr=PIPE)
-        (stdout, stderr) = git_query.communicate()
 
-        if git_query.poll() == 0:
-            logging.debug("invoke_git was successful")
-            logging.debug(f"Err: {stderr.decode('utf-8')}")
-            logging.debug(f"Out: {stdout.decode('utf-8')}")
-            return stdout.decode('utf-8'), stderr.decode('utf-8')
-        else:
-            logging.debug(stdout.decode('utf-8') + "  -  " + stderr.decode('utf-8'))
-            raise OSError(neg_feedback)
+def stream_git(parameters=(), cwd=os.getcwd(), neg_feedback="An error occurred in Git!") -> None:
+    """
+    Calls the local Git executable, showing its output to the user as it comes
+    :param parameters: parameters to pass to Git, as an array
+    :param cwd: working directory for Git
+    :param neg_feedback: message to explain a potential failure
+    :raises OSError if it fails
+    """
+    GitSession(cwd).stream(parameters, neg_feedback)
 
 
 def is_git_folder(path_to_check: Union[str, Path]):
     """
     Checks if the given folder is a Git repo.
     :param path_to_check: this path should be a Git repository
-    :return: True if 'git status' returns exit code 0, False otherwise
+    :return: True if 'git rev-parse --git-dir' returns exit code 0, False otherwise
     """
     try:
-        invoke_git(parameters=['status'], cwd=path_to_check)
+        invoke_git(parameters=['rev-parse', '--git-dir'], cwd=path_to_check)
         logging.debug(f"{path_to_check} is a Git repository.")
         return True
     except OSError:
@@ -55,12 +233,26 @@ def is_git_folder(path_to_check: Union[str, Path]):
         return False
 
 
+INITIAL_COMMIT_MESSAGE = "Initial commit (from bipy-gui-manager https://gitlab.cern.ch/bisw-python/bipy-gui-manager)"
+
+
 def init_local_repo(project_path: str) -> None:
     """
     Initialize the project's git repo.
+    If dulwich is installed, the repository and its first commit are created in-process, otherwise
+    (or if that fails) Git is called.
     :param project_path: Path to the project root
     :return nothing, but inits the local Git repository
     """
+    if dulwich is not None:
+        try:
+            with tracing.span("in-process git init and commit"):
+                init_local_repo_in_process(project_path, INITIAL_COMMIT_MESSAGE)
+            return
+        except Exception as e:
+            logging.debug(f"In-process commit failed ({e!r}): falling back to Git")
+            shutil.rmtree(os.path.join(project_path, ".git"), ignore_errors=True)
+
     invoke_git(
         parameters=['init'],
         cwd=project_path,
@@ -72,28 +264,127 @@ def init_local_repo(project_path: str) -> None:
         neg_feedback="Failed to stage the template."
     )
     invoke_git(
-        parameters=['commit', '-m', 'Initial commit ' +
-                    '(from bipy-gui-manager https://gitlab.cern.ch/bisw-python/bipy-gui-manager)'],
+        parameters=['commit', '-m', INITIAL_COMMIT_MESSAGE],
         cwd=project_path,
         neg_feedback="Failed to commit the template."
     )
 
 
+def init_local_repo_in_process(project_path: str, message: str) -> None:
+    """
+    Equivalent of 'git init && git add --all && git commit' implemented with dulwich: the objects of all the files
+    are written in a single pack, and the index is built from the same stat() calls, without hashing anything twice.
+    :param project_path: Path to the project root (without a .git folder)
+    :param message: the commit message
+    :raises Exception if dulwich is not available, no identity is configured or anything goes wrong
+    """
+    repo = Repo.init(str(project_path))
+    try:
+        ignore_manager = IgnoreFilterManager.from_repo(repo)
+        entries = []  # (path, blob, stat result)
+        for relative_path in _list_files_to_commit(str(project_path), ignore_manager):
+            full_path = os.path.join(str(project_path), relative_path)
+            stat_result = os.lstat(full_path)
+            if stat.S_ISLNK(stat_result.st_mode):
+                content = os.fsencode(os.readlink(full_path))
+            else:
+                with open(full_path, 'rb') as f:
+                    content = f.read()
+            entries.append((os.fsencode(relative_path.replace(os.sep, "/")), Blob.from_string(content), stat_result))
+        logging.debug(f"Committing {len(entries)} files in-process")
+
+        repo.object_store.add_objects([(blob, None) for _, blob, _ in entries])
+        index = repo.open_index()
+        for path, blob, stat_result in entries:
+            index[path] = index_entry_from_stat(stat_result, blob.id, mode=_git_mode(stat_result.st_mode))
+        index.write()
+        tree_id = commit_tree(repo.object_store, [(path, blob.id, _git_mode(stat_result.st_mode))
+                                                  for path, blob, stat_result in entries])
+
+        config = repo.get_config_stack()
+        commit = Commit()
+        commit.tree = tree_id
+        commit.author = get_configured_identity(config, kind="AUTHOR")
+        commit.committer = get_configured_identity(config, kind="COMMITTER")
+        commit.author_time = commit.commit_time = int(time.time())
+        commit.author_timezone = commit.commit_timezone = \
+            -(time.altzone if time.localtime().tm_isdst > 0 else time.timezone)
+        commit.encoding = b"UTF-8"
+        commit.message = message.encode("utf-8") + b"\n"
+        repo.object_store.add_object(commit)
+
+        # Like Git's default, regardless of the dulwich version: the first push goes to master
+        repo.refs[b"refs/heads/master"] = commit.id
+        repo.refs.set_symbolic_ref(b"HEAD", b"refs/heads/master")
+    finally:
+        repo.close()
+
+
+def get_configured_identity(config, kind: str) -> bytes:
+    """
+    Finds the identity Git would use for a commit, from the GIT_<kind>_NAME and GIT_<kind>_EMAIL environment
+    variables or from the configuration. Unlike dulwich's get_user_identity(), it's never made up from the login and
+    the host name: if nothing is configured, Git is left to decide (see init_local_repo()).
+    :param config: the configuration of the repository (see Repo.get_config_stack())
+    :param kind: either 'AUTHOR' or 'COMMITTER'
+    :return: the identity, as 'name <email>'
+    :raises ValueError if the name or the email is not configured
+    """
+    values = []
+    for field in ("name", "email"):
+        value = os.environ.get(f"GIT_{kind}_{field.upper()}")
+        # Like Git, author.name and committer.name override user.name
+        for section in (kind.lower(), "user"):
+            if value is not None:
+                break
+            try:
+                value = config.get((section.encode(), ), field.encode()).decode("utf-8")
+            except KeyError:
+                pass
+        if not value:
+            raise ValueError(f"No {kind.lower()} {field} configured for Git")
+        values.append(value)
+    return f"{values[0]} <{values[1]}>".encode("utf-8")
+
+
+def _list_files_to_commit(project_path: str, ignore_manager) -> List[str]:
+    """
+    :return: the paths of the files and symlinks in project_path, relative to it, excluding the ignored ones
+        and the .git folders.
+    """
+    files, folders = [], [""]
+    for folder in folders:  # Grows while iterating
+        with os.scandir(os.path.join(project_path, folder)) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.name == ".git":
+                    continue
+                relative_path = os.path.join(folder, entry.name) if folder else entry.name
+                posix_path = relative_path.replace(os.sep, "/")
+                if entry.is_dir(follow_symlinks=False):
+                    if not ignore_manager.is_ignored(posix_path + "/"):
+                        folders.append(relative_path)
+                elif not ignore_manager.is_ignored(posix_path):
+                    files.append(relative_path)
+    return files
+
+
+def _git_mode(mode: int) -> int:
+    """ The only file modes Git knows about """
+    if stat.S_ISLNK(mode):
+        return 0o120000
+    return 0o100755 if mode & stat.S_IXUSR else 0o100644
+
+
 def get_git_branch(path_to_check: Union[str, Path]):
     """
     Returns the branch the repo is currently on.
     :param path_to_check: this path should be a Git repository
     :return: the name of the current branch (i.e. master)
-    :raises OsError if it's not a Git repo or any other issue is encountered.
+    :raises OsError if it's not a Git repo, HEAD is detached or any other issue is encountered.
     """
-    stdout, stderr = invoke_git(parameters=['status'], cwd=path_to_check)
-    if stderr:
-        raise OSError(f"Git raised an exception:\n{stderr}")
-
-    if not stdout.splitlines()[0].startswith("# On branch "):
-        raise OSError(f"Git returned an unexpected message:\n{stdout}")
-
-    return stdout.splitlines()[0].lstrip("# On branch ").strip()
+    stdout, _ = invoke_git(parameters=['symbolic-ref', '--short', '-q', 'HEAD'], cwd=path_to_check,
+                           neg_feedback=f"Could not find the current branch of {path_to_check}")
+    return stdout.strip()
 
 
 def is_git_dir_clean(path_to_check: Union[str, Path]):
@@ -103,57 +394,27 @@ def is_git_dir_clean(path_to_check: Union[str, Path]):
     :return: True if there are no commits to push and no uncommitted changes, False otherwise
     :raises OsError if it's not a Git repo or any other issue parsing Git's reply is encountered.
     """
-    stdout, stderr = invoke_git(parameters=['status'], cwd=path_to_check)
-    logging.debug(stdout + "  -  " + stderr)
-
-    if stderr:
-        raise OSError(f"Git raised an exception:\n{stderr}")
-
-    for line in stdout.splitlines():
-
-        # Unstaged, uncommitted modifications
-        if line.startswith("# Untracked files:"):
-            return False
-
-        # Staged, uncommitted modifications
-        if line.startswith("# Changes to be committed:"):
-            return False
-
-        # Untracked files
-        if line.startswith("# Untracked files:"):
-            return False
-
-        # Commits not pushed
-        if line.startswith("# Your branch is ahead of"):
-            return False
-
-    if "nothing to commit" in stdout.splitlines()[-1]:
-        return True
-
-    return False
+    status = GitSession(path_to_check).status()
+    logging.debug(f"Git status: {status}")
+    return not status.changes and not status.ahead
 
 
 def get_remote_url(path_to_repo: Union[str, Path]) -> Optional[str]:
     """
     Returns the remote URL of master for the given repo.
-    Assumes the remote is called 'origin' and returns the Fetch URL.
-    Returns None if the repo has no remote for origin.
-    Raises OsError if the path does not correspond to a Git repo.
+    Assumes the remote is called 'origin' and returns the Fetch URL (without contacting the remote).
+    Returns None if the repo has no remote for origin, or if the path is not a Git repo.
     :param path_to_repo: the repo to find the remote of
     :return: the remote for origin if exists, None otherwise
     """
     try:
-        stdout, stderr = invoke_git(parameters=['remote', 'show', 'origin'], cwd=path_to_repo)
-        logging.debug(stdout + "  -  " + stderr)
-        for line in stdout.splitlines():
-            if line.strip().startswith("Fetch URL:"):
-                return line.strip()[len("Fetch URL:"):].strip()
-        return None
-
+        stdout, _ = invoke_git(parameters=['ls-remote', '--get-url', 'origin'], cwd=path_to_repo)
     except OSError as e:
-        logging.debug("Git raised 'origin does not appear to be a git repository' error.")
-        if "'origin' does not appear to be a git repository" in str(e):
-            return None
+        logging.debug(f"Could not get the URL of origin: {e}")
+        return None
+    # If there is no such remote, Git returns its name
+    url = stdout.strip()
+    return url if url and url != "origin" else None
 
 
 def authenticate_on_gitlab(username: str, password: str) -> Optional[str]:
@@ -184,22 +445,26 @@ def post_to_gitlab(endpoint: str, post_fields: Mapping[str, str]) -> Mapping[str
     :param post_fields: what the POST request body will contain
     :return: the eventual response, decoded from JSON
     """
-    logging.debug("POSTing to GitLab's endpoint https://gitlab.cern.ch/{} the following fields: {}".format(endpoint,
-                                                                                                   post_fields.keys()))
-    url = 'https://gitlab.cern.ch/{}'.format(endpoint)
+    logging.debug("POSTing to GitLab's endpoint {}/{} the following fields: {}".format(GITLAB_URL, endpoint,
+                                                                                        post_fields.keys()))
+    url = '{}/{}'.format(GITLAB_URL, endpoint)
     request_data = urllib.parse.urlencode(post_fields).encode()
     request = urllib.request.Request(url, data=request_data)
-    response = urllib.request.urlopen(request).read().decode()
+    # Strip the query, as it might contain the access token
+    with tracing.span("POST {}".format(endpoint.split("?")[0]), category="network"):
+        response = urllib.request.urlopen(request).read().decode()
     logging.info("Server responds: {}".format(response))
     return json.loads(response)
 
 
-def create_gitlab_repository(repo_type: str, project_name: str, project_desc: str, auth_token: str, author_name: str):
+def create_gitlab_repository(repo_type: str, project_name: str, project_desc: str, auth_token: str,
+                             author_name: str) -> Mapping[str, str]:
     """
     Create a GitLab repo under bisw-python
     :param project_name: Name of the project
     :param project_desc: One-line description of the project
     :param auth_token: a GitLab access token. Can be either obtained by authenticating or can be given via CLI.
+    :return: the data of the new repository, as returned by the GitLab API
     """
     post_fields = {'path': project_name,
                    'name': project_name.replace("-", " ").title(),
@@ -224,11 +489,12 @@ def create_gitlab_repository(repo_type: str, project_name: str, project_desc: st
     # Note: This might fail due to the lack of the 'requests' package. It's ok.
     try:
         avatar_path = os.path.join(os.path.dirname(__file__), "resources", "PyQt-logo-gray.png")
-        url = 'https://gitlab.cern.ch/api/v4/projects/{}?{}'.format(project_id, auth_token)
+        url = '{}/api/v4/projects/{}?{}'.format(GITLAB_URL, project_id, auth_token)
         avatar = {'avatar': (avatar_path, open(avatar_path, 'rb'), 'multipart/form-data')}
-        requests.put(url, files=avatar)
+        with tracing.span("PUT avatar", category="network"):
+            requests.put(url, files=avatar)
     except Exception as e:
-        print("  - Avatar upload failed: {}.".format(e))
+        cli.list_subtask("Avatar upload failed: {}.".format(e))
 
     # The badges as well are not critical: if it fails, let go
     try:
@@ -246,31 +512,51 @@ def create_gitlab_repository(repo_type: str, project_name: str, project_desc: st
         post_fields['image_url'] = f"https://gitlab.cern.ch/{group}/{project_name}/badges/master/pipeline.svg"
         post_to_gitlab(endpoint=f'api/v4/projects/{project_id}/badges?{auth_token}', post_fields=post_fields)
     except Exception as e:
-        print("  - Badges creation failed: {}.".format(e))
+        cli.list_subtask("Badges creation failed: {}.".format(e))
+
+    return repo_data
 
 
-def push_first_commit(project_path: str, repo_url: str) -> None:
+def push_first_commit(project_path: str, repo_url: str, repo_data: Optional[Mapping[str, str]] = None,
+                      compression: Optional[int] = None, threads: Optional[int] = None) -> None:
     """
-    Adds a remote to the Git repo and pushes the first commit
+    Adds a remote to the Git repo and pushes the first commit, showing the progress of the upload.
     :param project_path: Path to the project root
     :param repo_url: GitLab repo to push to
+    :param repo_data: the data of the repository returned by the GitLab API when creating it, if available.
+        Used to make sure the repository is empty before pushing.
+    :param compression: the zlib compression level of the pack sent (core.compression, -1 to 9).
+        Lower values trade bandwidth for CPU time. Git's default if not given.
+    :param threads: how many threads Git can use to compress the pack (pack.threads, 0 means one per CPU).
+        Git's default if not given.
     """
-    invoke_git(
-        parameters=['remote', 'add', 'origin', repo_url],
-        cwd=project_path,
-        neg_feedback="Failed to add the remote on the project's local repo."
-    )
-    # Check for repository existence
-    invoke_git(
-        parameters=['ls-remote'],
-        cwd=project_path,
-        neg_feedback="Seems like {} is not an existing and empty GitLab repository. ".format(repo_url) +
-                     "The repository should EXIST and be EMPTY at this stage. \n" +
-                     "You can create the repo yourself and then pass the link with the --repo flag." +
-                     "If you think this is a bug, please report it to the maintainers."
-    )
-    invoke_git(
-        parameters=['push', '-u', 'origin', 'master'],
+    if repo_data is not None and not repo_data.get('empty_repo', True):
+        cli.negative_feedback("Seems like {} is not an empty GitLab repository. ".format(repo_url) +
+                              "The repository should EXIST and be EMPTY at this stage. \n" +
+                              "If you think this is a bug, please report it to the maintainers.")
+        raise OSError(f"The GitLab repository {repo_url} is not empty.")
+
+    try:
+        invoke_git(
+            parameters=['remote', 'add', 'origin', repo_url],
+            cwd=project_path,
+            neg_feedback="Failed to add the remote on the project's local repo."
+        )
+    except OSError:
+        # The remote exists already if a previous attempt to push failed
+        invoke_git(
+            parameters=['remote', 'set-url', 'origin', repo_url],
+            cwd=project_path,
+            neg_feedback="Failed to add the remote on the project's local repo."
+        )
+    options = []
+    if compression is not None:
+        options += ['-c', f'core.compression={compression}']
+    if threads is not None:
+        options += ['-c', f'pack.threads={threads}']
+    stream_git(
+        parameters=options + ['push', '--progress', '-u', 'origin', 'master'],
         cwd=project_path,
-        neg_feedback="Failed to push the first commit to GitLab."
+        neg_feedback="Failed to push the first commit to GitLab. Make sure {} exists ".format(repo_url) +
+                     "and is empty: you can create the repo yourself and then pass the link with the --repo flag."
     )
@@ -0,0 +1,211 @@
+"""
+Watches a folder tree for changes: with inotify (through ctypes) on Linux, by polling the modification times otherwise.
+"""
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+
+# From sys/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | \
+             IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+# Returned by wait() when the changes could not be tracked one by one (i.e. the event queue overflowed)
+EVERYTHING = "."
+
+
+class InotifyWatcher:
+    """
+    Reports the files changed under a folder, using one inotify watch per subfolder.
+    :raises OSError if inotify is not available or there are too many folders to watch.
+    """
+
+    def __init__(self, root: str, exclude: Callable[[str], bool] = lambda _: False):
+        """
+        :param root: the folder to watch
+        :param exclude: called with each subfolder's path relative to root: if it returns True, the subfolder
+            is not watched.
+        """
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.root = root
+        self.exclude = exclude
+        self._watches = {}  # type: Dict[int, str]
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            self._add_tree("")
+        except OSError:
+            self.close()
+            raise
+
+    def _add_tree(self, relative_folder: str) -> None:
+        folders = [relative_folder]
+        for folder in folders:  # Grows while iterating
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(os.path.join(self.root, folder)),
+                                              WATCH_MASK | IN_ONLYDIR)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error in (errno.ENOENT, errno.ENOTDIR):
+                    continue  # Deleted in the meantime
+                raise OSError(error, f"Can't watch {os.path.join(self.root, folder)}: {os.strerror(error)}")
+            self._watches[wd] = folder
+            try:
+                with os.scandir(os.path.join(self.root, folder)) as entries:
+                    for entry in entries:
+                        relative_path = os.path.join(folder, entry.name) if folder else entry.name
+                        if entry.is_dir(follow_symlinks=False) and not self.exclude(relative_path):
+                            folders.append(relative_path)
+            except FileNotFoundError:
+                pass
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """
+        Waits until something changes.
+        :param timeout: how long to wait at most, in seconds. Forever if None.
+        :return: the paths of what changed, relative to the root. Empty on timeout. Contains EVERYTHING if the
+            changes could not be tracked.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changes = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changes
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += _EVENT_HEADER.size + length
+                changes.update(self._handle_event(wd, mask, os.fsdecode(name)))
+
+    def _handle_event(self, wd: int, mask: int, name: str) -> List[str]:
+        if mask & IN_Q_OVERFLOW:
+            return [EVERYTHING]
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return []
+        folder = self._watches.get(wd)
+        if folder is None:
+            return []
+        relative_path = os.path.join(folder, name) if name else folder
+        if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and not self.exclude(relative_path):
+            try:
+                self._add_tree(relative_path)
+            except OSError as e:
+                logging.debug(f"Can't watch {relative_path} anymore: {e}")
+                return [EVERYTHING]
+        return [relative_path]
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class PollingWatcher:
+    """
+    Reports the files changed under a folder by comparing their modification times at regular intervals.
+    Used where inotify is not available.
+    """
+
+    def __init__(self, root: str, exclude: Callable[[str], bool] = lambda _: False, interval: float = 1.0):
+        """
+        :param root: the folder to watch
+        :param exclude: called with each subfolder's path relative to root: if it returns True, the subfolder
+            is not watched.
+        :param interval: how often to check for changes, in seconds
+        """
+        self.root = root
+        self.exclude = exclude
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot, folders = {}, [""]
+        for folder in folders:  # Grows while iterating
+            try:
+                with os.scandir(os.path.join(self.root, folder)) as entries:
+                    for entry in entries:
+                        relative_path = os.path.join(folder, entry.name) if folder else entry.name
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if not self.exclude(relative_path):
+                                    folders.append(relative_path)
+                                continue
+                            stat = entry.stat(follow_symlinks=False)
+                        except FileNotFoundError:
+                            continue
+                        snapshot[relative_path] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                pass
+        return snapshot
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """ See InotifyWatcher.wait() """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval if deadline is None else max(0.0, min(self.interval,
+                                                                           deadline - time.monotonic())))
+            snapshot = self._take_snapshot()
+            changes = {path for path in snapshot.keys() | self._snapshot.keys()
+                       if snapshot.get(path) != self._snapshot.get(path)}
+            self._snapshot = snapshot
+            if changes or (deadline is not None and time.monotonic() >= deadline):
+                return changes
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def create_watcher(root: str, exclude: Callable[[str], bool] = lambda _: False):
+    """
+    :param root: the folder to watch
+    :param exclude: see InotifyWatcher
+    :return: an InotifyWatcher if possible, a PollingWatcher otherwise
+    """
+    try:
+        return InotifyWatcher(root, exclude)
+    except OSError as e:
+        logging.debug(f"Can't use inotify ({e}): polling for changes instead")
+        return PollingWatcher(root, exclude)
@@ -26,6 +26,13 @@ REQUIREMENTS: dict = {
         "pytest-cov",
         "pytest-random-order",
     ],
+    'git': [
+        "dulwich",  # Optional: creates the first commit of new projects without spawning Git
+    ],
+    'bench': [
+        "pytest",
+        "pytest-benchmark",
+    ],
     'dev': [
     ],
     'doc': [
@@ -27,6 +27,11 @@ def mock_deployment_paths(monkeypatch, tmpdir):
     bipy_gui_manager.DEVELOPMENT_DEPLOY_PATH = tmpdir
 
 
+@pytest.fixture(autouse=True)
+def mock_cache_path(monkeypatch, tmpdir):
+    monkeypatch.setenv("BIPY_GUI_MANAGER_CACHE_PATH", str(tmpdir / "cache"))
+
+
 @pytest.fixture()
 def mock_phonebook(monkeypatch):
     monkeypatch.setattr('bipy_gui_manager.new.validation.validate_cern_id', mock_phonebook_entry)
@@ -36,6 +41,7 @@ def mock_phonebook(monkeypatch):
 def mock_git(monkeypatch, mock_cwd):
     monkeypatch.setattr('bipy_gui_manager.utils.version_control.invoke_git', mock_git_invocation)
     monkeypatch.setattr('bipy_gui_manager.new.new_project.version_control.invoke_git', mock_git_invocation)
+    monkeypatch.setattr('bipy_gui_manager.utils.version_control.stream_git', mock_git_invocation)
 
 
 @pytest.fixture
@@ -48,7 +54,9 @@ def mock_gitlab(monkeypatch, mock_cwd):
 def new_project_parameters(path=None, name=None, desc=None, author=None, repo_type=None, project_type='pyqt',
                            clone_protocol="https", upload_protocol="https", gitlab=True,
                            gitlab_token=None, interactive=True, overwrite=False, cleanup_on_failure=False,
-                           template_path=None, template_url=None, crash=True, verbose=False, gitlab_space=""):
+                           template_path=None, template_url=None, crash=True, verbose=False, gitlab_space="",
+                           trace_file=None, template_clone_mode="auto", template_pack=None, push_compression=None,
+                           push_threads=None, resume=None):
     args = Namespace(
         base_path=path,
         project_name=name,
@@ -67,7 +75,13 @@ def new_project_parameters(path=None, name=None, desc=None, author=None, repo_ty
         crash=crash,
         verbose=verbose,
         gitlab_space=gitlab_space,
-        template_url=template_url
+        template_url=template_url,
+        trace_file=trace_file,
+        template_clone_mode=template_clone_mode,
+        template_pack=template_pack,
+        push_compression=push_compression,
+        push_threads=push_threads,
+        resume=resume
     )
     return args
 
@@ -0,0 +1,68 @@
+import os
+import pytest
+
+from bipy_gui_manager import api
+from bipy_gui_manager.new import new_project
+from bipy_gui_manager.utils import cli
+
+
+def test_create_project(monkeypatch, tmpdir, capsys, mock_git, mock_phonebook):
+    monkeypatch.setattr(new_project, "install_project", lambda *args, **kwargs: None)
+    reporter = cli.RecordingReporter()
+    result = api.create_project("test-project", "That's a test project!", author="me", base_path=str(tmpdir),
+                                reporter=reporter)
+    assert result.project_path == os.path.join(tmpdir, "test-project")
+    assert result.project_type == "pyqt"
+    assert result.repo_url is None
+    assert os.path.isfile(os.path.join(result.project_path, "README.md"))
+    # Nothing is printed: everything goes to the reporter
+    assert capsys.readouterr().out == ""
+    assert (cli.POSITIVE, "Applying customizations") in reporter.messages
+    assert not reporter.errors()
+
+
+def test_create_project_failure(monkeypatch, tmpdir, mock_git, mock_phonebook):
+    def fail(**kwargs):
+        raise OSError("Imagine the installation fails...")
+    monkeypatch.setattr(new_project, "install_project", fail)
+    with pytest.raises(api.ProjectCreationError) as error:
+        api.create_project("test-project", "That's a test project!", author="me", base_path=str(tmpdir))
+    assert "Imagine the installation fails..." in str(error.value)
+    # Cleaned up
+    assert not os.path.exists(os.path.join(tmpdir, "test-project"))
+
+
+def test_create_project_needs_input(tmpdir, mock_phonebook):
+    # Missing information is never asked
+    with pytest.raises(api.ProjectCreationError):
+        api.create_project("test-project", "", author="me", base_path=str(tmpdir))
+
+
+def test_deploy_project_not_deployable(tmpdir, capsys):
+    with pytest.raises(api.DeployError) as error:
+        api.deploy_project(str(tmpdir))
+    assert "not in a project that can be deployed" in str(error.value)
+    assert error.value.messages
+    assert capsys.readouterr().out == ""
+
+
+def test_list_apps(tmpdir, monkeypatch):
+    operational = tmpdir.mkdir("operational")
+    operational.mkdir("app-b")
+    operational.mkdir("app-a")
+    monkeypatch.setattr("bipy_gui_manager.OPERATIONAL_DEPLOY_PATH", str(operational))
+    monkeypatch.setattr("bipy_gui_manager.DEVELOPMENT_DEPLOY_PATH", str(tmpdir / "missing"))
+    assert api.list_apps() == [
+        api.AppInfo("app-a", str(operational), True),
+        api.AppInfo("app-b", str(operational), True),
+    ]
+    assert api.list_apps(operational=False) == []
+
+
+def test_use_reporter_is_per_thread():
+    reporter = cli.RecordingReporter()
+    with cli.use_reporter(reporter):
+        cli.positive_feedback("hello")
+        assert cli.get_reporter() is reporter
+    assert isinstance(cli.get_reporter(), cli.TerminalReporter)
+    assert reporter.messages == [(cli.POSITIVE, "hello")]
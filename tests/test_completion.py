@@ -0,0 +1,65 @@
+import os
+import shutil
+import pytest
+from argparse import Namespace
+from subprocess import check_output
+
+from bipy_gui_manager import main
+from bipy_gui_manager.completion import completion
+
+
+def complete(script_path, *words):
+    """ Runs the completion function of the script in bash, as if TAB was pressed after the given words """
+    command = f"""
+        complete() {{ :; }}
+        source "{script_path}"
+        COMP_WORDS=(bipy-gui-manager {' '.join(words)})
+        COMP_CWORD={len(words)}
+        _bipy_gui_manager
+        printf '%s\\n' "${{COMPREPLY[@]}}"
+    """
+    return check_output(["bash", "-c", command]).decode().split()
+
+
+def test_describe_parser():
+    commands = completion.describe_parser(main.build_parser())
+    assert {"new", "deploy", "run", "template", "gc", "completion"} <= set(commands[""])
+    assert "--resume" in commands["new"]
+    assert "--dry-run" in commands["gc"]
+    assert "--output" in commands["template build"]
+
+
+def test_create_missing_app_indexes(tmpdir):
+    os.makedirs(tmpdir / "my-app")
+    completion.create_missing_app_indexes()
+    for path in completion.get_app_index_paths():
+        with open(path) as f:
+            assert f.read() == "my-app\n"
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="bash is not available")
+def test_generated_script_completes(tmpdir):
+    index_paths = [str(tmpdir / "operational.txt"), str(tmpdir / "development.txt"), str(tmpdir / "missing.txt")]
+    with open(index_paths[0], "w") as f:
+        f.write("my-app\n")
+    with open(index_paths[1], "w") as f:
+        f.write("other-app\n")
+    script_path = str(tmpdir / "completion.sh")
+    with open(script_path, "w") as f:
+        f.write(completion.generate_script(main.build_parser(), "bash", index_paths))
+
+    assert "deploy" in complete(script_path, "de")
+    assert complete(script_path, "template", "b") == ["build"]
+    assert "--dry-run" in complete(script_path, "gc", "--")
+    assert complete(script_path, "run", "-o", "my") == ["my-app"]
+    assert complete(script_path, "rollback", "-o", "my") == ["my-app"]
+    assert complete(script_path, "run", "o") == ["other-app"]
+
+
+def test_install(tmpdir, monkeypatch):
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmpdir / "data"))
+    parser = main.build_parser()
+    completion.install(Namespace(verbose=False, shell="bash", print_script=False), parser)
+    with open(tmpdir / "data" / "bash-completion" / "completions" / "bipy-gui-manager") as f:
+        assert "complete -o default -F _bipy_gui_manager bipy-gui-manager" in f.read()
+    assert all(os.path.exists(path) for path in completion.get_app_index_paths())
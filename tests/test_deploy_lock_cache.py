@@ -0,0 +1,81 @@
+import os
+
+from bipy_gui_manager.deploy import lock_cache, pipeline
+
+
+def create_project(path, requirements="numpy\n"):
+    os.makedirs(os.path.join(path, "deployment", "app"), exist_ok=True)
+    with open(os.path.join(path, "setup.py"), "w") as f:
+        f.write("setup(install_requires=['numpy'])")
+    with open(os.path.join(path, "deployment", "app", "requirements.txt"), "w") as f:
+        f.write(requirements)
+
+
+def fake_lock(app_path):
+    with open(os.path.join(app_path, "deployment", "app", "constraints.txt"), "w") as f:
+        f.write("numpy==1.19.0\n")
+
+
+def test_compute_key_changes_with_the_dependencies(tmpdir):
+    create_project(tmpdir)
+    key = lock_cache.compute_key(str(tmpdir), "/acc-py/bin/acc-py")
+    assert key == lock_cache.compute_key(str(tmpdir), "/acc-py/bin/acc-py")
+    create_project(tmpdir, requirements="numpy\nscipy\n")
+    assert key != lock_cache.compute_key(str(tmpdir), "/acc-py/bin/acc-py")
+
+
+def test_compute_key_changes_with_pip_configuration(tmpdir, monkeypatch):
+    create_project(tmpdir)
+    key = lock_cache.compute_key(str(tmpdir), "/acc-py/bin/acc-py")
+    monkeypatch.setenv("PIP_INDEX_URL", "https://example.com/simple")
+    assert key != lock_cache.compute_key(str(tmpdir), "/acc-py/bin/acc-py")
+
+
+def test_store_and_restore(tmpdir):
+    project = os.path.join(tmpdir, "project")
+    create_project(project)
+    before = lock_cache.snapshot(project)
+    fake_lock(project)
+    changed = lock_cache.changed_files(before, lock_cache.snapshot(project))
+    assert changed == [os.path.join("deployment", "app", "constraints.txt")]
+    lock_cache.store("key", project, changed)
+
+    other_project = os.path.join(tmpdir, "other_project")
+    create_project(other_project)
+    assert lock_cache.restore("key", other_project) == changed
+    with open(os.path.join(other_project, changed[0])) as f:
+        assert f.read() == "numpy==1.19.0\n"
+
+
+def test_restore_missing_entry(tmpdir):
+    create_project(tmpdir)
+    assert lock_cache.restore("missing", str(tmpdir)) is None
+
+
+def test_deploy_pyqt_app_reuses_lock(tmpdir, monkeypatch):
+    project = os.path.join(tmpdir, "project")
+    create_project(project)
+    stages = []
+    locked = []
+
+    def run_stage(name, command, cwd, **kwargs):
+        stages.append(name)
+        if name == "acc-py app lock":
+            fake_lock(cwd)
+        else:
+            locked.append(os.path.exists(os.path.join(cwd, "deployment", "app", "constraints.txt")))
+    monkeypatch.setattr(pipeline, "run_stage", run_stage)
+
+    pipeline.deploy_pyqt_app(project, "/deploy/base", "/acc-py/bin", verbose=False)
+    assert stages == ["acc-py app lock", "acc-py app deploy"]
+
+    stages.clear()
+    pipeline.deploy_pyqt_app(project, "/deploy/base", "/acc-py/bin", verbose=False)
+    assert stages == ["acc-py app deploy"]
+
+    stages.clear()
+    pipeline.deploy_pyqt_app(project, "/deploy/base", "/acc-py/bin", verbose=False, relock=True)
+    assert stages == ["acc-py app lock", "acc-py app deploy"]
+    # The lock results were there every time, but never in the project itself
+    assert locked == [True, True, True]
+    assert not os.path.exists(os.path.join(project, "deployment", "app", "constraints.txt"))
@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+import marshal
+import py_compile
+import pytest
+from argparse import Namespace
+
+from bipy_gui_manager.deploy import deploy, pipeline, report
+from bipy_gui_manager.utils import tracing
+from bipy_gui_manager.utils import version_control as vcs
+
+
+def test_run_stage_records_resource_usage(tmpdir):
+    tracer = tracing.reset_tracer()
+    pipeline.run_stage("test stage", [sys.executable, "-c", "sum(range(100000))"], cwd=tmpdir, verbose=False,
+                       failure_message="Test failed")
+    span, = tracer.spans
+    assert span.name == "test stage"
+    assert span.category == "subprocess"
+    assert span.attributes["returncode"] == 0
+    assert span.attributes["child_cpu_user_s"] >= 0
+    assert span.attributes["child_cpu_system_s"] >= 0
+    assert span.attributes["child_peak_rss_kb"] > 0
+
+
+def test_run_stage_peak_rss_is_per_stage(tmpdir):
+    tracer = tracing.reset_tracer()
+    pipeline.run_stage("large stage", [sys.executable, "-c", "data = b'x' * (200 * 1024 * 1024)"], cwd=tmpdir,
+                       verbose=False, failure_message="Test failed")
+    pipeline.run_stage("small stage", [sys.executable, "-c", "pass"], cwd=tmpdir, verbose=False,
+                       failure_message="Test failed")
+    large, small = tracer.spans
+    assert large.attributes["child_peak_rss_kb"] > 200 * 1024
+    assert small.attributes["child_peak_rss_kb"] < 100 * 1024
+
+
+def test_run_stage_failure(tmpdir):
+    tracing.reset_tracer()
+    with pytest.raises(OSError):
+        pipeline.run_stage("failing stage", [sys.executable, "-c", "exit(3)"], cwd=tmpdir, verbose=False,
+                           failure_message="Test failed")
+    assert tracing.get_tracer().spans[0].attributes["returncode"] == 3
+
+
+def test_apply_pip_workaround(tmpdir):
+    requirements = tmpdir.mkdir("deployment").mkdir("app") / "requirements.txt"
+    requirements.write("numpy\ngit+https://gitlab.cern.ch:8443/bisw-python/test.git\n")
+    pipeline.apply_pip_workaround(tmpdir)
+    assert requirements.read() == "numpy\ngit+https://:@gitlab.cern.ch:8443/bisw-python/test.git\n"
+
+
+def test_apply_pip_workaround_no_requirements(tmpdir):
+    pipeline.apply_pip_workaround(tmpdir)
+
+
+def test_apply_pip_workaround_up_to_date(tmpdir):
+    requirements = tmpdir.mkdir("deployment").mkdir("app") / "requirements.txt"
+    requirements.write("git+https://:@gitlab.cern.ch:8443/bisw-python/test.git\n")
+    os.utime(str(requirements), ns=(0, 0))
+    pipeline.apply_pip_workaround(tmpdir)
+    assert requirements.read() == "git+https://:@gitlab.cern.ch:8443/bisw-python/test.git\n"
+    assert os.stat(str(requirements)).st_mtime_ns == 0
+
+
+def test_prepare_build_copy_git_project(tmpdir):
+    project = tmpdir.mkdir("project")
+    (project / "setup.py").write("hello")
+    vcs.init_local_repo(str(project))
+    vcs.invoke_git(["remote", "add", "origin", "https://gitlab.cern.ch/test/project.git"], cwd=str(project))
+
+    build_path = pipeline.prepare_build_copy(str(project))
+    assert os.path.basename(build_path) == "project"
+    assert not build_path.startswith(str(project))
+    with open(os.path.join(build_path, "setup.py")) as f:
+        assert f.read() == "hello"
+    assert vcs.get_remote_url(build_path) == "https://gitlab.cern.ch/test/project.git"
+
+
+def test_deploy_pyqt_app_commands(tmpdir, monkeypatch):
+    commands = []
+    monkeypatch.setattr('bipy_gui_manager.deploy.pipeline.run_stage',
+                        lambda name, command, **kwargs: commands.append(command))
+    monkeypatch.setattr(pipeline, "prepare_build_copy", lambda path: str(tmpdir / "build" / "project"))
+    monkeypatch.setattr(pipeline.trash, "discard", lambda path: None)
+    deploy_base = str(tmpdir.mkdir("deploy"))
+    pipeline.deploy_app(tmpdir, deploy_base, "/acc-py/bin", "pyqt", verbose=False)
+    build_path = str(tmpdir / "build" / "project")
+    # acc-py deploys into a hidden staging folder of the deploy base
+    [staging_base] = [name for name in os.listdir(deploy_base) if name.startswith(".deploy.staging-")]
+    assert commands == [
+        ["/acc-py/bin/acc-py", "app", "lock", build_path],
+        ["/acc-py/bin/acc-py", "app", "deploy", "--deploy-base", os.path.join(deploy_base, staging_base), build_path],
+    ]
+
+
+def test_deploy_pyqt_app_leaves_project_untouched(tmpdir, monkeypatch):
+    project = tmpdir.mkdir("project")
+    requirements = project.mkdir("deployment").mkdir("app") / "requirements.txt"
+    requirements.write("git+https://gitlab.cern.ch:8443/bisw-python/test.git\n")
+    build_paths = []
+
+    def run_stage(name, command, cwd, **kwargs):
+        build_paths.append(cwd)
+        with open(os.path.join(cwd, "deployment", "app", "requirements.txt")) as f:
+            assert f.read() == "git+https://:@gitlab.cern.ch:8443/bisw-python/test.git\n"
+    monkeypatch.setattr(pipeline, "run_stage", run_stage)
+
+    pipeline.deploy_pyqt_app(str(project), "/deploy/base", "/acc-py/bin", verbose=False)
+    assert requirements.read() == "git+https://gitlab.cern.ch:8443/bisw-python/test.git\n"
+    # The build copy is gone
+    assert not os.path.exists(build_paths[0])
+
+
+def test_build_report():
+    tracer = tracing.Tracer()
+    with tracer.span("outer"):
+        with tracer.span("inner", category="subprocess", returncode=0):
+            pass
+    data = report.build_report(tracer, project="test-project", success=True)
+    assert data["project"] == "test-project"
+    assert data["success"]
+    assert [stage["name"] for stage in data["stages"]] == ["outer", "inner"]
+    assert data["stages"][1]["returncode"] == 0
+    assert data["stages"][1]["depth"] == 1
+
+
+def test_deploy_writes_report(tmpdir, monkeypatch):
+    project_dir = tmpdir.mkdir("project")
+    with open(project_dir / 'setup.py', 'w') as f:
+        f.write("hello")
+    vcs.invoke_git(['init'], cwd=project_dir)
+    monkeypatch.setattr('bipy_gui_manager.deploy.deploy.is_ready_to_deploy', lambda *args: True)
+    monkeypatch.setattr('bipy_gui_manager.deploy.deploy.pipeline.deploy_app',
+                        lambda **kwargs: pipeline.run_stage("fake stage", [sys.executable, "-c", ""],
+                                                            cwd=kwargs["app_path"], verbose=False,
+                                                            failure_message=""))
+    report_file = str(tmpdir / "report.json")
+    deploy.deploy(Namespace(verbose=False, path=project_dir, entry_point=None, operational=False,
+                            project_type=None, report_file=report_file, watch=False, relock=False,
+                            optimization_levels=[0], smoke_test=False, strict=False))
+    with open(report_file) as f:
+        data = json.load(f)
+    assert data["success"]
+    assert data["project_type"] == "pyqt"
+    assert "fake stage" in [stage["name"] for stage in data["stages"]]
+
+
+def test_list_deployments(tmpdir):
+    tmpdir.mkdir("app").mkdir("1.0.0")
+    tmpdir.join("app").mkdir(".1.1.0.staging")
+    tmpdir.mkdir(".hidden").mkdir("1.0.0")
+    assert pipeline.list_deployments(str(tmpdir)) == {os.path.join("app", "1.0.0")}
+    assert pipeline.list_deployments(str(tmpdir / "missing")) == set()
+
+
+def test_compile_deployment(tmpdir):
+    package = tmpdir.mkdir("lib").mkdir("package")
+    (package / "module.py").write("VALUE = 1\n")
+    (package / "broken.py").write("def broken(:\n")
+    tracing.reset_tracer()
+    pipeline.compile_deployment(str(tmpdir), [0, 1], verbose=False)
+    compiled = os.listdir(str(package / "__pycache__"))
+    assert any(name.startswith("module.") and ".opt-" not in name for name in compiled)
+    assert any(name.startswith("module.") and ".opt-1" in name for name in compiled)
+    # A file that can't be compiled does not make the deploy fail
+    assert tracing.get_tracer().spans[0].attributes["returncode"] == 1
+
+
+def test_compile_deployment_replaces_timestamp_pycs(tmpdir):
+    package = tmpdir.mkdir("lib").mkdir("package")
+    (package / "module.py").write("VALUE = 1\n")
+    # As pip does when installing
+    pyc = py_compile.compile(str(package / "module.py"), invalidation_mode=py_compile.PycInvalidationMode.TIMESTAMP)
+    pipeline.compile_deployment(str(tmpdir), [0], verbose=False, final_folder="/final/folder")
+    with open(pyc, "rb") as f:
+        header = f.read(16)
+        code = marshal.load(f)
+    assert int.from_bytes(header[4:8], "little") == 0b01  # Hash-based, unchecked
+    assert code.co_filename == os.path.join("/final/folder", "lib", "package", "module.py")
+
+
+def test_deploy_app_compiles_new_deployments(tmpdir, monkeypatch):
+    deploy_base = tmpdir.mkdir("deploy")
+    deploy_base.mkdir("old-app").mkdir("1.0.0")
+    compiled = []
+    monkeypatch.setattr(pipeline, "deploy_pyqt_app",
+                        lambda *args, staging_base, **kwargs: os.makedirs(os.path.join(staging_base, "app", "1.0.0")))
+    monkeypatch.setattr(pipeline, "compile_deployment",
+                        lambda folder, levels, verbose, final_folder: compiled.append((folder, final_folder)))
+    assert pipeline.deploy_app(tmpdir, str(deploy_base), "/acc-py/bin", "pyqt", verbose=False) == \
+        [os.path.join("app", "1.0.0")]
+    # Compiled before being published, for its final location
+    [(folder, final_folder)] = compiled
+    assert os.path.basename(os.path.dirname(os.path.dirname(folder))).startswith(".deploy.staging-")
+    assert final_folder == os.path.join(str(deploy_base), "app", "1.0.0")
+    assert os.path.isdir(final_folder)
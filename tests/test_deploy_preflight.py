@@ -0,0 +1,62 @@
+import os
+import threading
+
+from bipy_gui_manager.deploy import preflight
+from bipy_gui_manager.utils import tracing
+from bipy_gui_manager.utils import version_control as vcs
+
+
+def test_run_preflight_not_a_project(tmpdir):
+    checks = preflight.run_preflight(tmpdir)
+    assert not checks.is_git
+    assert not checks.is_python_project
+    assert checks.project_type is None
+    assert checks.remote_url is None
+
+
+def test_run_preflight_missing_folder(tmpdir):
+    checks = preflight.run_preflight(os.path.join(tmpdir, "missing"))
+    assert not checks.is_git
+    assert not checks.is_python_project
+
+
+def test_run_preflight_git_project(tmpdir):
+    with open(tmpdir / "setup.py", "w") as f:
+        f.write("hello")
+    vcs.invoke_git(["init"], cwd=tmpdir)
+    vcs.invoke_git(["remote", "add", "origin", "https://gitlab.cern.ch/test/test.git"], cwd=tmpdir)
+    tracer = tracing.reset_tracer()
+
+    checks = preflight.run_preflight(tmpdir)
+    assert checks.is_git
+    assert checks.project_type == "pyqt"
+    assert checks.status.changes == ["?? setup.py"]
+    assert checks.remote_url == "https://gitlab.cern.ch/test/test.git"
+    assert checks.elapsed > 0
+    span = [span for span in tracer.spans if span.name == "pre-flight checks"][0]
+    assert span.attributes["elapsed_ms"] >= 0
+
+
+def test_run_preflight_comrad_project(tmpdir):
+    os.makedirs(tmpdir / "app")
+    with open(tmpdir / "app" / "pyproject.toml", "w") as f:
+        f.write("hello")
+    with open(tmpdir / "setup.py", "w") as f:
+        f.write("hello")
+    assert preflight.run_preflight(tmpdir).project_type == "comrad"
+
+
+def test_run_preflight_runs_checks_in_parallel(tmpdir, monkeypatch):
+    # Both Git checks must be running at the same time to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def get_status(path):
+        barrier.wait()
+        return None
+
+    def get_remote_url(path):
+        barrier.wait()
+        return None
+    monkeypatch.setattr(preflight, "_get_status", get_status)
+    monkeypatch.setattr(preflight.vcs, "get_remote_url", get_remote_url)
+    assert not preflight.run_preflight(tmpdir).is_git
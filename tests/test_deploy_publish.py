@@ -0,0 +1,184 @@
+import os
+import pytest
+
+from bipy_gui_manager.deploy import publish
+from bipy_gui_manager.run import run
+
+
+@pytest.fixture()
+def staging(tmpdir):
+    deploy_base = str(tmpdir.mkdir("deploy"))
+    staging_base = publish.create_staging_base(deploy_base)
+    venv = os.path.join(staging_base, "app", "1.0.0", "venv")
+    os.makedirs(os.path.join(venv, "bin"))
+    os.makedirs(os.path.join(venv, "lib"))
+    with open(os.path.join(venv, "bin", "app"), "w") as f:
+        f.write(f"#!{venv}/bin/python\n")
+    os.chmod(os.path.join(venv, "bin", "app"), 0o755)
+    with open(os.path.join(venv, "pyvenv.cfg"), "w") as f:
+        f.write("home = /usr/bin\n")
+    with open(os.path.join(venv, "lib", "module.py"), "w") as f:
+        f.write(f"PATH = '{venv}'\n")  # Not a file that needs relocating
+    with open(os.path.join(staging_base, "app", "metadata.json"), "w") as f:
+        f.write("{}")
+    yield staging_base, deploy_base
+
+
+def test_create_staging_base(staging):
+    staging_base, deploy_base = staging
+    assert os.path.dirname(staging_base) == deploy_base
+    assert os.path.basename(staging_base).startswith(".")
+    # Nobody sees the versions being deployed
+    assert run.find_apps(deploy_base) == []
+
+
+def test_publish(staging):
+    staging_base, deploy_base = staging
+    publish.publish(staging_base, deploy_base, [os.path.join("app", "1.0.0")])
+    assert sorted(os.listdir(os.path.join(deploy_base, "app"))) == [".current", "1.0.0", "metadata.json"]
+    assert publish.get_current(deploy_base, "app") == "1.0.0"
+    assert os.listdir(os.path.join(staging_base, "app")) == ["metadata.json"]
+    venv = os.path.join(deploy_base, "app", "1.0.0", "venv")
+    with open(os.path.join(venv, "bin", "app")) as f:
+        assert f.read() == f"#!{venv}/bin/python\n"
+    assert os.access(os.path.join(venv, "bin", "app"), os.X_OK)
+    with open(os.path.join(venv, "lib", "module.py")) as f:
+        assert staging_base in f.read()
+    assert os.path.exists(publish.get_lock_path(deploy_base))
+    assert run.find_apps(deploy_base) == ["app"]
+
+
+def test_publish_updates_the_app_index(staging):
+    staging_base, deploy_base = staging
+    publish.publish(staging_base, deploy_base, [os.path.join("app", "1.0.0")])
+    index_path = publish.get_app_index_path(deploy_base)
+    with open(index_path) as f:
+        assert f.read() == "app\n"
+    assert os.stat(index_path).st_mode & 0o777 == 0o644
+    # Not rewritten if unchanged
+    os.utime(index_path, ns=(0, 0))
+    publish.update_app_index(deploy_base)
+    assert os.stat(index_path).st_mtime_ns == 0
+    os.makedirs(os.path.join(deploy_base, "other-app"))
+    publish.update_app_index(deploy_base)
+    with open(index_path) as f:
+        assert f.read() == "app\nother-app\n"
+
+
+def test_publish_keeps_existing_versions(staging):
+    staging_base, deploy_base = staging
+    os.makedirs(os.path.join(deploy_base, "app", "1.0.0"))
+    with pytest.raises(OSError):
+        publish.publish(staging_base, deploy_base, [os.path.join("app", "1.0.0")])
+    assert os.listdir(os.path.join(deploy_base, "app", "1.0.0")) == []
+
+    os.makedirs(os.path.join(staging_base, "app", "1.1.0"))
+    publish.publish(staging_base, deploy_base, [os.path.join("app", "1.1.0")])
+    assert sorted(os.listdir(os.path.join(deploy_base, "app"))) == [".current", "1.0.0", "1.1.0", "metadata.json"]
+    assert publish.get_current(deploy_base, "app") == "1.1.0"
+
+
+def test_publish_updates_app_files(tmpdir):
+    deploy_base = str(tmpdir.mkdir("deploy"))
+    os.makedirs(os.path.join(deploy_base, "app", "1.0.0"))
+    with open(os.path.join(deploy_base, "app", "metadata.json"), "w") as f:
+        f.write("1.0.0\n")
+    os.chmod(os.path.join(deploy_base, "app", "metadata.json"), 0o664)
+
+    staging_base = publish.create_staging_base(deploy_base)
+    # acc-py updates the files of the deploy base, copied into the staging folder
+    with open(os.path.join(staging_base, "app", "metadata.json"), "a") as f:
+        f.write(f"1.1.0 {staging_base}/app/1.1.0\n")
+    os.makedirs(os.path.join(staging_base, "app", "1.1.0"))
+    publish.publish(staging_base, deploy_base, [os.path.join("app", "1.1.0")])
+    with open(os.path.join(deploy_base, "app", "metadata.json")) as f:
+        assert f.read() == f"1.0.0\n1.1.0 {deploy_base}/app/1.1.0\n"
+    assert os.stat(os.path.join(deploy_base, "app", "metadata.json")).st_mode & 0o777 == 0o664
+
+
+def test_publish_refuses_concurrent_changes_of_app_files(tmpdir):
+    deploy_base = str(tmpdir.mkdir("deploy"))
+    os.makedirs(os.path.join(deploy_base, "app"))
+    with open(os.path.join(deploy_base, "app", "metadata.json"), "w") as f:
+        f.write("1.0.0\n")
+    staging_base = publish.create_staging_base(deploy_base)
+    with open(os.path.join(staging_base, "app", "metadata.json"), "a") as f:
+        f.write("1.1.0\n")
+    os.makedirs(os.path.join(staging_base, "app", "1.1.0"))
+    # Another deploy published 1.2.0 meanwhile
+    with open(os.path.join(deploy_base, "app", "metadata.json"), "a") as f:
+        f.write("1.2.0 and more\n")
+    with pytest.raises(OSError):
+        publish.publish(staging_base, deploy_base, [os.path.join("app", "1.1.0")])
+    assert not os.path.exists(os.path.join(deploy_base, "app", "1.1.0"))
+
+
+def test_staging(tmpdir):
+    deploy_base = str(tmpdir.mkdir("deploy"))
+    with publish.staging(deploy_base) as staging_base:
+        assert os.path.isdir(staging_base)
+        assert os.path.basename(staging_base).startswith(publish.STAGING_PREFIX)
+        # In use
+        assert publish.find_stale_staging(deploy_base) == []
+    assert not os.path.exists(staging_base)
+
+
+def test_discard_stale_staging(tmpdir):
+    deploy_base = str(tmpdir.mkdir("deploy"))
+    crashed = publish.create_staging_base(deploy_base)
+    open(os.path.join(crashed, publish.STAGING_LOCK_NAME), "w").close()  # Locked by a process that is gone
+    starting = publish.create_staging_base(deploy_base)  # Not locked yet, but recent
+    old = publish.create_staging_base(deploy_base)
+    os.utime(old, (0, 0))
+    assert sorted(publish.find_stale_staging(deploy_base)) == sorted([crashed, old])
+    assert sorted(publish.discard_stale_staging(deploy_base)) == sorted([crashed, old])
+    assert not os.path.exists(crashed) and not os.path.exists(old)
+    assert os.path.isdir(starting)
+
+
+def test_relocate(tmpdir):
+    os.makedirs(tmpdir / "old" / "venv" / "bin")
+    with open(tmpdir / "old" / "venv" / "bin" / "activate", "w") as f:
+        f.write(f"VIRTUAL_ENV={tmpdir / 'old' / 'venv'}\n")
+    with open(tmpdir / "old" / "venv" / "paths.pth", "w") as f:
+        f.write(f"{tmpdir / 'old' / 'venv' / 'src'}\n")
+    changed = publish.relocate(str(tmpdir / "old"), str(tmpdir / "old"), str(tmpdir / "new"))
+    assert len(changed) == 2
+    with open(tmpdir / "old" / "venv" / "paths.pth") as f:
+        assert f.read() == f"{tmpdir / 'new' / 'venv' / 'src'}\n"
+
+
+def test_relocate_leaves_binaries_alone(tmpdir):
+    os.makedirs(tmpdir / "old" / "venv" / "bin")
+    binary = b"\x7fELF\x02\x01\x01\0" + str(tmpdir / "old" / "venv").encode() + b"\0offsets\0"
+    with open(tmpdir / "old" / "venv" / "bin" / "program", "wb") as f:
+        f.write(binary)
+    # Not even if it looks like a script
+    with open(tmpdir / "old" / "venv" / "bin" / "fake-script", "wb") as f:
+        f.write(b"#!" + binary)
+    with open(tmpdir / "old" / "venv" / "bin" / "script", "w") as f:
+        f.write(f"#!{tmpdir / 'old' / 'venv' / 'bin' / 'python'}\n")
+    changed = publish.relocate(str(tmpdir / "old"), str(tmpdir / "old"), str(tmpdir / "new"))
+    assert changed == [str(tmpdir / "old" / "venv" / "bin" / "script")]
+    with open(tmpdir / "old" / "venv" / "bin" / "program", "rb") as f:
+        assert f.read() == binary
+    with open(tmpdir / "old" / "venv" / "bin" / "fake-script", "rb") as f:
+        assert f.read() == b"#!" + binary
+
+
+def test_current_pointer(tmpdir):
+    deploy_base = str(tmpdir)
+    for version in ("1.9.0", "1.10.0", ".1.11.0.staging-1234"):
+        os.makedirs(os.path.join(deploy_base, "app", version))
+    assert publish.list_versions(deploy_base, "app") == ["1.9.0", "1.10.0"]
+    assert publish.get_current(deploy_base, "app") is None
+    publish.set_current(deploy_base, "app", "1.9.0")
+    assert os.readlink(os.path.join(deploy_base, "app", publish.CURRENT_NAME)) == "1.9.0"
+    publish.set_current(deploy_base, "app", "1.10.0")
+    assert publish.get_current(deploy_base, "app") == "1.10.0"
+    # The pointer is not a version
+    assert publish.list_versions(deploy_base, "app") == ["1.9.0", "1.10.0"]
+    with pytest.raises(ValueError):
+        publish.set_current(deploy_base, "app", "2.0.0")
+    os.rmdir(os.path.join(deploy_base, "app", "1.10.0"))
+    assert publish.get_current(deploy_base, "app") is None
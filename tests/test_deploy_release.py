@@ -0,0 +1,64 @@
+import os
+import pytest
+
+from bipy_gui_manager.deploy import publish, release
+
+
+def make_version(deploy_base, app, version):
+    version_path = os.path.join(deploy_base, app, version)
+    os.makedirs(os.path.join(version_path, "venv", "bin"))
+    with open(os.path.join(version_path, "venv", "pyvenv.cfg"), "w") as f:
+        f.write(f"home = {version_path}/venv/bin\n")
+    with open(os.path.join(version_path, "venv", "app.py"), "w") as f:
+        f.write(f"VERSION = '{version}'\n")
+    os.symlink("python3", os.path.join(version_path, "venv", "bin", "python"))
+    with open(os.path.join(deploy_base, app, "metadata.json"), "w") as f:
+        f.write("{}")
+
+
+def test_rollback_version(tmpdir):
+    deploy_base = str(tmpdir / "deploy")
+    for version in ("1.9.0", "1.10.0", "1.11.0"):
+        make_version(deploy_base, "app", version)
+    publish.set_current(deploy_base, "app", "1.11.0")
+    assert release.rollback_version(deploy_base, "app") == ("1.11.0", "1.10.0")
+    assert publish.get_current(deploy_base, "app") == "1.10.0"
+    assert release.rollback_version(deploy_base, "app", "1.11.0") == ("1.10.0", "1.11.0")
+    assert publish.get_current(deploy_base, "app") == "1.11.0"
+    with pytest.raises(ValueError):
+        release.rollback_version(deploy_base, "app", "2.0.0")
+    release.rollback_version(deploy_base, "app", "1.9.0")
+    with pytest.raises(ValueError):
+        release.rollback_version(deploy_base, "app")
+    with pytest.raises(ValueError):
+        release.rollback_version(deploy_base, "missing")
+
+
+def test_promote_version(tmpdir):
+    source_base, target_base = str(tmpdir / "development"), str(tmpdir / "operational")
+    os.makedirs(target_base)
+    for version in ("1.0.0", "1.1.0"):
+        make_version(source_base, "app", version)
+    publish.set_current(source_base, "app", "1.0.0")
+
+    assert release.promote_version("app", source_base=source_base, target_base=target_base) == "1.0.0"
+    assert publish.get_current(target_base, "app") == "1.0.0"
+    promoted = os.path.join(target_base, "app", "1.0.0", "venv")
+    source = os.path.join(source_base, "app", "1.0.0", "venv")
+    assert os.path.samefile(os.path.join(promoted, "app.py"), os.path.join(source, "app.py"))
+    assert os.readlink(os.path.join(promoted, "bin", "python")) == "python3"
+    with open(os.path.join(promoted, "pyvenv.cfg")) as f:
+        assert f.read() == f"home = {promoted}/bin\n"
+    # The development version is untouched
+    with open(os.path.join(source_base, "app", "1.0.0", "venv", "pyvenv.cfg")) as f:
+        assert f.read() == f"home = {source_base}/app/1.0.0/venv/bin\n"
+    assert os.path.isfile(os.path.join(target_base, "app", "metadata.json"))
+    assert [name for name in os.listdir(target_base) if name.startswith(".deploy")] == []
+
+    release.promote_version("app", "1.1.0", source_base=source_base, target_base=target_base)
+    assert publish.get_current(target_base, "app") == "1.1.0"
+    # Promoting a version promoted before only switches the pointer back
+    release.promote_version("app", "1.0.0", source_base=source_base, target_base=target_base)
+    assert publish.get_current(target_base, "app") == "1.0.0"
+    with pytest.raises(ValueError):
+        release.promote_version("app", "2.0.0", source_base=source_base, target_base=target_base)
@@ -0,0 +1,33 @@
+import pytest
+
+from bipy_gui_manager.deploy import requirements
+
+
+@pytest.mark.parametrize("content,expected", [
+    ("numpy\n", "numpy\n"),
+    ("git+https://gitlab.cern.ch:8443/test/test.git\n", "git+https://:@gitlab.cern.ch:8443/test/test.git\n"),
+    ("git+https://:@gitlab.cern.ch:8443/test/test.git\n", "git+https://:@gitlab.cern.ch:8443/test/test.git\n"),
+    ("-e git+https://gitlab.cern.ch:8443/test/test.git#egg=test  # see https://gitlab.cern.ch:8443/x\r\n",
+     "-e git+https://:@gitlab.cern.ch:8443/test/test.git#egg=test  # see https://gitlab.cern.ch:8443/x\r\n"),
+    ("# https://gitlab.cern.ch:8443/test\nnumpy", "# https://gitlab.cern.ch:8443/test\nnumpy"),
+    ("", ""),
+])
+def test_transform_requirements(content, expected):
+    assert requirements.transform_requirements(content) == expected
+    # Idempotent
+    assert requirements.transform_requirements(expected) == expected
+
+
+def test_parse_requirements():
+    assert requirements.parse_requirements("numpy  # comment\nscipy") == [
+        requirements.RequirementLine("numpy", "  # comment", "\n"),
+        requirements.RequirementLine("scipy", "", ""),
+    ]
+
+
+def test_transform_requirements_file(tmpdir):
+    path = tmpdir / "requirements.txt"
+    path.write("git+https://gitlab.cern.ch:8443/test/test.git\n")
+    assert requirements.transform_requirements_file(str(path))
+    assert path.read() == "git+https://:@gitlab.cern.ch:8443/test/test.git\n"
+    assert not requirements.transform_requirements_file(str(path))
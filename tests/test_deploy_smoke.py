@@ -0,0 +1,96 @@
+import os
+import pytest
+from argparse import Namespace
+
+from bipy_gui_manager.deploy import deploy, publish, smoke
+from bipy_gui_manager.run import startup
+
+
+@pytest.fixture()
+def deploy_base(tmpdir, monkeypatch):
+    monkeypatch.setenv("BIPY_GUI_MANAGER_CACHE_PATH", str(tmpdir / "cache"))
+    os.makedirs(tmpdir / "deploy" / "app" / "1.1.0" / "venv")
+    yield str(tmpdir / "deploy")
+
+
+def fake_launch(monkeypatch, deploy_base, startup_seconds, version="1.1.0", returncode=0):
+    """ Replaces the launch of the application with one that took startup_seconds (None: did not start) """
+    launches = []
+
+    def launch(command, timeout=None, env=None, **kwargs):
+        launches.append((command, timeout, env))
+        probes = [{"prefix": os.path.join(deploy_base, "app", version, "venv"),
+                   "event_loop_reached": None if startup_seconds is None else 100 + startup_seconds}]
+        return startup.LaunchResult(returncode=returncode, started_at=100, probes=probes,
+                                    imports=[startup.ImportTime("PyQt5", 1000, 1000, 0)])
+    monkeypatch.setattr(smoke.startup, "launch", launch)
+    return launches
+
+
+def save_baseline(deploy_base, version, startup_seconds):
+    result = startup.LaunchResult(returncode=0, started_at=0, imports=[],
+                                  probes=[{"event_loop_reached": startup_seconds}])
+    smoke.save_report(deploy_base, startup.build_report("app", version, result, headless=True))
+
+
+def list_reports(deploy_base):
+    return sorted(name for name in os.listdir(os.path.join(deploy_base, "app")) if name.endswith(".smoke.json"))
+
+
+def test_smoke_test_first_version(deploy_base, monkeypatch):
+    launches = fake_launch(monkeypatch, deploy_base, 2.0)
+    result = smoke.smoke_test(deploy_base, os.path.join("app", "1.1.0"), "/acc-py/bin", timeout=10)
+    assert result.passed and result.startup_seconds == 2.0 and result.baseline_version is None
+    [(command, timeout, env)] = launches
+    # Launched through a view of the deploy base that only contains the version tested
+    assert command[-3] == "app" and command[-1] == "/acc-py/bin"
+    assert os.listdir(os.path.join(command[-2], "app")) == ["1.1.0"]
+    assert timeout == 10 and env["QT_QPA_PLATFORM"] == "offscreen"
+    # Recorded next to the version for the next versions, whoever deploys them, apart from the interactive profiles
+    assert list_reports(deploy_base) == [".1.1.0.smoke.json"]
+    assert os.stat(smoke.get_report_path(deploy_base, "app", "1.1.0")).st_mode & 0o777 == 0o644
+    assert startup.load_reports("app") == []
+    assert publish.list_versions(deploy_base, "app") == ["1.1.0"]
+
+
+def test_smoke_test_compares_with_previous_version(deploy_base, monkeypatch):
+    save_baseline(deploy_base, "1.0.0", 2.0)
+    save_baseline(deploy_base, "0.9.0", 1.0)
+    save_baseline(deploy_base, "2.0.0", 1.0)  # Not a previous version
+    # Deployed by somebody else
+    monkeypatch.setenv("BIPY_GUI_MANAGER_CACHE_PATH", os.path.join(deploy_base, "..", "other-cache"))
+    fake_launch(monkeypatch, deploy_base, 2.2)
+    result = smoke.smoke_test(deploy_base, os.path.join("app", "1.1.0"), "/acc-py/bin")
+    assert result.passed and result.baseline_version == "1.0.0" and result.baseline_seconds == 2.0
+    assert "+10% compared to 1.0.0" in result.message
+
+
+def test_smoke_test_regression(deploy_base, monkeypatch):
+    save_baseline(deploy_base, "1.0.0", 2.0)
+    fake_launch(monkeypatch, deploy_base, 3.0)
+    result = smoke.smoke_test(deploy_base, os.path.join("app", "1.1.0"), "/acc-py/bin", threshold=20)
+    assert result.started and result.regression and not result.passed
+    assert smoke.smoke_test(deploy_base, os.path.join("app", "1.1.0"), "/acc-py/bin", threshold=60).passed
+
+
+def test_smoke_test_failures(deploy_base, monkeypatch):
+    fake_launch(monkeypatch, deploy_base, None, returncode=None)
+    result = smoke.smoke_test(deploy_base, os.path.join("app", "1.1.0"), "/acc-py/bin", timeout=5)
+    assert not result.passed and result.message == "app 1.1.0 did not start within 5s"
+    fake_launch(monkeypatch, deploy_base, None, returncode=1)
+    assert "exit code 1" in smoke.smoke_test(deploy_base, os.path.join("app", "1.1.0"), "/acc-py/bin").message
+    fake_launch(monkeypatch, deploy_base, 1.0, version="1.0.0")
+    result = smoke.smoke_test(deploy_base, os.path.join("app", "1.1.0"), "/acc-py/bin")
+    assert not result.passed and "instead of 1.1.0" in result.message
+    assert list_reports(deploy_base) == []
+
+
+def test_run_smoke_tests_strict(deploy_base, monkeypatch):
+    parameters = Namespace(smoke_timeout=5, smoke_threshold=20, strict=False)
+    fake_launch(monkeypatch, deploy_base, None)
+    assert deploy.run_smoke_tests(deploy_base, [os.path.join("app", "1.1.0")], parameters)
+    parameters.strict = True
+    assert not deploy.run_smoke_tests(deploy_base, [os.path.join("app", "1.1.0")], parameters)
+    assert not deploy.run_smoke_tests(deploy_base, [], parameters)
+    fake_launch(monkeypatch, deploy_base, 1.0)
+    assert deploy.run_smoke_tests(deploy_base, [os.path.join("app", "1.1.0")], parameters)
@@ -0,0 +1,99 @@
+import os
+import argparse
+import py_compile
+
+from bipy_gui_manager.deploy import pipeline, publish, store
+from bipy_gui_manager.maintenance import maintenance
+
+
+def make_version(deploy_base, version):
+    lib = os.path.join(deploy_base, "app", version, "venv", "lib")
+    os.makedirs(lib)
+    with open(os.path.join(lib, "shared.py"), "w") as f:
+        f.write("print('same in all versions')\n")
+    with open(os.path.join(lib, "version.py"), "w") as f:
+        f.write(f"VERSION = '{version}'\n")
+    open(os.path.join(lib, "__init__.py"), "w").close()
+    return lib
+
+
+def test_link_tree(tmpdir):
+    deploy_base = str(tmpdir)
+    old, new = make_version(deploy_base, "1.0.0"), make_version(deploy_base, "1.1.0")
+    assert store.link_tree(deploy_base, os.path.dirname(old)) == store.DedupeResult(2, 0, 0, 0)
+    result = store.link_tree(deploy_base, os.path.dirname(new))
+    assert result == store.DedupeResult(2, 1, len("print('same in all versions')\n"), 0)
+    assert os.path.samefile(os.path.join(old, "shared.py"), os.path.join(new, "shared.py"))
+    assert os.stat(os.path.join(new, "shared.py")).st_nlink == 3  # Both versions and the object
+    assert not os.path.samefile(os.path.join(old, "version.py"), os.path.join(new, "version.py"))
+    with open(os.path.join(new, "version.py")) as f:
+        assert f.read() == "VERSION = '1.1.0'\n"
+    # Linking again changes nothing, and the files known to be linked are not even read
+    assert store.link_tree(deploy_base, os.path.dirname(new)).linked == 0
+    assert store.link_tree(deploy_base, os.path.dirname(new), store.get_object_inodes(deploy_base)).files == 0
+    # The store is not a deployment
+    assert pipeline.list_deployments(deploy_base) == {"app/1.0.0", "app/1.1.0"}
+
+
+def test_link_tree_keeps_the_mode(tmpdir):
+    deploy_base = str(tmpdir)
+    old, new = make_version(deploy_base, "1.0.0"), make_version(deploy_base, "1.1.0")
+    os.chmod(os.path.join(new, "shared.py"), 0o755)
+    store.link_tree(deploy_base, os.path.dirname(old))
+    assert store.link_tree(deploy_base, os.path.dirname(new)).linked == 0
+    assert os.stat(os.path.join(new, "shared.py")).st_mode & 0o777 == 0o755
+
+
+def test_link_tree_skips_sources_of_timestamp_pycs(tmpdir):
+    deploy_base = str(tmpdir)
+    old, new = make_version(deploy_base, "1.0.0"), make_version(deploy_base, "1.1.0")
+    store.link_tree(deploy_base, os.path.dirname(old))
+    py_compile.compile(os.path.join(new, "shared.py"), invalidation_mode=py_compile.PycInvalidationMode.TIMESTAMP)
+    result = store.link_tree(deploy_base, os.path.dirname(new))
+    assert result.skipped == 1
+    assert not os.path.samefile(os.path.join(old, "shared.py"), os.path.join(new, "shared.py"))
+
+
+def test_store_is_shared(tmpdir):
+    deploy_base = str(tmpdir)
+    umask = os.umask(0o022)
+    try:
+        store.link_tree(deploy_base, os.path.dirname(make_version(deploy_base, "1.0.0")))
+    finally:
+        os.umask(umask)
+    # The other deployers can add objects
+    for root, _, _ in os.walk(store.get_store_path(deploy_base)):
+        assert os.stat(root).st_mode & 0o070 == 0o070
+
+
+def test_collect_garbage(tmpdir):
+    deploy_base = str(tmpdir)
+    old = make_version(deploy_base, "1.0.0")
+    store.link_tree(deploy_base, os.path.dirname(old))
+    assert store.collect_garbage(deploy_base) == 0
+    os.remove(os.path.join(old, "version.py"))
+    assert store.collect_garbage(deploy_base) == len("VERSION = '1.0.0'\n")
+    assert len(store.get_object_inodes(deploy_base)) == 1
+
+
+def test_publish_links_into_the_store(tmpdir):
+    deploy_base = str(tmpdir.mkdir("deploy"))
+    old = make_version(deploy_base, "1.0.0")
+    store.link_tree(deploy_base, os.path.dirname(old))
+    staging_base = publish.create_staging_base(deploy_base)
+    make_version(staging_base, "1.1.0")
+    publish.publish(staging_base, deploy_base, [os.path.join("app", "1.1.0")])
+    new = os.path.join(deploy_base, "app", "1.1.0", "venv", "lib")
+    assert os.path.samefile(os.path.join(old, "shared.py"), os.path.join(new, "shared.py"))
+    # The store is not a deployment
+    assert pipeline.list_deployments(deploy_base) == {"app/1.0.0", "app/1.1.0"}
+
+
+def test_dedupe(tmpdir, monkeypatch, capsys):
+    deploy_base = str(tmpdir.mkdir("deploy"))
+    old, new = make_version(deploy_base, "1.0.0"), make_version(deploy_base, "1.1.0")
+    monkeypatch.setattr(maintenance, "DEVELOPMENT_DEPLOY_PATH", deploy_base)
+    maintenance.dedupe(argparse.Namespace(verbose=False, operational=False, workers=2))
+    assert os.path.samefile(os.path.join(old, "shared.py"), os.path.join(new, "shared.py"))
+    output = capsys.readouterr().out
+    assert "app/1.0.0" in output and "app/1.1.0" in output
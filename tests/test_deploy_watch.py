@@ -0,0 +1,163 @@
+import os
+import time
+import pytest
+
+from bipy_gui_manager.deploy import deploy, watch
+from bipy_gui_manager.utils import version_control as vcs
+from bipy_gui_manager.utils.watch import InotifyWatcher, PollingWatcher, EVERYTHING
+
+
+@pytest.fixture()
+def project_dir(tmpdir):
+    project_dir = str(tmpdir / 'project')
+    os.makedirs(os.path.join(project_dir, "package"))
+    with open(os.path.join(project_dir, "setup.py"), "w") as f:
+        f.write("from setuptools import setup\nsetup(name='project', version='1.0.0')\n")
+    with open(os.path.join(project_dir, ".gitignore"), "w") as f:
+        f.write("venv/\n")
+    vcs.init_local_repo(project_dir)
+    remote = str(tmpdir / "remote.git")
+    vcs.invoke_git(['init', '--bare', remote], cwd=str(tmpdir))
+    vcs.invoke_git(['remote', 'add', 'origin', remote], cwd=project_dir)
+    vcs.invoke_git(['push', '-u', 'origin', 'master'], cwd=project_dir)
+    yield project_dir
+
+
+class ScriptedWatcher:
+    """ Applies one change to the project at every wait() and reports what changed """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+
+    def wait(self, timeout=None):
+        if not self.steps:
+            return set()
+        return self.steps.pop(0)() or set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+def test_get_project_version(tmpdir):
+    assert deploy.get_project_version(tmpdir, "pyqt") is None
+    with open(tmpdir / "setup.py", "w") as f:
+        f.write("setup(\n    name='test',\n    version=\"0.1.2\",\n)")
+    assert deploy.get_project_version(tmpdir, "pyqt") == "0.1.2"
+    os.makedirs(tmpdir / "app")
+    with open(tmpdir / "app" / "pyproject.toml", "w") as f:
+        f.write("[project]\nname = 'test'\nversion = '2.0'\n")
+    assert deploy.get_project_version(tmpdir, "comrad") == "2.0"
+
+
+def test_checks_invalidated_by():
+    assert watch.checks_invalidated_by(EVERYTHING) == set(watch.CHECKS)
+    assert watch.checks_invalidated_by("setup.py") == {"clean", "version"}
+    assert watch.checks_invalidated_by(os.path.join(".git", "HEAD")) == {"branch", "clean", "version"}
+    assert watch.checks_invalidated_by(os.path.join(".git", "config")) == {"remote", "clean"}
+    assert watch.checks_invalidated_by(os.path.join(".git", "refs", "heads", "master")) == {"clean", "version"}
+    assert watch.checks_invalidated_by(os.path.join(".git", "index.lock")) == set()
+
+
+def test_is_excluded():
+    assert watch.is_excluded("venv")
+    assert watch.is_excluded(os.path.join("package", "__pycache__"))
+    assert watch.is_excluded(os.path.join(".git", "objects"))
+    assert not watch.is_excluded(".git")
+    assert not watch.is_excluded(os.path.join(".git", "refs", "heads"))
+    assert not watch.is_excluded("package")
+
+
+def test_readiness_state_reruns_only_invalidated_checks(project_dir):
+    state = watch.ReadinessState(project_dir, "pyqt", deploy.get_deploy_version)
+    assert state.refresh() == list(watch.CHECKS)
+    assert state.problems() == []
+    assert state.version == "1.0.0"
+    assert state.refresh() == []
+
+    with open(os.path.join(project_dir, "new_file.py"), "w") as f:
+        f.write("pass")
+    state.invalidate({"new_file.py"})
+    assert state.refresh() == ["clean", "version"]
+    assert state.problems() == ["uncommitted and/or unpushed changes"]
+
+    vcs.invoke_git(['checkout', '-b', 'feature'], cwd=project_dir)
+    state.invalidate({os.path.join(".git", "HEAD")})
+    assert state.refresh() == ["branch", "clean", "version"]
+    assert "not on master" in state.problems()
+
+
+def test_watch_and_deploy(project_dir):
+    deployed = []
+
+    def bump_version(version):
+        def step():
+            with open(os.path.join(project_dir, "setup.py"), "w") as f:
+                f.write(f"from setuptools import setup\nsetup(name='project', version='{version}')\n")
+            return {"setup.py"}
+        return step
+
+    def commit_and_push():
+        vcs.invoke_git(['commit', '-am', 'Bump version'], cwd=project_dir)
+        vcs.invoke_git(['push'], cwd=project_dir)
+        return {os.path.join(".git", "index"), os.path.join(".git", "refs", "heads", "master"),
+                os.path.join(".git", "refs", "remotes", "origin", "master")}
+
+    steps = [
+        lambda: None,  # Nothing changes: no new deploy
+        bump_version("1.0.1"),  # Not committed: no deploy
+        commit_and_push,  # Ready with a new version: deploy
+    ]
+    watcher = ScriptedWatcher(steps)
+    watch.watch_and_deploy(project_dir, "pyqt", deploy_function=lambda: deployed.append(
+                               deploy.get_project_version(project_dir, "pyqt")) or True,
+                           version_getter=deploy.get_deploy_version, watcher=watcher, debounce=0,
+                           stop=lambda: not watcher.steps and len(deployed) >= 2)
+    assert deployed == ["1.0.0", "1.0.1"]
+
+
+def test_watch_and_deploy_skips_deployed_versions(project_dir, tmpdir):
+    deploy_base = str(tmpdir / "deploy")
+    os.makedirs(os.path.join(deploy_base, "project", "1.0.0"))
+    deployed = []
+    watcher = ScriptedWatcher([lambda: None])
+    watch.watch_and_deploy(project_dir, "pyqt", deploy_function=lambda: deployed.append(True) or True,
+                           version_getter=deploy.get_deploy_version, watcher=watcher, debounce=0,
+                           stop=lambda: not watcher.steps,
+                           is_deployed=lambda version: deploy.is_version_deployed(project_dir, "pyqt", deploy_base,
+                                                                                  version))
+    # Deployed before the watch started: nothing to do until the version changes
+    assert deployed == []
+    assert not deploy.is_version_deployed(project_dir, "pyqt", deploy_base, "1.0.1")
+
+
+@pytest.mark.parametrize("watcher_class", [InotifyWatcher, PollingWatcher])
+def test_watchers(tmpdir, watcher_class):
+    os.makedirs(tmpdir / "watched" / "folder")
+    os.makedirs(tmpdir / "excluded")
+    kwargs = {"interval": 0.05} if watcher_class is PollingWatcher else {}
+    try:
+        watcher = watcher_class(str(tmpdir), exclude=lambda path: path == "excluded", **kwargs)
+    except OSError:
+        pytest.skip("inotify not available")
+
+    with watcher:
+        assert watcher.wait(timeout=0.1) == set()
+        with open(tmpdir / "excluded" / "file", "w") as f:
+            f.write("ignored")
+        with open(tmpdir / "watched" / "folder" / "file", "w") as f:
+            f.write("content")
+        changes = watcher.wait(timeout=2)
+        time.sleep(0.1)
+        changes |= watcher.wait(timeout=0.2)
+        assert os.path.join("watched", "folder", "file") in changes
+        assert not any(change.startswith("excluded") for change in changes)
+
+        # New folders are watched too
+        os.makedirs(tmpdir / "watched" / "new_folder")
+        watcher.wait(timeout=0.2)
+        with open(tmpdir / "watched" / "new_folder" / "file", "w") as f:
+            f.write("content")
+        assert os.path.join("watched", "new_folder", "file") in watcher.wait(timeout=2)
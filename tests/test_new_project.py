@@ -1,4 +1,6 @@
 import os
+import glob
+import json
 import time
 import pytest
 from bipy_gui_manager.new import new_project
@@ -18,6 +20,21 @@ def test_new_project_defaults_all_in_flags(monkeypatch, tmpdir, mock_git, mock_g
     new_project.new_project(params)
 
 
+def test_new_project_writes_trace(monkeypatch, tmpdir, mock_git, mock_gitlab, mock_phonebook):
+    # With --trace, a Chrome trace containing all the stages is saved
+    trace_file = os.path.join(tmpdir, "trace.json")
+    params = new_project_parameters(path=tmpdir, name="test-project", desc="That's a test project!",
+                                    author="me", repo_type="test", clone_protocol="https", gitlab_token="fake-token",
+                                    upload_protocol="https", gitlab=True, crash=True, trace_file=trace_file)
+    monkeypatch.setattr('bipy_gui_manager.new.new_project.install_project', lambda *a, **k: None)
+    new_project.new_project(params)
+    with open(trace_file) as f:
+        names = [event["name"] for event in json.load(f)["traceEvents"]]
+    for stage in ["collect", "get_template", "apply_customizations", "generate_readme", "setup_version_control",
+                  "publish", "install_project"]:
+        assert stage in names
+
+
 def test_new_project_handles_exceptions_ask_cleanup(monkeypatch, tmpdir, mock_git, mock_gitlab, mock_phonebook):
     # Check if it fails in a controlled way and asks the user whether to cleanup
     params = new_project_parameters(path=tmpdir, name="test-project", desc="That's a test project!",
@@ -41,14 +58,16 @@ def test_new_project_handles_exceptions_cleanup_no(monkeypatch, tmpdir, mock_git
                                        upload_protocol="https", gitlab=True, crash=False, interactive=True)
 
     def fail(*args, **kwargs):
-        tmpdir.mkdir("test-project")
+        os.makedirs(kwargs["project_path"])
         raise AttributeError("Imagine this function fails...")
     monkeypatch.setattr('bipy_gui_manager.new.new_project.get_template', fail)
 
     monkeypatch.setattr('builtins.input', lambda _: "no")
     new_project.new_project(params)
     time.sleep(0.1)
-    assert os.path.isdir(os.path.join(tmpdir, "test-project"))
+    # The project was never published, the staging folder is left for inspection
+    assert not os.path.exists(os.path.join(tmpdir, "test-project"))
+    assert len(glob.glob(os.path.join(tmpdir, ".test-project.staging-*"))) == 1
 
 
 def test_new_project_handles_exceptions_cleanup_yes(monkeypatch, tmpdir, mock_git, mock_gitlab, mock_phonebook):
@@ -59,7 +78,7 @@ def test_new_project_handles_exceptions_cleanup_yes(monkeypatch, tmpdir, mock_gi
                                        upload_protocol="https", gitlab=True, crash=False, interactive=True)
 
     def fail(*args, **kwargs):
-        tmpdir.mkdir("test-project")
+        os.makedirs(kwargs["project_path"])
         raise AttributeError("Imagine this function fails...")
     monkeypatch.setattr('bipy_gui_manager.new.new_project.get_template', fail)
 
@@ -67,6 +86,30 @@ def test_new_project_handles_exceptions_cleanup_yes(monkeypatch, tmpdir, mock_gi
     new_project.new_project(params)
     time.sleep(0.1)
     assert not os.path.isdir(os.path.join(tmpdir, "test-project"))
+    assert not glob.glob(os.path.join(tmpdir, ".test-project.staging-*"))
+
+
+def test_new_project_is_published_only_when_complete(monkeypatch, tmpdir, mock_git, mock_gitlab, mock_phonebook):
+    # The project folder appears only once the project is complete, and is installed in its final location
+    params = new_project_parameters(path=tmpdir, name="test-project", desc="That's a test project!",
+                                    author="me", repo_type="test", clone_protocol="https", gitlab_token="fake-token",
+                                    upload_protocol="https", gitlab=True, crash=True)
+    project_path = os.path.join(tmpdir, "test-project")
+    seen = {}
+
+    def check_setup(*args, **kwargs):
+        seen["setup_path"] = kwargs["project_path"]
+        seen["published_during_setup"] = os.path.exists(project_path)
+    monkeypatch.setattr('bipy_gui_manager.new.new_project.setup_version_control', check_setup)
+    monkeypatch.setattr('bipy_gui_manager.new.new_project.install_project',
+                        lambda project_path, **k: seen.update(install_path=project_path))
+    new_project.new_project(params)
+
+    assert not seen["published_during_setup"]
+    assert os.path.dirname(seen["setup_path"]) == str(tmpdir)
+    assert seen["install_path"] == project_path
+    assert os.path.isfile(os.path.join(project_path, "README.md"))
+    assert not glob.glob(os.path.join(tmpdir, ".test-project.staging-*"))
 
 
 # ###############################
@@ -109,6 +152,31 @@ def test_get_template_copy_from_path_valid(tmpdir, monkeypatch):
     with open(os.path.join(project_path, ".hidden_file"), "r") as testfile:
         assert testfile.read() == "Something hidden"
     assert not os.path.exists(os.path.join(project_path, "sy_bi_pyqt_template"))
+    assert os.path.exists(os.path.join(template_folder, "README-template.md"))  # The template is not moved
+
+
+def test_get_template_hardlinks_leave_template_untouched(tmpdir):
+    template_folder = os.path.join(tmpdir, "template-folder")
+    create_template_files(template_folder, "sy-bi-pyqt-template")
+    with open(os.path.join(template_folder, "setup.py")) as f:
+        template_setup = f.read()
+
+    project_path = os.path.join(tmpdir, "test-project")
+    new_project.get_template(project_path=project_path, clone_protocol="https", template_path=template_folder,
+                             clone_mode="hardlink")
+    new_project.apply_customizations(project_path=project_path, project_name="test-project",
+                                     project_desc="This is a test", project_author="Test author",
+                                     project_email="test-email@cern.ch")
+    new_project.generate_readme(project_path=project_path, project_name="test-project",
+                                project_desc="This is a test", project_author="Test author",
+                                project_email="test-email@cern.ch", gitlab_repo=None)
+
+    with open(os.path.join(template_folder, "setup.py")) as f:
+        assert f.read() == template_setup
+    with open(os.path.join(template_folder, "README-template.md")) as f:
+        assert f.readline() == "Project Name\n"
+    with open(os.path.join(project_path, "setup.py")) as f:
+        assert "test-project" in f.read()
 
 
 def test_get_template_copy_from_path_wrong(tmpdir, monkeypatch):
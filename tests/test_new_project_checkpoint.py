@@ -0,0 +1,99 @@
+import os
+import json
+import pytest
+
+from bipy_gui_manager.new import new_project
+from bipy_gui_manager.new.checkpoint import Checkpoint, get_checkpoint_path
+
+from .conftest import new_project_parameters
+
+
+def test_checkpoint_save_and_load(tmpdir):
+    project_path = os.path.join(tmpdir, "project")
+    checkpoint = Checkpoint({"project_path": project_path, "author_token": "secret"}, build_path="build",
+                            options={"gitlab": True})
+    checkpoint.complete("create_gitlab_repository", {"id": 1})
+
+    with open(get_checkpoint_path(project_path)) as f:
+        assert "secret" not in f.read()
+    loaded = Checkpoint.load(project_path)
+    assert loaded.build_path == "build"
+    assert loaded.options == {"gitlab": True}
+    assert loaded.stages == {"create_gitlab_repository": {"id": 1}}
+    assert "author_token" not in loaded.project_data
+
+    loaded.delete()
+    with pytest.raises(ValueError):
+        Checkpoint.load(project_path)
+
+
+def test_checkpoint_run_skips_completed_stages(tmpdir):
+    checkpoint = Checkpoint({"project_path": str(tmpdir)})
+    calls = []
+    assert checkpoint.run("stage", lambda: calls.append(1) or "output") == "output"
+    assert checkpoint.run("stage", lambda: calls.append(1) or "other output") == "output"
+    assert calls == [1]
+    checkpoint.forget("stage", "other stage")
+    assert checkpoint.run("stage", lambda: calls.append(1) or "other output") == "other output"
+    assert calls == [1, 1]
+
+
+def test_new_project_resume(monkeypatch, tmpdir, mock_git, mock_gitlab, mock_phonebook):
+    params = new_project_parameters(path=tmpdir, name="test-project", desc="That's a test project!",
+                                    author="me", repo_type="test", clone_protocol="https", gitlab_token="fake-token",
+                                    upload_protocol="https", gitlab=True, crash=False, interactive=False)
+    project_path = os.path.join(tmpdir, "test-project")
+    created = []
+    create_gitlab_repository = new_project.version_control.create_gitlab_repository
+    monkeypatch.setattr(new_project.version_control, "create_gitlab_repository",
+                        lambda *args, **kwargs: created.append(1) or create_gitlab_repository(*args, **kwargs))
+
+    def fail(**kwargs):
+        raise OSError("Imagine the installation fails...")
+    monkeypatch.setattr(new_project, "install_project", fail)
+    new_project.new_project(params)
+    assert os.path.isdir(project_path)
+    with open(get_checkpoint_path(project_path)) as f:
+        assert "publish" in json.load(f)["stages"]
+
+    # Only the installation is done again
+    def fail_template(**kwargs):
+        raise AssertionError("The template should not be downloaded again")
+    monkeypatch.setattr(new_project, "get_template", fail_template)
+    installed = []
+    monkeypatch.setattr(new_project, "install_project", lambda project_path, **kwargs: installed.append(project_path))
+    new_project.new_project(new_project_parameters(resume=project_path, crash=True))
+    assert created == [1]
+    assert installed == [project_path]
+    assert not os.path.exists(get_checkpoint_path(project_path))
+
+
+def test_new_project_resume_restarts_the_template(monkeypatch, tmpdir, mock_git, mock_phonebook):
+    params = new_project_parameters(path=tmpdir, name="test-project", desc="That's a test project!",
+                                    author="me", repo_type="test", clone_protocol="https", gitlab=False,
+                                    crash=False, interactive=False)
+    project_path = os.path.join(tmpdir, "test-project")
+    apply_customizations = new_project.apply_customizations
+
+    def fail_midway(project_path, **kwargs):
+        with open(os.path.join(project_path, "half-customized"), "w"):
+            pass
+        raise OSError("Imagine the customization fails...")
+    monkeypatch.setattr(new_project, "apply_customizations", fail_midway)
+    new_project.new_project(params)
+    checkpoint = Checkpoint.load(project_path)
+    assert list(checkpoint.stages) == ["get_template"]
+
+    # The template is downloaded again rather than customized twice
+    monkeypatch.setattr(new_project, "apply_customizations", apply_customizations)
+    installed = []
+    monkeypatch.setattr(new_project, "install_project", lambda project_path, **kwargs: installed.append(project_path))
+    new_project.new_project(new_project_parameters(resume=project_path, crash=True))
+    assert installed == [project_path]
+    assert not os.path.exists(os.path.join(project_path, "half-customized"))
+    assert not os.path.exists(get_checkpoint_path(project_path))
+
+
+def test_new_project_resume_nothing_to_resume(tmpdir):
+    with pytest.raises(ValueError):
+        new_project.new_project(new_project_parameters(resume=os.path.join(tmpdir, "test-project"), crash=True))
@@ -0,0 +1,82 @@
+import os
+import pytest
+
+from bipy_gui_manager.new import file_classifier, new_project
+from bipy_gui_manager.utils import version_control
+from .conftest import create_template_files
+
+
+def test_sniff_is_text():
+    assert file_classifier.sniff_is_text(b"print('hello')\n")
+    assert file_classifier.sniff_is_text("àèìòù".encode()[:-1])  # Truncated multi-byte character
+    assert not file_classifier.sniff_is_text(b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR")
+    assert not file_classifier.sniff_is_text("àèìòù".encode("latin-1"))
+
+
+def test_classify(tmpdir):
+    classifier = file_classifier.FileClassifier(["token"])
+    with open(tmpdir / "text", "w") as f:
+        f.write("this file contains a token")
+    with open(tmpdir / "binary", "wb") as f:
+        f.write(b"token\0token")
+    assert classifier.classify(str(tmpdir / "text"), "text").tokens == ["token"]
+    assert not classifier.classify(str(tmpdir / "binary"), "binary").is_text
+    assert classifier.classify(str(tmpdir / "binary"), "binary").tokens == []
+
+
+@pytest.mark.parametrize("threshold", [0, file_classifier.MMAP_THRESHOLD])
+def test_classify_large_file(tmpdir, monkeypatch, threshold):
+    monkeypatch.setattr('bipy_gui_manager.new.file_classifier.MMAP_THRESHOLD', threshold)
+    with open(tmpdir / "large", "w") as f:
+        f.write("x" * 3 * file_classifier.SNIFF_SIZE + "token")
+    classifier = file_classifier.FileClassifier(["token", "other"])
+    assert classifier.classify(str(tmpdir / "large"), "large").tokens == ["token"]
+
+
+def test_classification_cache(tmpdir, monkeypatch):
+    with open(tmpdir / "file", "w") as f:
+        f.write("token")
+    classifier = file_classifier.FileClassifier(["token"], template_version="abcdef")
+    classifier.classify(str(tmpdir / "file"), "file")
+    classifier.save()
+    assert os.path.exists(classifier.cache_file)
+
+    # A new classifier for the same version does not read the file again
+    monkeypatch.setattr('bipy_gui_manager.new.file_classifier.sniff_is_text', lambda _: 1 / 0)
+    classifier = file_classifier.FileClassifier(["token"], template_version="abcdef")
+    assert classifier.classify(str(tmpdir / "file"), "file").tokens == ["token"]
+
+    # But a classifier for another version does
+    classifier = file_classifier.FileClassifier(["token"], template_version="012345")
+    with pytest.raises(ZeroDivisionError):
+        classifier.classify(str(tmpdir / "file"), "file")
+
+
+def test_get_template_version(tmpdir):
+    assert file_classifier.get_template_version(str(tmpdir)) is None
+    with open(tmpdir / "file", "w") as f:
+        f.write("content")
+    version_control.init_local_repo(str(tmpdir))
+    version = file_classifier.get_template_version(str(tmpdir))
+    assert version is not None and len(version) == 40
+
+    with open(tmpdir / "file", "w") as f:
+        f.write("changed")
+    assert file_classifier.get_template_version(str(tmpdir)) is None
+
+
+def test_apply_customizations_by_content(tmpdir):
+    project_path = os.path.join(tmpdir, "sy-bi-pyqt-template")
+    create_template_files(project_path, "sy-bi-pyqt-template")
+    with open(os.path.join(project_path, "Dockerfile"), "w") as f:
+        f.write("LABEL maintainer=sara.zanzottera@cern.ch")
+    with open(os.path.join(project_path, "logo.py"), "wb") as f:
+        f.write(b"\0binary with sy-bi-pyqt-template in it")
+
+    new_project.apply_customizations(project_path=project_path, project_name="test-project",
+                                     project_desc="This is a test", project_author="Test author",
+                                     project_email="test-email@cern.ch")
+    with open(os.path.join(project_path, "Dockerfile")) as f:
+        assert f.read() == "LABEL maintainer=test-email@cern.ch"
+    with open(os.path.join(project_path, "logo.py"), "rb") as f:
+        assert f.read() == b"\0binary with sy-bi-pyqt-template in it"
@@ -0,0 +1,89 @@
+import os
+import json
+import tarfile
+import pytest
+from argparse import Namespace
+
+from bipy_gui_manager.new import new_project, template_pack
+from bipy_gui_manager.new.constants import TEMPLATE_TOKENS, PATH_TOKENS
+from bipy_gui_manager.template import template
+from .conftest import create_template_files
+
+
+@pytest.fixture()
+def template_folder(tmpdir):
+    template_folder = str(tmpdir / "sy-bi-pyqt-template")
+    create_template_files(template_folder, "sy-bi-pyqt-template")
+    os.makedirs(os.path.join(template_folder, ".git"))
+    with open(os.path.join(template_folder, "sy_bi_pyqt_template", "main.py"), "w") as f:
+        f.write("print('nothing to customize')")
+    yield template_folder
+
+
+def test_build_pack_manifest(tmpdir, template_folder):
+    pack = str(tmpdir / "pack.tar.gz")
+    manifest = template_pack.build_pack(template_folder, pack, TEMPLATE_TOKENS, PATH_TOKENS, version="1.0")
+    assert manifest["version"] == "1.0"
+    assert manifest["name"] == "sy-bi-pyqt-template"
+    assert sorted(manifest["files"]) == ["setup.py"]
+    assert "Sara Zanzottera" in manifest["files"]["setup.py"]
+    assert manifest["renames"] == ["sy_bi_pyqt_template"]
+    assert template_pack.read_manifest(pack) == manifest
+
+    with tarfile.open(pack) as archive:
+        names = archive.getnames()
+    assert names[0] == template_pack.MANIFEST_NAME
+    assert not [name for name in names if name.startswith(".git")]
+
+
+def test_extract_pack_and_customize(tmpdir, template_folder):
+    pack = str(tmpdir / "pack.tar.gz")
+    template_pack.build_pack(template_folder, pack, TEMPLATE_TOKENS, PATH_TOKENS)
+
+    project_path = str(tmpdir / "test-project")
+    manifest = new_project.get_template(project_path=project_path, clone_protocol="https", template_pack_path=pack)
+    assert os.path.exists(os.path.join(project_path, ".hidden_file"))
+    assert not os.path.exists(os.path.join(project_path, template_pack.MANIFEST_NAME))
+
+    new_project.apply_customizations(project_path=project_path, project_name="test-project",
+                                     project_desc="This is a test", project_author="Test author",
+                                     project_email="test-email@cern.ch", manifest=manifest)
+    assert os.path.isdir(os.path.join(project_path, "test_project"))
+    assert not os.path.exists(os.path.join(project_path, "images"))
+    with open(os.path.join(project_path, "setup.py")) as f:
+        content = f.read()
+    assert "Sara Zanzottera" not in content
+    assert "Test author" in content
+    assert "test-project=test_project.main:main" in content
+
+
+def test_extract_not_a_pack(tmpdir):
+    archive_path = str(tmpdir / "archive.tar.gz")
+    with open(tmpdir / "file", "w") as f:
+        f.write("file")
+    with tarfile.open(archive_path, "w:gz") as archive:
+        archive.add(str(tmpdir / "file"), arcname="file")
+    with pytest.raises(ValueError):
+        template_pack.extract_pack(archive_path, str(tmpdir / "project"))
+
+
+def test_extract_pack_unsafe_path(tmpdir):
+    archive_path = str(tmpdir / "archive.tar.gz")
+    manifest = json.dumps({"format_version": template_pack.PACK_FORMAT_VERSION, "name": "evil", "version": "1",
+                           "files": {}, "renames": []}).encode()
+    with open(tmpdir / "manifest", "wb") as f:
+        f.write(manifest)
+    with tarfile.open(archive_path, "w:gz") as archive:
+        archive.add(str(tmpdir / "manifest"), arcname=template_pack.MANIFEST_NAME)
+        archive.add(str(tmpdir / "manifest"), arcname="../escaped")
+    with pytest.raises(ValueError):
+        template_pack.extract_pack(archive_path, str(tmpdir / "project"))
+    assert not os.path.exists(tmpdir / "escaped")
+
+
+def test_template_build_command(tmpdir, template_folder):
+    output = str(tmpdir / "output.tar.gz")
+    template.build(Namespace(verbose=False, template_path=template_folder, output=output, name=None, version=None))
+    manifest = template_pack.read_manifest(output)
+    assert manifest["version"] == "unversioned"
+    assert manifest["name"] == "sy-bi-pyqt-template"
@@ -0,0 +1,101 @@
+import os
+import json
+import pytest
+
+from bipy_gui_manager.run import mirror
+
+
+@pytest.fixture()
+def deploy_base(tmpdir, monkeypatch):
+    monkeypatch.setenv("BIPY_GUI_MANAGER_MIRROR_PATH", str(tmpdir / "mirror"))
+    deploy_base = tmpdir / "deploy"
+    for version in ("1.9.0", "1.10.0"):
+        version_path = deploy_base / "app" / version
+        os.makedirs(version_path / "venv" / "bin")
+        os.makedirs(version_path / "venv" / "lib")
+        with open(version_path / "venv" / "lib" / "shared.py", "w") as f:
+            f.write("print('same in all versions')\n")
+        with open(version_path / "venv" / "lib" / "version.py", "w") as f:
+            f.write(f"VERSION = '{version}'\n")
+        with open(version_path / "venv" / "bin" / "app", "w") as f:
+            f.write(f"#!{version_path}/venv/bin/python\nimport app\n")
+        os.chmod(version_path / "venv" / "bin" / "app", 0o755)
+        os.symlink("lib", version_path / "venv" / "lib64")
+    with open(deploy_base / "app" / "metadata.json", "w") as f:
+        f.write("{}")
+    yield str(deploy_base)
+
+
+def test_version_key():
+    assert sorted(["1.10.0", "1.9.0", "1.9.0rc1", "2.0"], key=mirror.version_key) == \
+        ["1.9.0", "1.9.0rc1", "1.10.0", "2.0"]
+
+
+def test_find_latest_version(deploy_base):
+    os.makedirs(os.path.join(deploy_base, "app", ".1.11.0.staging-1234"))
+    assert mirror.find_latest_version(deploy_base, "app") == "1.10.0"
+    assert mirror.find_latest_version(deploy_base, "other") is None
+
+
+def test_sync(deploy_base):
+    mirror_base = mirror.sync(deploy_base, "app")
+    assert mirror_base == mirror.get_mirror_base(deploy_base)
+    version_path = os.path.join(mirror_base, "app", "1.10.0")
+    assert sorted(os.listdir(mirror_base)) == ["app"]
+    assert sorted(os.listdir(os.path.join(mirror_base, "app"))) == ["1.10.0", "metadata.json"]
+    with open(os.path.join(version_path, "venv", "lib", "version.py")) as f:
+        assert f.read() == "VERSION = '1.10.0'\n"
+    assert os.readlink(os.path.join(version_path, "venv", "lib64")) == "lib"
+    script = os.path.join(version_path, "venv", "bin", "app")
+    assert os.access(script, os.X_OK)
+    with open(script) as f:
+        assert f.readline() == f"#!{version_path}/venv/bin/python\n"
+
+
+def test_sync_deduplicates_versions(deploy_base):
+    mirror_base = mirror.sync(deploy_base, "app", "1.9.0")
+    mirror.sync(deploy_base, "app", "1.10.0")
+    old = os.stat(os.path.join(mirror_base, "app", "1.9.0", "venv", "lib", "shared.py"))
+    new = os.stat(os.path.join(mirror_base, "app", "1.10.0", "venv", "lib", "shared.py"))
+    assert old.st_ino == new.st_ino and old.st_nlink == 3  # Both versions and the object
+    assert os.stat(os.path.join(mirror_base, "app", "1.10.0", "venv", "lib", "version.py")).st_ino != \
+        os.stat(os.path.join(mirror_base, "app", "1.9.0", "venv", "lib", "version.py")).st_ino
+
+
+def test_sync_reads_new_versions_only(deploy_base, monkeypatch):
+    mirror.sync(deploy_base, "app")
+    monkeypatch.setattr(mirror, "_mirror_tree", lambda *args: pytest.fail("The version was mirrored again"))
+    mirror.sync(deploy_base, "app")
+    with open(mirror.get_mirror_path("usage.json")) as f:
+        assert list(json.load(f)) == [f"{mirror.get_base_key(deploy_base)}/app/1.10.0"]
+
+
+def test_sync_failure_leaves_nothing(deploy_base, monkeypatch):
+    def fail(*_):
+        raise OSError("disk full")
+    monkeypatch.setattr(mirror, "_mirror_app_files", fail)
+    with pytest.raises(OSError):
+        mirror.sync(deploy_base, "app")
+    assert os.listdir(os.path.join(mirror.get_mirror_base(deploy_base), "app")) == []
+    with pytest.raises(ValueError):
+        mirror.sync(deploy_base, "missing")
+
+
+def test_evict_least_recently_used(deploy_base):
+    mirror_base = mirror.sync(deploy_base, "app", "1.9.0")
+    mirror.sync(deploy_base, "app", "1.10.0")
+    mirror.sync(deploy_base, "app", "1.9.0")  # Now the most recently used
+    size = mirror.get_size()
+    assert mirror.evict(size) == []
+    assert mirror.evict(size - 1) == [f"{mirror.get_base_key(deploy_base)}/app/1.10.0"]
+    assert sorted(os.listdir(os.path.join(mirror_base, "app"))) == ["1.9.0", "metadata.json"]
+    assert mirror.get_size() < size
+    # The objects still used by 1.9.0 are kept
+    with open(os.path.join(mirror_base, "app", "1.9.0", "venv", "lib", "shared.py")) as f:
+        assert f.read() == "print('same in all versions')\n"
+
+
+def test_sync_keeps_the_version_to_run(deploy_base):
+    mirror_base = mirror.sync(deploy_base, "app", "1.9.0")
+    mirror.sync(deploy_base, "app", "1.10.0", max_size=0)
+    assert sorted(os.listdir(os.path.join(mirror_base, "app"))) == ["1.10.0", "metadata.json"]
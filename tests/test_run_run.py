@@ -0,0 +1,17 @@
+import os
+
+from bipy_gui_manager.run import run
+
+
+def test_get_version_view(tmpdir):
+    deploy_base = str(tmpdir / "deploy")
+    for version in ("1.0.0", "1.1.0"):
+        os.makedirs(os.path.join(deploy_base, "app", version))
+    with open(os.path.join(deploy_base, "app", "metadata.json"), "w") as f:
+        f.write("{}")
+
+    view = run.get_version_view(deploy_base, "app", "1.0.0")
+    assert sorted(os.listdir(os.path.join(view, "app"))) == ["1.0.0", "metadata.json"]
+    assert os.path.samefile(os.path.join(view, "app", "1.0.0"), os.path.join(deploy_base, "app", "1.0.0"))
+    assert run.get_version_view(deploy_base, "app", "1.0.0") == view
+    assert run.get_version_view(deploy_base, "app", "1.1.0") != view
@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+
+from bipy_gui_manager.run import startup
+
+# Just enough of PyQt5 for the startup probe: the timers run when the event loop starts
+FAKE_QTCORE = """
+_timers = []
+
+class QTimer:
+    @staticmethod
+    def singleShot(msec, callback):
+        _timers.append(callback)
+
+class QCoreApplication:
+    _quit = False
+
+    @staticmethod
+    def exec_():
+        while _timers and not QCoreApplication._quit:
+            _timers.pop(0)()
+        return 0
+
+    @staticmethod
+    def quit():
+        QCoreApplication._quit = True
+"""
+
+FAKE_APP = """
+import time
+from PyQt5.QtCore import QCoreApplication, QTimer
+QTimer.singleShot(0, lambda: print("event loop running"))
+QCoreApplication.exec_()
+print("quit" if QCoreApplication._quit else "still running")
+"""
+
+
+def make_fake_app(tmpdir):
+    os.makedirs(tmpdir / "fake_qt" / "PyQt5")
+    with open(tmpdir / "fake_qt" / "PyQt5" / "__init__.py", "w"):
+        pass
+    with open(tmpdir / "fake_qt" / "PyQt5" / "QtCore.py", "w") as f:
+        f.write(FAKE_QTCORE)
+    return [sys.executable, "-c", FAKE_APP], {"PYTHONPATH": str(tmpdir / "fake_qt")}
+
+
+def test_parse_import_time():
+    assert startup.parse_import_time("import time: self [us] | cumulative | imported package\n") is None
+    assert startup.parse_import_time("import time:       626 |       1630 |   json.decoder\n") == \
+        startup.ImportTime(name="json.decoder", self_us=626, cumulative_us=1630, depth=1)
+    assert startup.parse_import_time("import time:       378 |       2657 | json") == \
+        startup.ImportTime(name="json", self_us=378, cumulative_us=2657, depth=0)
+    assert startup.parse_import_time("Traceback (most recent call last):") is None
+
+
+def test_aggregate_imports_and_packages():
+    imports = [
+        startup.ImportTime("json.decoder", 600, 1600, 1),
+        startup.ImportTime("json", 400, 2000, 0),
+        startup.ImportTime("os", 100, 100, 0),
+        startup.ImportTime("os", 50, 50, 0),  # Imported by another process too
+    ]
+    assert startup.aggregate_imports(imports) == [
+        {"name": "json", "self_us": 400, "cumulative_us": 2000, "count": 1},
+        {"name": "json.decoder", "self_us": 600, "cumulative_us": 1600, "count": 1},
+        {"name": "os", "self_us": 150, "cumulative_us": 150, "count": 2},
+    ]
+    assert startup.aggregate_packages(imports) == [{"name": "json", "self_us": 1000}, {"name": "os", "self_us": 150}]
+
+
+def test_find_version(tmpdir):
+    deploy_base = str(tmpdir)
+    os.makedirs(tmpdir / "app" / "1.2.0" / "venv")
+    assert startup.find_version(deploy_base, "app", [{"prefix": str(tmpdir / "app" / "1.2.0" / "venv")}]) == "1.2.0"
+    assert startup.find_version(deploy_base, "app", [{"prefix": "/usr"}]) is None
+    assert startup.find_version(deploy_base, "app", []) is None
+
+
+def test_launch_measures_imports(tmpdir):
+    result = startup.launch([sys.executable, "-c", "import json"])
+    assert result.returncode == 0
+    assert "json" in [item.name for item in result.imports]
+    assert result.probes == []  # Not a Qt application
+
+
+def test_launch_probes_the_event_loop(tmpdir, capfd):
+    command, env = make_fake_app(tmpdir)
+    result = startup.launch(command, cprofile=True, env=env)
+    assert result.returncode == 0
+    assert "quit" in capfd.readouterr().out
+    [probe] = result.probes
+    assert probe["event_loop_reached"] >= result.started_at
+    assert "PyQt5.QtCore" in [item.name for item in result.imports]
+    assert "cumulative" in probe["cprofile_stats"]
+
+    report = startup.build_report("app", "1.0", result)
+    assert report["startup_seconds"] >= 0
+    assert report["imports"][0]["cumulative_us"] >= report["imports"][-1]["cumulative_us"]
+
+
+def test_launch_without_quitting(tmpdir, capfd):
+    command, env = make_fake_app(tmpdir)
+    result = startup.launch(command, quit_on_start=False, env=env)
+    assert "still running" in capfd.readouterr().out
+    assert result.probes[0]["event_loop_reached"] is not None
+
+
+def test_launch_timeout(tmpdir):
+    result = startup.launch([sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.5)
+    assert result.returncode is None
+
+
+def test_launch_timeout_stops_the_children(tmpdir):
+    # Like acc-py, the shell starts the application in a child process that keeps stderr open
+    start = time.time()
+    result = startup.launch(["/bin/bash", "-c", f"{sys.executable} -c 'import time; time.sleep(30)'; true"],
+                            timeout=0.5)
+    assert result.returncode is None
+    assert time.time() - start < 10
+
+
+def test_save_and_load_reports(tmpdir, monkeypatch):
+    monkeypatch.setenv("BIPY_GUI_MANAGER_CACHE_PATH", str(tmpdir / "cache"))
+    assert startup.load_reports("app") == []
+    result = startup.LaunchResult(returncode=0, started_at=0, probes=[],
+                                  imports=[startup.ImportTime("json", 1000, 1000, 0)])
+    first = startup.build_report("app", "1.0", result)
+    first["created"] = "2020-01-01T00:00:00"
+    path = startup.save_report(first)
+    assert path == startup.get_report_path("app", "1.0")
+    second = startup.build_report("app", "2.0", result)
+    startup.save_report(second)
+    assert [report["version"] for report in startup.load_reports("app")] == ["1.0", "2.0"]
+    with open(path) as f:
+        assert json.load(f)["imports"] == [{"name": "json", "self_us": 1000, "cumulative_us": 1000, "count": 1}]
+
+    lines = startup.format_report(second, first)
+    assert lines[0] == "Startup: n/a (imports: 0.00s)"
+    assert lines[1].startswith("Version 1.0")
+    assert lines[-1].endswith("json")
@@ -0,0 +1,44 @@
+import os
+
+from bipy_gui_manager.utils import cas
+
+
+def test_insert_and_collect_garbage(tmpdir):
+    objects_path = str(tmpdir / "objects")
+    with open(tmpdir / "file.txt", "w") as f:
+        f.write("content")
+    temporary = cas.get_temporary_path(objects_path)
+    digest = cas.hash_file(str(tmpdir / "file.txt"), copy_to=temporary)
+    name = cas.get_object_name(digest, 0o100644)
+    assert name == os.path.join(digest[:2], f"{digest}-644")
+    assert cas.insert(objects_path, temporary, name)
+    with open(os.path.join(objects_path, name)) as f:
+        assert f.read() == "content"
+
+    # Inserting the same content again keeps the existing object
+    other = cas.get_temporary_path(objects_path)
+    cas.hash_file(str(tmpdir / "file.txt"), copy_to=other)
+    assert not cas.insert(objects_path, other, name)
+    assert not os.path.exists(other)
+
+    os.link(os.path.join(objects_path, name), str(tmpdir / "link.txt"))
+    assert cas.list_inodes(objects_path) == {(os.stat(tmpdir / "link.txt").st_dev,
+                                              os.stat(tmpdir / "link.txt").st_ino)}
+    pending = cas.get_temporary_path(objects_path)
+    open(pending, "w").close()
+    assert cas.collect_garbage(objects_path) == 0
+    os.remove(tmpdir / "link.txt")
+    assert cas.collect_garbage(objects_path) == len("content")
+    # The objects being prepared are not garbage
+    assert os.path.exists(pending)
+
+
+def test_make_shared_folders(tmpdir):
+    umask = os.umask(0o022)
+    try:
+        cas.make_folders(str(tmpdir / "shared" / "folder"), shared=True)
+        cas.make_folders(str(tmpdir / "private"))
+    finally:
+        os.umask(umask)
+    assert os.stat(tmpdir / "shared" / "folder").st_mode & 0o7777 == cas.SHARED_FOLDER_MODE
+    assert os.stat(tmpdir / "private").st_mode & 0o777 == 0o755
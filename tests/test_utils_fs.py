@@ -0,0 +1,122 @@
+import os
+import fcntl
+import pytest
+
+from bipy_gui_manager.utils import fs
+
+
+@pytest.fixture()
+def source_tree(tmpdir):
+    source = tmpdir / "source"
+    os.makedirs(source / "folder" / "subfolder")
+    with open(source / "file.txt", "w") as f:
+        f.write("content")
+    with open(source / "folder" / "subfolder" / ".hidden", "w") as f:
+        f.write("hidden content")
+    os.chmod(source / "file.txt", 0o750)
+    yield str(source)
+
+
+@pytest.mark.parametrize("mode", fs.CLONE_MODES)
+def test_clone_tree(tmpdir, source_tree, mode):
+    destination = str(tmpdir / "destination")
+    files = fs.clone_tree(source_tree, destination, mode=mode)
+    assert files == sorted(["file.txt", os.path.join("folder", "subfolder", ".hidden")])
+    with open(os.path.join(destination, "file.txt")) as f:
+        assert f.read() == "content"
+    with open(os.path.join(destination, "folder", "subfolder", ".hidden")) as f:
+        assert f.read() == "hidden content"
+    assert os.stat(os.path.join(destination, "file.txt")).st_mode & 0o777 == 0o750
+    assert os.path.isdir(source_tree)
+
+
+def test_clone_tree_hardlink_and_replace_content(tmpdir, source_tree):
+    destination = str(tmpdir / "destination")
+    fs.clone_tree(source_tree, destination, mode="hardlink")
+    assert os.path.samefile(os.path.join(source_tree, "file.txt"), os.path.join(destination, "file.txt"))
+
+    fs.replace_file_content(os.path.join(destination, "file.txt"), "customized")
+    with open(os.path.join(destination, "file.txt")) as f:
+        assert f.read() == "customized"
+    with open(os.path.join(source_tree, "file.txt")) as f:
+        assert f.read() == "content"
+    assert os.stat(os.path.join(destination, "file.txt")).st_mode & 0o777 == 0o750
+
+
+def test_clone_tree_keeps_symlinks(tmpdir, source_tree):
+    os.symlink("file.txt", os.path.join(source_tree, "link.txt"))
+    os.symlink("folder", os.path.join(source_tree, "linked_folder"))
+    destination = str(tmpdir / "destination")
+    files = fs.clone_tree(source_tree, destination, mode="hardlink", symlinks=True)
+    assert "link.txt" in files and "linked_folder" in files
+    assert os.readlink(os.path.join(destination, "link.txt")) == "file.txt"
+    assert os.readlink(os.path.join(destination, "linked_folder")) == "folder"
+    assert not os.path.islink(os.path.join(destination, "folder", "subfolder", ".hidden"))
+
+
+def test_clone_tree_wrong_paths(tmpdir, source_tree):
+    with pytest.raises(FileNotFoundError):
+        fs.clone_tree(str(tmpdir / "nonexisting"), str(tmpdir / "destination"))
+    assert not os.path.exists(tmpdir / "destination")
+    with pytest.raises(FileExistsError):
+        fs.clone_tree(source_tree, source_tree)
+    with pytest.raises(ValueError):
+        fs.clone_tree(source_tree, str(tmpdir / "destination"), mode="teleport")
+
+
+def test_copy_file_in_chunks(tmpdir):
+    content = os.urandom(10000)
+    with open(tmpdir / "big", "wb") as f:
+        f.write(content)
+    fs.copy_file(str(tmpdir / "big"), str(tmpdir / "copy"), chunk_size=3000)
+    with open(tmpdir / "copy", "rb") as f:
+        assert f.read() == content
+
+
+def test_sibling_path(tmpdir):
+    path = str(tmpdir / "project")
+    sibling = fs.sibling_path(path + "/", "staging")
+    assert os.path.dirname(sibling) == str(tmpdir)
+    assert os.path.basename(sibling).startswith(".project.staging-")
+    assert sibling != fs.sibling_path(path, "staging")
+
+
+def test_publish_tree(tmpdir, source_tree):
+    destination = str(tmpdir / "destination")
+    fs.publish_tree(source_tree, destination)
+    assert not os.path.exists(source_tree)
+    assert os.path.isfile(os.path.join(destination, "file.txt"))
+    # Never replaces a project
+    os.mkdir(source_tree)
+    with open(os.path.join(source_tree, "other.txt"), "w") as f:
+        f.write("other")
+    with pytest.raises(OSError):
+        fs.publish_tree(destination, source_tree)
+
+
+def test_locked(tmpdir):
+    lock_path = str(tmpdir / "locks" / ".lock")
+    with fs.locked(lock_path):
+        assert os.path.exists(lock_path)
+        # flock locks are per open file: another open file can't take it
+        with open(lock_path) as other:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    with open(lock_path) as other:
+        fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def test_locked_is_shared(tmpdir):
+    lock_path = str(tmpdir / ".lock")
+    umask = os.umask(0o022)
+    try:
+        with fs.locked(lock_path):
+            pass
+    finally:
+        os.umask(umask)
+    # Other users must be able to open it for writing to take the lock too
+    assert os.stat(lock_path).st_mode & 0o777 == 0o666
+    with fs.locked(lock_path):
+        with pytest.raises(BlockingIOError):
+            with fs.locked(lock_path, blocking=False):
+                pass
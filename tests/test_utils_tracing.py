@@ -0,0 +1,61 @@
+import json
+import pytest
+
+from bipy_gui_manager.utils import tracing
+
+
+def test_span_nesting_and_timing():
+    tracer = tracing.Tracer()
+    with tracer.span("outer"):
+        with tracer.span("inner", category="subprocess", command="git status") as inner:
+            inner.attributes["returncode"] = 0
+
+    outer, inner = tracer.spans
+    assert outer.depth == 0 and outer.parent is None
+    assert inner.depth == 1 and inner.parent is outer
+    assert inner.attributes == {"command": "git status", "returncode": 0}
+    assert 0 <= inner.duration <= outer.duration
+
+
+def test_span_records_errors():
+    tracer = tracing.Tracer()
+    with pytest.raises(ValueError):
+        with tracer.span("failing"):
+            raise ValueError("broken")
+    assert tracer.spans[0].error == "ValueError: broken"
+    assert tracer.spans[0].end is not None
+    assert "failing (failed)" in tracer.summary()
+
+
+def test_summary_lists_all_spans():
+    tracer = tracing.Tracer()
+    with tracer.span("collect"):
+        with tracer.span("PhoneBook lookup", category="network"):
+            pass
+    summary = tracer.summary()
+    assert "collect" in summary
+    assert "network: PhoneBook lookup" in summary
+    assert "(all network calls: 1)" in summary
+    assert "Total" in summary
+
+
+def test_write_chrome_trace(tmpdir):
+    tracer = tracing.Tracer()
+    with tracer.span("stage", attribute="value"):
+        pass
+    tracer.write_chrome_trace(str(tmpdir / "trace.json"))
+    with open(tmpdir / "trace.json") as f:
+        trace = json.load(f)
+    event, = trace["traceEvents"]
+    assert event["name"] == "stage"
+    assert event["ph"] == "X"
+    assert event["dur"] >= 0
+    assert event["args"] == {"attribute": "value"}
+
+
+def test_module_level_span_uses_current_tracer():
+    tracer = tracing.reset_tracer()
+    with tracing.span("stage"):
+        pass
+    assert tracing.get_tracer() is tracer
+    assert [span.name for span in tracer.spans] == ["stage"]
@@ -0,0 +1,91 @@
+import os
+import time
+import argparse
+
+from bipy_gui_manager.utils import trash
+from bipy_gui_manager.maintenance import maintenance
+
+
+def create_tree(path):
+    os.makedirs(os.path.join(path, "venv", "lib", "site-packages"))
+    for i in range(50):
+        with open(os.path.join(path, "venv", "lib", "site-packages", f"module_{i}.py"), "w") as f:
+            f.write("content")
+    with open(os.path.join(path, "file.txt"), "w") as f:
+        f.write("content")
+    os.symlink(os.path.join(path, "venv"), os.path.join(path, "link_to_folder"))
+
+
+def wait_for_deletion(path):
+    for _ in range(100):
+        if not os.path.exists(path):
+            return
+        time.sleep(0.05)
+
+
+def test_get_trash_path_same_filesystem(tmpdir):
+    # The cache is in tmpdir too (see conftest)
+    assert trash.get_trash_path(os.path.join(tmpdir, "project")) == os.path.join(tmpdir, "cache", "trash")
+
+
+def test_get_trash_path_other_filesystem(tmpdir, monkeypatch):
+    monkeypatch.setattr(trash, "same_filesystem", lambda *_: False)
+    assert trash.get_trash_path(os.path.join(tmpdir, "project")) == \
+        os.path.join(tmpdir, trash.LOCAL_TRASH_NAME.format(uid=os.getuid()))
+
+
+def test_move_to_trash(tmpdir):
+    project = os.path.join(tmpdir, "project")
+    create_tree(project)
+    trashed = trash.move_to_trash(project)
+    assert not os.path.exists(project)
+    assert os.path.isfile(os.path.join(trashed, "file.txt"))
+    assert trash.list_trash() == [trashed]
+    assert trash.move_to_trash(project) is None
+
+
+def test_move_to_trash_registers_other_locations(tmpdir, monkeypatch):
+    local_trash = os.path.join(tmpdir, "local-trash")
+    monkeypatch.setattr(trash, "get_trash_path", lambda _: local_trash)
+    os.mkdir(os.path.join(tmpdir, "project"))
+    trashed = trash.move_to_trash(os.path.join(tmpdir, "project"))
+    trash.move_to_trash(os.path.join(tmpdir, "nonexisting"))
+    assert os.path.dirname(trashed) == local_trash
+    assert trash.get_trash_locations() == [local_trash]
+    assert trash.list_trash() == [trashed]
+
+
+def test_discard(tmpdir):
+    project = os.path.join(tmpdir, "project")
+    create_tree(project)
+    trashed = trash.discard(project)
+    assert not os.path.exists(project)
+    wait_for_deletion(trashed)
+    assert not os.path.exists(trashed)
+    assert trash.discard(project) is None
+
+
+def test_delete_tree(tmpdir):
+    project = os.path.join(tmpdir, "project")
+    create_tree(project)
+    outside = os.path.join(tmpdir, "outside.txt")
+    with open(outside, "w") as f:
+        f.write("not to delete")
+    os.symlink(outside, os.path.join(project, "link_to_file"))
+    trash.delete_tree(project, workers=4)
+    assert not os.path.exists(project)
+    assert os.path.isfile(outside)
+    # Deleting twice, i.e. with gc while the background deletion is running, is harmless
+    trash.delete_tree(project)
+
+
+def test_gc(tmpdir):
+    project = os.path.join(tmpdir, "project")
+    create_tree(project)
+    trashed = trash.move_to_trash(project)
+
+    maintenance.gc(argparse.Namespace(verbose=False, dry_run=True))
+    assert os.path.isdir(trashed)
+    maintenance.gc(argparse.Namespace(verbose=False, dry_run=False))
+    assert not os.path.exists(trashed)
+    assert trash.list_trash() == []
@@ -12,7 +12,7 @@ from .conftest import create_template_files
 
 class MockSuccessfulPopen:
 
-    def __init__(self, command, cwd, stdout, stderr):
+    def __init__(self, command, cwd, stdout, stderr, **kwargs):
         pass
 
     def communicate(self):
@@ -24,7 +24,7 @@ class MockSuccessfulPopen:
 
 class MockFailingPopen:
 
-    def __init__(self, command, cwd, stdout, stderr):
+    def __init__(self, command, cwd, stdout, stderr, **kwargs):
         pass
 
     def communicate(self):
@@ -58,6 +58,84 @@ def test_init_local_repo(tmpdir):
     assert os.path.exists(tmpdir / ".git")
 
 
+def test_init_local_repo_without_dulwich(tmpdir, monkeypatch):
+    # Git is called when dulwich is not available
+    monkeypatch.setattr('bipy_gui_manager.utils.version_control.dulwich', None)
+    with open(tmpdir / "testfile", 'w') as f:
+        f.write("test")
+    version_control.init_local_repo(tmpdir)
+    stdout, _ = version_control.invoke_git(['log', '--format=%s'], cwd=tmpdir)
+    assert stdout.strip() == version_control.INITIAL_COMMIT_MESSAGE
+
+
+def test_init_local_repo_in_process(tmpdir):
+    # The repository created in-process must be indistinguishable from the one Git would create
+    pytest.importorskip("dulwich")
+    os.makedirs(tmpdir / "package" / "subpackage")
+    os.makedirs(tmpdir / "build")
+    for path in ["README.md", "package/__init__.py", "package/subpackage/module.py", "build/ignored.py",
+                 "ignored.pyc"]:
+        with open(tmpdir / path, 'w') as f:
+            f.write(f"content of {path}")
+    with open(tmpdir / ".gitignore", 'w') as f:
+        f.write("build/\n*.pyc\n")
+    os.chmod(tmpdir / "README.md", 0o755)
+    os.symlink("README.md", tmpdir / "link")
+
+    version_control.init_local_repo_in_process(str(tmpdir), version_control.INITIAL_COMMIT_MESSAGE)
+
+    stdout, _ = version_control.invoke_git(['status', '--porcelain', '--ignored'], cwd=tmpdir)
+    assert sorted(stdout.splitlines()) == ["!! build/", "!! ignored.pyc"]
+    stdout, _ = version_control.invoke_git(['ls-files', '--stage'], cwd=tmpdir)
+    modes = {line.split()[-1]: line.split()[0] for line in stdout.splitlines()}
+    assert modes == {".gitignore": "100644", "README.md": "100755", "link": "120000",
+                     "package/__init__.py": "100644", "package/subpackage/module.py": "100644"}
+    stdout, _ = version_control.invoke_git(['log', '--format=%s'], cwd=tmpdir)
+    assert stdout.strip() == version_control.INITIAL_COMMIT_MESSAGE
+    stdout, _ = version_control.invoke_git(['symbolic-ref', 'HEAD'], cwd=tmpdir)
+    assert stdout.strip() == "refs/heads/master"
+    version_control.invoke_git(['fsck', '--strict'], cwd=tmpdir)
+
+
+def test_init_local_repo_in_process_needs_an_identity(tmpdir, monkeypatch):
+    pytest.importorskip("dulwich")
+    for variable in ["GIT_AUTHOR_NAME", "GIT_AUTHOR_EMAIL", "GIT_COMMITTER_NAME", "GIT_COMMITTER_EMAIL"]:
+        monkeypatch.delenv(variable, raising=False)
+    monkeypatch.setenv("HOME", str(tmpdir / "home"))
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmpdir / "home" / ".config"))
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    os.makedirs(tmpdir / "project")
+    with open(tmpdir / "project" / "testfile", 'w') as f:
+        f.write("test")
+    # No identity is made up
+    with pytest.raises(ValueError):
+        version_control.init_local_repo_in_process(str(tmpdir / "project"), version_control.INITIAL_COMMIT_MESSAGE)
+
+    os.makedirs(tmpdir / "home")
+    with open(tmpdir / "home" / ".gitconfig", 'w') as f:
+        f.write("[user]\n\tname = Test User\n\temail = test.user@cern.ch\n")
+    monkeypatch.setenv("GIT_COMMITTER_NAME", "Committer")
+    shutil.rmtree(tmpdir / "project" / ".git")
+    version_control.init_local_repo_in_process(str(tmpdir / "project"), version_control.INITIAL_COMMIT_MESSAGE)
+    stdout, _ = version_control.invoke_git(['log', '--format=%an <%ae>|%cn <%ce>'], cwd=tmpdir / "project")
+    assert stdout.strip() == "Test User <test.user@cern.ch>|Committer <test.user@cern.ch>"
+
+
+def test_init_local_repo_in_process_failure_falls_back_to_git(tmpdir, monkeypatch):
+    pytest.importorskip("dulwich")
+
+    def fail(*args, **kwargs):
+        os.makedirs(tmpdir / ".git" / "half-done")
+        raise ValueError("Imagine dulwich fails...")
+    monkeypatch.setattr('bipy_gui_manager.utils.version_control.init_local_repo_in_process', fail)
+    with open(tmpdir / "testfile", 'w') as f:
+        f.write("test")
+    version_control.init_local_repo(tmpdir)
+    assert not os.path.exists(tmpdir / ".git" / "half-done")
+    stdout, _ = version_control.invoke_git(['log', '--format=%s'], cwd=tmpdir)
+    assert stdout.strip() == version_control.INITIAL_COMMIT_MESSAGE
+
+
 def test_get_git_branch(tmpdir):
     with pytest.raises(OSError):
         version_control.get_git_branch(tmpdir)
@@ -105,6 +183,76 @@ def test_get_remote_url(tmpdir, monkeypatch):
     assert version_control.get_remote_url(tmpdir) is not None
 
 
+def test_get_git_branch_detached(tmpdir):
+    with open(tmpdir / "testfile", 'w') as f:
+        f.write("test")
+    version_control.init_local_repo(tmpdir)
+    version_control.invoke_git(['checkout', '--detach'], cwd=tmpdir)
+    with pytest.raises(OSError):
+        version_control.get_git_branch(tmpdir)
+
+
+def test_find_git():
+    assert os.path.isfile(version_control.find_git())
+    assert version_control.find_git() is version_control.find_git()
+
+
+def test_git_session_batched_queries(tmpdir):
+    with open(tmpdir / "testfile", 'w') as f:
+        f.write("test")
+    version_control.init_local_repo(tmpdir)
+    git = version_control.GitSession(tmpdir)
+
+    toplevel, head, branch = git.rev_parse('--show-toplevel', 'HEAD', '--abbrev-ref', 'HEAD')
+    assert os.path.samefile(toplevel, tmpdir)
+    assert git.for_each_ref('%(refname) %(objectname)', 'refs/heads') == [f"refs/heads/master {head}"]
+    assert branch == "master"
+    assert git.cat_file('HEAD:testfile', 'HEAD:nonexisting', 'HEAD:testfile') == {'HEAD:testfile': b"test",
+                                                                                  'HEAD:nonexisting': None}
+    with pytest.raises(OSError):
+        git.rev_parse('HEAD', 'nonexisting-branch')
+
+
+def test_git_session_status(tmpdir):
+    git = version_control.GitSession(tmpdir)
+    with pytest.raises(OSError):
+        git.status()
+
+    version_control.invoke_git(['init'], cwd=tmpdir)
+    assert git.status() == version_control.RepoStatus("master", None, 0, 0, [])
+    with open(tmpdir / "testfile", 'w') as f:
+        f.write("test")
+    assert git.status().changes == ["?? testfile"]
+
+    version_control.invoke_git(['add', '--all'], cwd=tmpdir)
+    version_control.invoke_git(['commit', '-m', "test"], cwd=tmpdir)
+    remote = str(tmpdir / ".git" / "remote.git")  # Not to appear as untracked
+    version_control.invoke_git(['init', '--bare', remote], cwd=tmpdir)
+    version_control.invoke_git(['remote', 'add', 'origin', remote], cwd=tmpdir)
+    version_control.invoke_git(['push', '-u', 'origin', 'master'], cwd=tmpdir)
+    assert git.status() == version_control.RepoStatus("master", "origin/master", 0, 0, [])
+
+    with open(tmpdir / "testfile", 'w') as f:
+        f.write("modified")
+    version_control.invoke_git(['commit', '-am', "test 2"], cwd=tmpdir)
+    assert git.status().ahead == 1
+    assert not version_control.is_git_dir_clean(tmpdir)
+
+
+@pytest.mark.parametrize("line,expected", [
+    ("No commits yet on master", ("master", None, 0, 0)),
+    ("Initial commit on master", ("master", None, 0, 0)),
+    ("HEAD (no branch)", (None, None, 0, 0)),
+    ("master", ("master", None, 0, 0)),
+    ("master...origin/master", ("master", "origin/master", 0, 0)),
+    ("master...origin/master [ahead 2]", ("master", "origin/master", 2, 0)),
+    ("master...origin/master [ahead 2, behind 3]", ("master", "origin/master", 2, 3)),
+    ("master...origin/master [gone]", ("master", "origin/master", 0, 0)),
+])
+def test_parse_branch_line(line, expected):
+    assert tuple(version_control._parse_branch_line(line, []))[:4] == expected
+
+
 def test_post_to_gitlab(tmpdir, monkeypatch):
     monkeypatch.setattr('urllib.parse.urlencode', lambda *args, **kwargs: "")
     monkeypatch.setattr('urllib.request.Request', lambda *args, **kwargs: None)
@@ -136,6 +284,30 @@ def test_git_init_and_push(tmpdir, mock_git):
     version_control.push_first_commit(project_path, "https://gitlab.cern.ch/test-project.git")
 
 
+def test_push_first_commit_to_local_remote(tmpdir, capfd):
+    project_path = os.path.join(tmpdir, "test-project")
+    remote = os.path.join(tmpdir, "remote.git")
+    create_template_files(project_path, "test-project")
+    version_control.init_local_repo(project_path)
+    version_control.invoke_git(['init', '--bare', remote], cwd=tmpdir)
+
+    version_control.push_first_commit(project_path, remote, repo_data={'id': 1, 'empty_repo': True},
+                                      compression=1, threads=2)
+    # The progress is shown to the user
+    assert "Writing objects" in capfd.readouterr().err
+    stdout, _ = version_control.invoke_git(['rev-parse', 'master'], cwd=remote)
+    local_stdout, _ = version_control.invoke_git(['rev-parse', 'master'], cwd=project_path)
+    assert stdout == local_stdout
+
+
+def test_push_first_commit_not_empty(tmpdir, monkeypatch):
+    # The GitLab API says that the repository is not empty: nothing is done
+    monkeypatch.setattr('bipy_gui_manager.utils.version_control.invoke_git', lambda *a, **k: 1/0)
+    with pytest.raises(OSError):
+        version_control.push_first_commit(str(tmpdir), "https://gitlab.cern.ch/test-project.git",
+                                          repo_data={'id': 1, 'empty_repo': False})
+
+
 def test_create_gitlab_repo(monkeypatch, mock_gitlab):
     try:
         monkeypatch.setattr('requests.put', lambda *args, **kwargs: '')
@@ -143,10 +315,11 @@ def test_create_gitlab_repo(monkeypatch, mock_gitlab):
         # requests is not installed in the test environment
         pass
     monkeypatch.setattr('bipy_gui_manager.utils.version_control.authenticate_on_gitlab', lambda *a, **k: 1/0)
-    version_control.create_gitlab_repository(repo_type="test",
-                                             project_name="test-project",
-                                             project_desc="A test project",
-                                             auth_token="access_token=auth-token",
-                                             author_name="me")
+    repo_data = version_control.create_gitlab_repository(repo_type="test",
+                                                         project_name="test-project",
+                                                         project_desc="A test project",
+                                                         auth_token="access_token=auth-token",
+                                                         author_name="me")
+    assert repo_data == {"id": "00000"}
 
 